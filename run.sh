@@ -12,6 +12,7 @@ usage() {
     echo "  --train                   Run in training mode (default)"
     echo "  --infer --input FILE      Run in inference mode with input file"
     echo "  --output FILE             Specify output file for inference (default: inference_results.json)"
+    echo "  --output_dir DIR          Batch mode: score every file of --input (directory, glob or manifest) into DIR"
     echo "  --model FILE              Specify model file path for inference (default: violence_detection_model.pt)"
     echo "  --help                    Display this help message"
     exit 1
@@ -21,6 +22,7 @@ usage() {
 MODE="train"
 INPUT_FILE=""
 OUTPUT_FILE="inference_results.json"
+OUTPUT_DIR=""
 MODEL_FILE="violence_detection_model.pt"
 
 # Parse command line arguments
@@ -42,6 +44,10 @@ while [[ $# -gt 0 ]]; do
             OUTPUT_FILE="$2"
             shift 2
             ;;
+        --output_dir)
+            OUTPUT_DIR="$2"
+            shift 2
+            ;;
         --model)
             MODEL_FILE="$2"
             shift 2
@@ -71,10 +77,15 @@ if [[ "$MODE" == "train" ]]; then
     python -W ignore src/train.py
 elif [[ "$MODE" == "infer" ]]; then
     echo "Running in inference mode..."
-    echo "Input file: $INPUT_FILE"
-    echo "Output file: $OUTPUT_FILE"
+    echo "Input: $INPUT_FILE"
     echo "Model file: $MODEL_FILE"
-    python -W ignore src/inference.py --input_file "$INPUT_FILE" --output_file "$OUTPUT_FILE" --model_path "$MODEL_FILE"
+    if [[ -n "$OUTPUT_DIR" ]]; then
+        echo "Output directory: $OUTPUT_DIR"
+        python -W ignore src/inference.py --inputs "$INPUT_FILE" --output_dir "$OUTPUT_DIR" --model_path "$MODEL_FILE"
+    else
+        echo "Output file: $OUTPUT_FILE"
+        python -W ignore src/inference.py --input_file "$INPUT_FILE" --output_file "$OUTPUT_FILE" --model_path "$MODEL_FILE"
+    fi
 fi
 
 echo "Model execution completed"
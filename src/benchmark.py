@@ -0,0 +1,1376 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the violence detection pipeline.
+
+This script measures the throughput of individual pipeline stages on
+synthetic MMPose-like data so that optimizations can be compared against
+the original implementations. It provides:
+- Graph construction benchmark (vectorized vs. reference loop builder)
+- Graph topology benchmark (edges per graph and end-to-end throughput)
+- JSON streaming benchmark (peak memory of json.load vs. iter_frames)
+- Inference benchmark (per-graph forward passes vs. batched scoring)
+- Streaming service benchmark (latency and throughput under multi-stream load)
+- Threshold search benchmark (single-sort search vs. per-threshold F1 loop)
+- Dense engine benchmark (sparse message passing vs. dense batched matmuls)
+- Export benchmark (eager PyTorch vs. TorchScript and onnxruntime latency)
+- Startup benchmark (cold-start time to the first score per backend)
+- Loader benchmark (training epoch time with worker processes and prefetching)
+- Collate benchmark (memory and batching time of Data lists vs. packed arrays)
+- Keypoint subset benchmark (dataset memory and throughput per wholebody subset)
+- Confidence filter benchmark (ingestion and scoring time with and without
+  instance filtering)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from sklearn.metrics import (
+    confusion_matrix,
+    f1_score,
+    precision_recall_curve,
+    roc_curve,
+)
+from torch_geometric.data import Batch, Data
+
+from dense import (
+    DenseViolenceDetectionGNN,
+    dense_adjacency,
+    dense_inputs_from_keypoints,
+)
+from export import (
+    EXPORT_FORMAT_ONNX,
+    EXPORT_FORMATS,
+    ExportableViolenceModel,
+    export_metadata,
+    export_onnx,
+    export_torchscript,
+    load_exported,
+)
+from gnn import (
+    DEFAULT_KNN_K,
+    KEYPOINT_SUBSETS,
+    TOPOLOGY_COMPLETE,
+    TOPOLOGY_MODES,
+    TOPOLOGY_SKELETON_KNN,
+    create_pose_graph,
+    resolve_keypoint_subset,
+)
+from graph_cache import (
+    STORE_ARRAYS,
+    GraphCacheDataset,
+    PackedGraphDataset,
+    build_graph_cache,
+)
+from inference import (
+    BACKEND_ONNXRUNTIME,
+    ENGINE_DENSE,
+    ENGINE_SPARSE,
+    predict_violence,
+    score_frames,
+)
+from loaders import PREFETCH_BATCHES, DevicePrefetcher, make_loader
+from model import ViolenceDetectionGNN, build_checkpoint
+from pose_io import (
+    DEFAULT_CONFIDENCE_FILTER,
+    graphs_from_arrays,
+    iter_frames,
+    load_graph_arrays,
+    make_confidence_filter,
+)
+from serve import DEFAULT_MAX_BATCH_SIZE, StreamingScorer
+from train import bootstrap_confidence_intervals, find_optimal_threshold
+
+# Constants for the synthetic workload
+WHOLEBODY_KEYPOINTS = 133
+DEFAULT_PERSONS = 8
+DEFAULT_REPEATS = 20
+FRAME_SIZE = (1920, 1080)
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_FRAMES = 50
+WHOLEBODY_DATASET_CONFIG = (
+    Path(__file__).resolve().parents[1]
+    / "mmpose/configs/_base_/datasets/coco_wholebody.py"
+)
+
+
+def make_synthetic_frame(
+    num_persons: int, num_keypoints: int, seed: int = 0
+) -> List[np.ndarray]:
+    """
+    Generate random keypoints for a multi-person frame.
+
+    Args:
+        num_persons: Number of person instances in the frame
+        num_keypoints: Number of keypoints per person
+        seed: Random seed for reproducibility
+
+    Returns:
+        List of keypoint arrays of shape [num_keypoints, 2]
+    """
+    rng = np.random.default_rng(seed)
+    scale = np.array(FRAME_SIZE, dtype=np.float64)
+    return [rng.random((num_keypoints, 2)) * scale for _ in range(num_persons)]
+
+
+def load_skeleton_links(dataset_config: Path) -> List[List[int]]:
+    """
+    Read skeleton links from an MMPose dataset config, as stored in meta_info.
+
+    Mirrors mmpose.datasets.datasets.utils.parse_pose_metainfo, which maps the
+    keypoint names of each skeleton link to keypoint indices.
+
+    Args:
+        dataset_config: Path to an MMPose dataset config (e.g. coco_wholebody.py)
+
+    Returns:
+        List of [i, j] keypoint index pairs
+    """
+    dataset_info = runpy.run_path(str(dataset_config))["dataset_info"]
+    name2id = {kp["name"]: kp["id"] for kp in dataset_info["keypoint_info"].values()}
+    return [
+        [name2id[link["link"][0]], name2id[link["link"][1]]]
+        for link in dataset_info["skeleton_info"].values()
+    ]
+
+
+def write_synthetic_results(
+    json_file: Path,
+    num_frames: int,
+    num_persons: int,
+    num_keypoints: int,
+    skeleton_links: Optional[List[List[int]]] = None,
+) -> None:
+    """
+    Write an MMPose-style results file, tab-indented like the MMPose demo.
+
+    Args:
+        json_file: Output path
+        num_frames: Number of frames in the video
+        num_persons: Person instances per frame
+        num_keypoints: Keypoints per person
+        skeleton_links: Skeleton links stored in meta_info, if any
+    """
+    rng = np.random.default_rng(0)
+    scale = np.array(FRAME_SIZE, dtype=np.float64)
+    instance_info = [
+        {
+            "frame_id": frame_id,
+            "instances": [
+                {
+                    "keypoints": (rng.random((num_keypoints, 2)) * scale).tolist(),
+                    "keypoint_scores": rng.random(num_keypoints).tolist(),
+                    "bbox": [[0.0, 0.0, 100.0, 200.0]],
+                    "bbox_score": float(rng.random()),
+                }
+                for _ in range(num_persons)
+            ],
+        }
+        for frame_id in range(num_frames)
+    ]
+    with open(json_file, "w", encoding="utf-8") as f:
+        meta_info = {"skeleton_links": skeleton_links} if skeleton_links else {}
+        json.dump(
+            {"meta_info": meta_info, "instance_info": instance_info}, f, indent="\t"
+        )
+
+
+def build_synthetic_cache(
+    root: Path, num_frames: int, num_persons: int, num_keypoints: int
+) -> GraphCacheDataset:
+    """
+    Build a graph cache from one synthetic results file per class.
+
+    Args:
+        root: Empty directory for the results files and the cache
+        num_frames: Number of frames per results file
+        num_persons: Person instances per frame
+        num_keypoints: Keypoints per person
+
+    Returns:
+        GraphCacheDataset over the synthetic graphs
+    """
+    for label in ("violent", "non-violent"):
+        (root / label).mkdir()
+        write_synthetic_results(
+            root / label / "results_0.json", num_frames, num_persons, num_keypoints
+        )
+    return build_graph_cache(
+        [(root / "violent", root / "non-violent")], root / "cache", 100, num_workers=0
+    )
+
+
+def peak_memory(fn: Callable[[], object]) -> int:
+    """
+    Measure the peak Python heap allocation of a call.
+
+    Args:
+        fn: Zero-argument callable
+
+    Returns:
+        Peak traced memory in bytes
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def reference_create_pose_graph(
+    keypoints: np.ndarray, edge_attr: bool = True
+) -> Optional[Data]:
+    """
+    Original nested-loop graph builder, kept as a speed baseline.
+
+    Its output is compared with create_pose_graph in tests/test_graph.py.
+
+    Args:
+        keypoints: NumPy array of shape [num_keypoints, 2] containing (x, y) coordinates
+        edge_attr: Whether to include edge attributes (distances between joints)
+
+    Returns:
+        PyTorch Geometric Data object or None if the graph cannot be created
+    """
+    valid_mask = ~np.isnan(keypoints).any(axis=1) & (keypoints != 0).any(axis=1)
+    valid_keypoints = keypoints[valid_mask]
+
+    if len(valid_keypoints) < 3:
+        return None
+
+    num_nodes = len(valid_keypoints)
+    x = torch.tensor(valid_keypoints, dtype=torch.float)
+
+    edge_list = []
+    edge_features = []
+    for i in range(num_nodes):
+        for j in range(i + 1, num_nodes):
+            edge_list.append([i, j])
+            edge_list.append([j, i])
+            if edge_attr:
+                dist = np.linalg.norm(valid_keypoints[i] - valid_keypoints[j])
+                edge_features.append([dist])
+                edge_features.append([dist])
+
+    edge_index = torch.tensor(edge_list, dtype=torch.long).t().contiguous()
+    data = Data(x=x, edge_index=edge_index)
+    if edge_attr and edge_features:
+        data.edge_attr = torch.tensor(edge_features, dtype=torch.float)
+
+    return data
+
+
+def reference_predict_violence(
+    model: ViolenceDetectionGNN, graphs: List[Data], device: torch.device
+) -> List[float]:
+    """
+    Original one-forward-pass-per-graph scoring, kept as a baseline.
+
+    Args:
+        model: Trained GNN model
+        graphs: List of graph data objects
+        device: Device to run inference on
+
+    Returns:
+        List of violence scores between 0 and 1
+    """
+    model.eval()
+    scores = []
+    with torch.no_grad():
+        for graph in graphs:
+            graph = graph.to(device)
+            batch = torch.zeros(graph.x.shape[0], dtype=torch.long, device=device)
+            scores.append(model(graph.x, graph.edge_index, batch).item())
+    return scores
+
+
+def reference_find_optimal_threshold(
+    y_true: np.ndarray, y_score: np.ndarray
+) -> Tuple[float, Dict[str, float]]:
+    """
+    Original threshold search with one f1_score call per ROC threshold (O(N^2)).
+
+    Args:
+        y_true: Ground truth binary labels
+        y_score: Predicted scores (probabilities)
+
+    Returns:
+        Tuple of (optimal threshold, dictionary of metrics at that threshold)
+    """
+    fpr, tpr, thresholds = roc_curve(y_true, y_score)
+
+    # Calculate Youden's J statistic (J = Sensitivity + Specificity - 1)
+    j_scores = tpr - fpr
+    optimal_idx_j = np.argmax(j_scores)
+    optimal_threshold_j = thresholds[optimal_idx_j]
+
+    # Calculate distance to (0,1) point in ROC space
+    distances = np.sqrt((1 - tpr) ** 2 + fpr**2)
+    optimal_idx_d = np.argmin(distances)
+    optimal_threshold_d = thresholds[optimal_idx_d]
+
+    # Calculate F1 score at different thresholds
+    precision, recall, pr_thresholds = precision_recall_curve(y_true, y_score)
+
+    # Calculate F1 for all possible thresholds
+    f1_scores = []
+    for t in thresholds:
+        y_pred = (y_score >= t).astype(int)
+        f1 = f1_score(y_true, y_pred)
+        f1_scores.append(f1)
+
+    optimal_idx_f1 = np.argmax(f1_scores)
+    optimal_threshold_f1 = thresholds[optimal_idx_f1]
+
+    # Choose Youden's J as the primary method (most common in academic literature)
+    optimal_threshold = optimal_threshold_j
+
+    # Calculate confusion matrix at optimal threshold
+    y_pred = (y_score >= optimal_threshold).astype(int)
+    tn, fp, fn, tp = confusion_matrix(y_true, y_pred).ravel()
+
+    # Calculate various metrics at the optimal threshold
+    sensitivity = tp / (tp + fn) if (tp + fn) > 0 else 0
+    specificity = tn / (tn + fp) if (tn + fp) > 0 else 0
+    precision_val = tp / (tp + fp) if (tp + fp) > 0 else 0
+
+    # Create metrics dictionary
+    metrics = {
+        "threshold_j": optimal_threshold_j,
+        "threshold_distance": optimal_threshold_d,
+        "threshold_f1": optimal_threshold_f1,
+        "sensitivity": sensitivity,
+        "specificity": specificity,
+        "precision": precision_val,
+        "f1_score": f1_scores[optimal_idx_j],
+        "youdens_j": j_scores[optimal_idx_j],
+    }
+
+    return optimal_threshold, metrics
+
+
+def time_call(fn: Callable[[], object], repeats: int) -> float:
+    """
+    Return the best wall-clock time of several calls to fn.
+
+    Args:
+        fn: Zero-argument callable to time
+        repeats: Number of timed repetitions
+
+    Returns:
+        Minimum elapsed time in seconds
+    """
+    fn()  # Warm-up (fills caches)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_graph_construction(args: argparse.Namespace) -> None:
+    """
+    Compare the vectorized graph builder against the reference loop builder.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    frame = make_synthetic_frame(args.persons, args.keypoints)
+    # Knock out a few joints so that the valid-node count varies per person
+    for i, keypoints in enumerate(frame):
+        keypoints[: i % 5] = 0.0
+
+    num_edges = sum(create_pose_graph(kp).num_edges for kp in frame)
+    print(
+        f"Frame: {args.persons} persons x {args.keypoints} keypoints "
+        f"({num_edges} edges)"
+    )
+
+    t_ref = time_call(
+        lambda: [reference_create_pose_graph(kp) for kp in frame], args.repeats
+    )
+    t_vec = time_call(lambda: [create_pose_graph(kp) for kp in frame], args.repeats)
+
+    print(f"  Reference loop: {t_ref * 1000:9.2f} ms/frame")
+    print(f"  Vectorized:     {t_vec * 1000:9.2f} ms/frame")
+    print(f"  Speedup:        {t_ref / t_vec:9.1f}x")
+
+
+def benchmark_topology(args: argparse.Namespace) -> None:
+    """
+    Report edges per graph and end-to-end throughput for every topology mode.
+
+    End-to-end throughput covers graph construction plus a batched forward
+    pass through a randomly initialized ViolenceDetectionGNN.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    torch.manual_seed(0)
+    skeleton_links = load_skeleton_links(args.dataset_config)
+    frames = [
+        make_synthetic_frame(args.persons, args.keypoints, seed=i)
+        for i in range(args.frames)
+    ]
+    model = ViolenceDetectionGNN(in_channels=2).eval()
+
+    def run(topology: str) -> List[Data]:
+        graphs = [
+            create_pose_graph(
+                kp, topology=topology, skeleton_links=skeleton_links, knn_k=args.knn_k
+            )
+            for frame in frames
+            for kp in frame
+        ]
+        with torch.no_grad():
+            for start in range(0, len(graphs), args.batch_size):
+                batch = Batch.from_data_list(graphs[start : start + args.batch_size])
+                model(batch.x, batch.edge_index, batch.batch)
+        return graphs
+
+    num_graphs = args.frames * args.persons
+    print(f"{args.frames} frames x {args.persons} persons x {args.keypoints} keypoints")
+    print(f"{'Topology':<14}{'Edges/graph':>12}{'Graphs/s':>12}")
+    for topology in TOPOLOGY_MODES:
+        graphs = run(topology)
+        edges_per_graph = np.mean([g.num_edges for g in graphs])
+        elapsed = time_call(lambda topology=topology: run(topology), args.repeats)
+        print(f"{topology:<14}{edges_per_graph:>12.0f}{num_graphs / elapsed:>12.1f}")
+
+
+def benchmark_streaming(args: argparse.Namespace) -> None:
+    """
+    Compare peak memory of json.load and the streaming frame reader.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+
+    def load_all(json_file: Path) -> int:
+        with open(json_file, "r", encoding="utf-8") as f:
+            return len(json.load(f)["instance_info"])
+
+    def stream_all(json_file: Path) -> int:
+        return sum(1 for _ in iter_frames(json_file))
+
+    print(f"{args.persons} persons x {args.keypoints} keypoints per frame")
+    print(
+        f"{'Frames':>8}{'File MB':>10}{'json.load MB':>14}{'streaming MB':>14}"
+        f"{'json.load s':>13}{'streaming s':>13}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_frames in args.frames:
+            json_file = Path(tmp_dir) / f"results_{num_frames}.json"
+            write_synthetic_results(json_file, num_frames, args.persons, args.keypoints)
+            size_mb = json_file.stat().st_size / 2**20
+            mem_load = peak_memory(partial(load_all, json_file)) / 2**20
+            mem_stream = peak_memory(partial(stream_all, json_file)) / 2**20
+            t_load = time_call(partial(load_all, json_file), 1)
+            t_stream = time_call(partial(stream_all, json_file), 1)
+            print(
+                f"{num_frames:>8}{size_mb:>10.1f}{mem_load:>14.1f}{mem_stream:>14.1f}"
+                f"{t_load:>13.2f}{t_stream:>13.2f}"
+            )
+
+
+def benchmark_inference(args: argparse.Namespace) -> None:
+    """
+    Compare per-graph scoring against batched scoring across frames.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    torch.manual_seed(0)
+    device = torch.device("cpu")
+    model = ViolenceDetectionGNN(in_channels=2).eval()
+    frames = [
+        (frame_id, [create_pose_graph(kp) for kp in frame])
+        for frame_id, frame in enumerate(
+            make_synthetic_frame(args.persons, args.keypoints, seed=i)
+            for i in range(args.frames)
+        )
+    ]
+    num_graphs = args.frames * args.persons
+
+    def run_reference() -> List[float]:
+        return [
+            float(np.mean(reference_predict_violence(model, graphs, device)))
+            for _, graphs in frames
+        ]
+
+    def run_batched(batch_size: int) -> List[float]:
+        return [
+            score for _, score, _ in score_frames(model, frames, device, batch_size)
+        ]
+
+    reference = run_reference()
+    print(f"{args.frames} frames x {args.persons} persons x {args.keypoints} keypoints")
+    print(f"{'Mode':<16}{'Graphs/s':>12}{'Speedup':>10}{'Max |diff|':>14}")
+    t_ref = time_call(run_reference, args.repeats)
+    print(f"{'per-graph':<16}{num_graphs / t_ref:>12.1f}{1.0:>10.1f}{0.0:>14.2e}")
+    for batch_size in args.batch_sizes:
+        diff = np.max(np.abs(np.array(run_batched(batch_size)) - reference))
+        elapsed = time_call(partial(run_batched, batch_size), args.repeats)
+        print(
+            f"{'batch=' + str(batch_size):<16}{num_graphs / elapsed:>12.1f}"
+            f"{t_ref / elapsed:>10.1f}{diff:>14.2e}"
+        )
+
+
+def run_service_load(
+    scorer: StreamingScorer,
+    frames: List[List[dict]],
+    num_streams: int,
+    num_frames: int,
+    interval: float,
+) -> List[float]:
+    """
+    Submit frames from concurrent streams, one thread per stream.
+
+    Args:
+        scorer: Running StreamingScorer
+        frames: Instance lists cycled through by every stream
+        num_streams: Number of concurrent streams
+        num_frames: Frames submitted by each stream
+        interval: Seconds between frames of a stream (0 for no pacing)
+
+    Returns:
+        Seconds from submission to response of every frame
+    """
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def record(sent: float, response: dict) -> None:
+        with lock:
+            latencies.append(time.perf_counter() - sent)
+
+    def run_stream(stream_id: int, start: float) -> None:
+        for frame_id in range(num_frames):
+            delay = start + frame_id * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            message = {
+                "stream_id": stream_id,
+                "frame_id": frame_id,
+                "instances": frames[frame_id % len(frames)],
+            }
+            scorer.submit(message, partial(record, time.perf_counter()))
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_stream, args=(stream_id, start))
+        for stream_id in range(num_streams)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def benchmark_threshold(args: argparse.Namespace) -> None:
+    """
+    Compare the threshold search with the original per-threshold F1 loop.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    rng = np.random.default_rng(0)
+    print(
+        f"{'Graphs':<10}{'Reference (s)':>15}{'Search (s)':>12}{'Speedup':>10}"
+        f"{'Match':>7}{'Bootstrap (s)':>15}"
+    )
+    for num_graphs in args.sizes:
+        # Overlapping score distributions, rounded to produce tied scores
+        y_true = (rng.random(num_graphs) < 0.5).astype(np.float32)
+        y_score = np.clip(rng.normal(0.4 + 0.2 * y_true, 0.2), 0, 1)
+        y_score = np.round(y_score, 4).astype(np.float32)
+
+        expected = reference_find_optimal_threshold(y_true, y_score)
+        result = find_optimal_threshold(y_true, y_score)
+        match = expected[0] == result[0] and all(
+            np.isclose(expected[1][name], value, rtol=1e-12, atol=0)
+            for name, value in result[1].items()
+        )
+
+        t_ref = time_call(partial(reference_find_optimal_threshold, y_true, y_score), 1)
+        t_new = time_call(partial(find_optimal_threshold, y_true, y_score), 3)
+        t_boot = time_call(
+            partial(
+                bootstrap_confidence_intervals,
+                y_true,
+                y_score,
+                result[0],
+                args.bootstrap_samples,
+            ),
+            1,
+        )
+        print(
+            f"{num_graphs:<10}{t_ref:>15.3f}{t_new:>12.4f}{t_ref / t_new:>10.0f}"
+            f"{'yes' if match else 'NO':>7}{t_boot:>15.3f}"
+        )
+
+
+def benchmark_service(args: argparse.Namespace) -> None:
+    """
+    Measure streaming service latency and throughput under synthetic load.
+
+    Each stream submits frames from its own thread at a fixed frame rate, as
+    a camera connection would. Latency is measured from submission (before
+    graph construction) until the response is delivered.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    torch.manual_seed(0)
+    device = torch.device("cpu")
+    model = ViolenceDetectionGNN(in_channels=2).eval()
+    frames = [
+        [{"keypoints": keypoints.tolist()} for keypoints in frame]
+        for frame in (
+            make_synthetic_frame(args.persons, args.keypoints, seed=i)
+            for i in range(DEFAULT_FRAMES)
+        )
+    ]
+    interval = 1.0 / args.fps if args.fps > 0 else 0.0
+
+    print(
+        f"{args.streams} streams x {args.frames} frames at "
+        f"{args.fps if args.fps > 0 else 'max'} fps, "
+        f"{args.persons} persons x {args.keypoints} keypoints"
+    )
+    print(
+        f"{'Max wait (ms)':<16}{'p50 (ms)':>10}{'p99 (ms)':>10}"
+        f"{'Frames/s':>12}{'Graphs/batch':>14}"
+    )
+    for max_wait_ms in args.max_wait_ms:
+        scorer = StreamingScorer(
+            model,
+            0.5,
+            device,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=max_wait_ms,
+        ).start()
+        start = time.perf_counter()
+        latencies = run_service_load(
+            scorer, frames, args.streams, args.frames, interval
+        )
+        scorer.stop()
+        elapsed = time.perf_counter() - start
+
+        p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+        print(
+            f"{max_wait_ms:<16g}{p50:>10.2f}{p99:>10.2f}"
+            f"{scorer.num_frames / elapsed:>12.1f}"
+            f"{scorer.num_graphs / scorer.num_batches:>14.1f}"
+        )
+
+
+def benchmark_dense(args: argparse.Namespace) -> None:
+    """
+    Compare the sparse PyG forward pass with the dense engine on CPU.
+
+    The dense engine is timed both as a drop-in replacement on the same PyG
+    batch and on padded keypoints with the shared adjacency, where no graph
+    objects are built at all.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    torch.manual_seed(0)
+    model = ViolenceDetectionGNN(in_channels=2).eval()
+    skeleton_links = load_skeleton_links(args.dataset_config)
+
+    keypoints = np.stack(
+        make_synthetic_frame(args.batch_size, WHOLEBODY_KEYPOINTS, seed=0)
+    )
+    keypoints = keypoints[:, : args.keypoints]
+    skeleton_links = [
+        link for link in skeleton_links if max(link) < args.keypoints
+    ] or [[0, 1]]
+
+    print(f"{args.batch_size} graphs x {args.keypoints} keypoints, CPU")
+    print(
+        f"{'Topology':<14}{'Path':<18}{'Graphs/s':>12}{'Speedup':>10}{'Max |diff|':>14}"
+    )
+    for topology in TOPOLOGY_MODES:
+        graphs = [
+            create_pose_graph(kp, topology=topology, skeleton_links=skeleton_links)
+            for kp in keypoints
+        ]
+        batch = Batch.from_data_list(graphs)
+        dense = DenseViolenceDetectionGNN(model, topology)
+
+        runs = {
+            "sparse": partial(model, batch.x, batch.edge_index, batch.batch),
+            "dense (batch)": partial(dense, batch.x, batch.edge_index, batch.batch),
+        }
+        if topology != TOPOLOGY_SKELETON_KNN:
+            adj = dense_adjacency(args.keypoints, topology, skeleton_links)
+            x, mask, _ = dense_inputs_from_keypoints(keypoints)
+            runs["dense (keypoints)"] = partial(dense.forward_dense, x, mask, adj)
+
+        with torch.no_grad():
+            reference = runs["sparse"]()
+            t_ref = time_call(runs["sparse"], args.repeats)
+            for name, run in runs.items():
+                diff = (run() - reference).abs().max().item()
+                elapsed = t_ref if name == "sparse" else time_call(run, args.repeats)
+                print(
+                    f"{topology:<14}{name:<18}{args.batch_size / elapsed:>12.1f}"
+                    f"{t_ref / elapsed:>10.1f}{diff:>14.2e}"
+                )
+
+
+def benchmark_export(args: argparse.Namespace) -> None:
+    """
+    Compare eager PyTorch latency with the exported runtimes on CPU.
+
+    Every path starts from the same padded keypoints: the eager model also
+    builds and collates the PyG graphs, the exported models take the
+    keypoints directly.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    torch.manual_seed(0)
+    device = torch.device("cpu")
+    model = ViolenceDetectionGNN(in_channels=2).eval()
+    module = ExportableViolenceModel(DenseViolenceDetectionGNN(model), None).eval()
+    metadata = export_metadata(0.5, None, {"mode": TOPOLOGY_COMPLETE}, None)
+    example = torch.rand(2, args.keypoints, 2)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        runtimes = {}
+        for export_format in EXPORT_FORMATS:
+            path = Path(tmp_dir) / f"model.{export_format}"
+            if export_format == EXPORT_FORMAT_ONNX:
+                export_onnx(module, example, path, metadata)
+            else:
+                export_torchscript(module, example, path, metadata)
+            runtimes[export_format] = load_exported(path, export_format)
+
+        print(f"{args.keypoints} keypoints per person, complete graphs, CPU")
+        print(
+            f"{'Persons':<10}{'Runtime':<14}{'Latency (ms)':>14}"
+            f"{'Speedup':>10}{'Max |diff|':>14}"
+        )
+        for num_persons in args.batch_sizes:
+            keypoints = np.stack(
+                make_synthetic_frame(num_persons, args.keypoints, seed=num_persons)
+            ).astype(np.float32)
+
+            def run_eager(kp: np.ndarray) -> np.ndarray:
+                graphs = [create_pose_graph(k) for k in kp]
+                return np.array(predict_violence(model, graphs, device))
+
+            reference = run_eager(keypoints)
+            t_ref = time_call(partial(run_eager, keypoints), args.repeats)
+            print(
+                f"{num_persons:<10}{'eager':<14}{t_ref * 1000:>14.2f}"
+                f"{1.0:>10.1f}{0.0:>14.2e}"
+            )
+            for name, predict in runtimes.items():
+                diff = np.max(np.abs(predict(keypoints) - reference))
+                elapsed = time_call(partial(predict, keypoints), args.repeats)
+                print(
+                    f"{num_persons:<10}{name:<14}{elapsed * 1000:>14.2f}"
+                    f"{t_ref / elapsed:>10.1f}{diff:>14.2e}"
+                )
+
+
+# Cold-start probe run in a fresh interpreter: import, load, score one frame
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from pathlib import Path
+import torch
+import inference
+imported = time.perf_counter()
+model_path, runtime, json_file = Path(sys.argv[1]), sys.argv[2], Path(sys.argv[3])
+device = torch.device("cpu")
+if runtime == inference.BACKEND_ONNXRUNTIME:
+    model = inference.OnnxViolenceModel(model_path)
+    frames = inference.iter_frame_keypoints(
+        json_file,
+        topology=model.topology["mode"],
+        skeleton_links=model.skeleton_links,
+    )
+else:
+    model, _, _, topology = inference.load_model_and_threshold(model_path, device)
+    if runtime == inference.ENGINE_DENSE:
+        model = inference.DenseViolenceDetectionGNN(model, topology["mode"])
+    frames = inference.iter_frame_graphs(json_file, topology["mode"])
+loaded = time.perf_counter()
+_, graphs = next(frames)
+inference.predict_violence(model, graphs, device)
+scored = time.perf_counter()
+print(json.dumps({"import": imported - start, "load": loaded - imported,
+                  "first_score": scored - loaded}))
+"""
+
+
+def benchmark_startup(args: argparse.Namespace) -> None:
+    """
+    Measure the cold-start time to the first violence score.
+
+    Each run starts a fresh interpreter that imports inference.py, loads the
+    model and scores the first frame of a synthetic results file. The total
+    includes interpreter startup; the phases are measured inside the probe.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    torch.manual_seed(0)
+    model = ViolenceDetectionGNN(in_channels=2).eval()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = Path(tmp_dir) / "results.json"
+        write_synthetic_results(json_file, 1, args.persons, args.keypoints)
+
+        model_path = Path(tmp_dir) / "model.pt"
+        topology = {"mode": TOPOLOGY_COMPLETE, "knn_k": DEFAULT_KNN_K}
+        torch.save(build_checkpoint(model, 0.5, None, topology), model_path)
+        runtimes = {ENGINE_SPARSE: model_path, ENGINE_DENSE: model_path}
+
+        onnx_path = Path(tmp_dir) / "model.onnx"
+        module = ExportableViolenceModel(DenseViolenceDetectionGNN(model), None)
+        example = torch.rand(2, args.keypoints, 2)
+        try:
+            export_onnx(
+                module.eval(),
+                example,
+                onnx_path,
+                export_metadata(0.5, None, topology, None),
+            )
+            runtimes[BACKEND_ONNXRUNTIME] = onnx_path
+        except ImportError as e:
+            print(f"Skipping {BACKEND_ONNXRUNTIME}: {e}")
+
+        src_dir = Path(__file__).resolve().parent
+        print(f"{args.persons} persons, {args.keypoints} keypoints, CPU")
+        print(
+            f"{'Runtime':<14}{'Import (s)':>12}{'Load (s)':>10}"
+            f"{'Score (s)':>11}{'Total (s)':>11}"
+        )
+        for runtime, path in runtimes.items():
+            phases: List[Dict[str, float]] = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                output = subprocess.run(
+                    [sys.executable, "-c", STARTUP_PROBE, str(path), runtime]
+                    + [str(json_file)],
+                    cwd=src_dir,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+                total = time.perf_counter() - start
+                phases.append(dict(json.loads(output.splitlines()[-1]), total=total))
+            median = {
+                name: float(np.median([p[name] for p in phases])) for name in phases[0]
+            }
+            print(
+                f"{runtime:<14}{median['import']:>12.2f}{median['load']:>10.2f}"
+                f"{median['first_score']:>11.3f}{median['total']:>11.2f}"
+            )
+
+
+def benchmark_loader(args: argparse.Namespace) -> None:
+    """
+    Compare training epoch times for the batch loading configurations.
+
+    The graphs come from a graph cache built from synthetic results files, so
+    batches are collated from the memory-mapped store as in train.py. The
+    baseline collates in the training process, without prefetching.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    torch.manual_seed(0)
+    device = torch.device("cpu")
+    model = ViolenceDetectionGNN(in_channels=2)
+    optimizer = torch.optim.Adam(model.parameters())
+
+    def run_epoch(loader: DevicePrefetcher) -> None:
+        model.train()
+        for batch in loader:
+            optimizer.zero_grad()
+            out = model(batch.x, batch.edge_index, batch.batch)
+            F.binary_cross_entropy(out, batch.y.view(-1, 1)).backward()
+            optimizer.step()
+
+    configs = [("in-process", 0, 0), ("prefetch thread", 0, PREFETCH_BATCHES)]
+    configs += [
+        (f"{workers} workers + prefetch", workers, PREFETCH_BATCHES)
+        for workers in args.workers
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        graphs = build_synthetic_cache(
+            Path(tmp_dir), args.frames, args.persons, args.keypoints
+        )
+
+        print(
+            f"{len(graphs)} graphs x {args.keypoints} keypoints, "
+            f"batch size {args.batch_size}, CPU"
+        )
+        print(f"{'Loader':<24}{'s/epoch':>10}{'Graphs/s':>12}{'Speedup':>10}")
+        baseline = None
+        for name, workers, prefetch in configs:
+            loader = make_loader(
+                graphs,
+                args.batch_size,
+                device,
+                shuffle=True,
+                num_workers=workers,
+                prefetch_batches=prefetch,
+            )
+            elapsed = time_call(partial(run_epoch, loader), args.repeats)
+            baseline = baseline or elapsed
+            print(
+                f"{name:<24}{elapsed:>10.3f}{len(graphs) / elapsed:>12.0f}"
+                f"{baseline / elapsed:>10.2f}"
+            )
+            del loader  # Shuts down persistent workers
+
+
+def benchmark_collate(args: argparse.Namespace) -> None:
+    """
+    Compare memory and collation time of Data object lists and packed arrays.
+
+    Three ways of producing the same batches are timed: a list of per-graph
+    Data objects with Batch.from_data_list (the in-memory training set),
+    graphs rebuilt one by one from the graph cache with Batch.from_data_list,
+    and whole-batch collation from the packed arrays.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        graphs = build_synthetic_cache(
+            Path(tmp_dir), args.frames, args.persons, args.keypoints
+        )
+        packed = PackedGraphDataset(
+            {name: np.array(getattr(graphs, name)) for name in STORE_ARRAYS},
+            graphs.topology,
+        )
+        data_list: List[Data] = []
+
+        def build_data_list() -> None:
+            data_list.extend(graphs[i] for i in range(len(graphs)))
+
+        # Tensor storage is not allocated on the Python heap, so it is added
+        object_bytes = peak_memory(build_data_list)
+        tensor_bytes = sum(
+            value.untyped_storage().nbytes()
+            for graph in data_list
+            for value in graph.to_dict().values()
+        )
+        list_mb = (object_bytes + tensor_bytes) / 2**20
+        packed_mb = sum(getattr(packed, n).nbytes for n in STORE_ARRAYS) / 2**20
+
+        order = np.random.default_rng(0).permutation(len(graphs))
+        batches = [
+            order[start : start + args.batch_size].tolist()
+            for start in range(0, len(order), args.batch_size)
+        ]
+        runs = {
+            "Data list": lambda: [
+                Batch.from_data_list([data_list[i] for i in b]) for b in batches
+            ],
+            "cache per graph": lambda: [
+                Batch.from_data_list([graphs[i] for i in b]) for b in batches
+            ],
+            "packed arrays": lambda: [packed.__getitems__(b) for b in batches],
+        }
+
+        print(
+            f"{len(graphs)} graphs x {args.keypoints} keypoints, "
+            f"batch size {args.batch_size}"
+        )
+        print(f"Memory: Data list {list_mb:.1f} MB, packed arrays {packed_mb:.1f} MB")
+        print(f"{'Collation':<18}{'Graphs/s':>12}{'Speedup':>10}")
+        t_ref = time_call(runs["Data list"], args.repeats)
+        for name, run in runs.items():
+            elapsed = t_ref if name == "Data list" else time_call(run, args.repeats)
+            print(f"{name:<18}{len(graphs) / elapsed:>12.0f}{t_ref / elapsed:>10.1f}")
+
+
+def benchmark_subsets(args: argparse.Namespace) -> None:
+    """
+    Report dataset memory and throughput for every keypoint subset.
+
+    The same synthetic wholebody results are ingested once per subset into a
+    graph cache. Ingestion covers JSON parsing and graph construction; model
+    throughput covers batch collation from the packed arrays plus a forward
+    pass through a randomly initialized ViolenceDetectionGNN.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    torch.manual_seed(0)
+    try:
+        subsets = {spec: resolve_keypoint_subset(spec) for spec in args.subsets}
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    skeleton_links = load_skeleton_links(args.dataset_config)
+    model = ViolenceDetectionGNN(in_channels=2).eval()
+
+    def run(graphs: PackedGraphDataset, batches: List[np.ndarray]) -> None:
+        with torch.no_grad():
+            for indices in batches:
+                batch = graphs.__getitems__(indices)
+                model(batch.x, batch.edge_index, batch.batch)
+
+    print(
+        f"{args.frames} frames x {args.persons} persons x {args.keypoints} "
+        f"keypoints, {args.topology} topology"
+    )
+    print(
+        f"{'Subset':<14}{'Keypoints':>10}{'Edges/graph':>12}{'Dataset MB':>12}"
+        f"{'Ingest/s':>10}{'Graphs/s':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        for label in ("violent", "non-violent"):
+            (root / label).mkdir()
+            write_synthetic_results(
+                root / label / "results_0.json",
+                args.frames,
+                args.persons,
+                args.keypoints,
+                skeleton_links,
+            )
+
+        for i, (spec, subset) in enumerate(subsets.items()):
+            start = time.perf_counter()
+            try:
+                graphs = build_graph_cache(
+                    [(root / "violent", root / "non-violent")],
+                    root / f"cache_{i}",
+                    topology=args.topology,
+                    knn_k=args.knn_k,
+                    keypoint_subset=subset,
+                )
+            except ValueError as e:
+                print(f"{spec:<14}Error: {e}")
+                continue
+            ingest_time = time.perf_counter() - start
+
+            node_counts = np.diff(graphs.node_ptr)
+            if args.topology == TOPOLOGY_COMPLETE:
+                edges_per_graph = np.mean(node_counts * (node_counts - 1))
+            else:
+                edges_per_graph = 2 * np.mean(np.diff(graphs.pair_ptr))
+            dataset_mb = sum(getattr(graphs, n).nbytes for n in STORE_ARRAYS) / 2**20
+            batches = [
+                np.arange(first, min(first + args.batch_size, len(graphs)))
+                for first in range(0, len(graphs), args.batch_size)
+            ]
+            elapsed = time_call(partial(run, graphs, batches), args.repeats)
+            num_keypoints = args.keypoints if subset is None else len(subset)
+            print(
+                f"{spec[:13]:<14}{num_keypoints:>10}{edges_per_graph:>12.0f}"
+                f"{dataset_mb:>12.2f}{len(graphs) / ingest_time:>10.0f}"
+                f"{len(graphs) / elapsed:>10.0f}"
+            )
+
+
+def benchmark_confidence(args: argparse.Namespace) -> None:
+    """
+    Compare ingestion and scoring time with and without confidence filtering.
+
+    The synthetic results have uniformly random keypoint and bounding box
+    scores. Ingestion covers JSON parsing and graph construction of one file;
+    scoring covers batched inference of its graphs with a randomly
+    initialized ViolenceDetectionGNN.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    torch.manual_seed(0)
+    try:
+        confidence = make_confidence_filter(
+            args.min_instance_score,
+            args.min_bbox_score,
+            args.max_persons,
+            args.min_keypoint_score,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    model = ViolenceDetectionGNN(in_channels=2).eval()
+    device = torch.device("cpu")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = Path(tmp_dir) / "results.json"
+        write_synthetic_results(json_file, args.frames, args.persons, args.keypoints)
+
+        print(
+            f"{args.frames} frames x {args.persons} persons x {args.keypoints} "
+            f"keypoints; filter {confidence}"
+        )
+        print(
+            f"{'Filter':<10}{'Graphs':>8}{'Ingest ms':>11}{'Score ms':>10}"
+            f"{'Speedup':>9}"
+        )
+        t_ref = None
+        for name, setting in (("none", None), ("filtered", confidence)):
+            ingest = partial(load_graph_arrays, json_file, confidence=setting)
+            graphs = graphs_from_arrays(ingest())
+            t_ingest = time_call(ingest, args.repeats)
+            t_score = time_call(
+                lambda graphs=graphs: predict_violence(
+                    model, graphs, device, args.batch_size
+                ),
+                args.repeats,
+            )
+            if t_ref is None:
+                t_ref = t_ingest + t_score
+            print(
+                f"{name:<10}{len(graphs):>8}{t_ingest * 1e3:>11.1f}"
+                f"{t_score * 1e3:>10.1f}{t_ref / (t_ingest + t_score):>9.2f}"
+            )
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the benchmark script.
+
+    Returns:
+        Parsed command-line arguments
+    """
+    parser = argparse.ArgumentParser(description="Violence detection benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    graph_parser = subparsers.add_parser("graph", help="Graph construction throughput")
+    graph_parser.add_argument(
+        "--persons",
+        type=int,
+        default=DEFAULT_PERSONS,
+        help=f"Persons per frame (default: {DEFAULT_PERSONS})",
+    )
+    graph_parser.add_argument(
+        "--keypoints",
+        type=int,
+        default=WHOLEBODY_KEYPOINTS,
+        help=f"Keypoints per person (default: {WHOLEBODY_KEYPOINTS})",
+    )
+    graph_parser.add_argument(
+        "--repeats",
+        type=int,
+        default=DEFAULT_REPEATS,
+        help=f"Timed repetitions (default: {DEFAULT_REPEATS})",
+    )
+    graph_parser.set_defaults(func=benchmark_graph_construction)
+
+    topology_parser = subparsers.add_parser(
+        "topology", help="Edges per graph and throughput for each topology"
+    )
+    topology_parser.add_argument("--persons", type=int, default=DEFAULT_PERSONS)
+    topology_parser.add_argument("--keypoints", type=int, default=WHOLEBODY_KEYPOINTS)
+    topology_parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    topology_parser.add_argument("--knn_k", type=int, default=DEFAULT_KNN_K)
+    topology_parser.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE)
+    topology_parser.add_argument("--repeats", type=int, default=3)
+    topology_parser.add_argument(
+        "--dataset_config",
+        type=Path,
+        default=WHOLEBODY_DATASET_CONFIG,
+        help="MMPose dataset config providing the skeleton links",
+    )
+    topology_parser.set_defaults(func=benchmark_topology)
+
+    stream_parser = subparsers.add_parser(
+        "stream", help="Peak memory of whole-file vs. streaming JSON parsing"
+    )
+    stream_parser.add_argument("--persons", type=int, default=4)
+    stream_parser.add_argument("--keypoints", type=int, default=WHOLEBODY_KEYPOINTS)
+    stream_parser.add_argument(
+        "--frames",
+        type=int,
+        nargs="+",
+        default=[100, 400, 1600],
+        help="Video lengths to compare (default: 100 400 1600)",
+    )
+    stream_parser.set_defaults(func=benchmark_streaming)
+
+    inference_parser = subparsers.add_parser(
+        "inference", help="Per-graph vs. batched scoring of a multi-person video"
+    )
+    inference_parser.add_argument("--persons", type=int, default=20)
+    inference_parser.add_argument("--keypoints", type=int, default=17)
+    inference_parser.add_argument("--frames", type=int, default=100)
+    inference_parser.add_argument(
+        "--batch_sizes", type=int, nargs="+", default=[32, 256, 1024]
+    )
+    inference_parser.add_argument("--repeats", type=int, default=3)
+    inference_parser.set_defaults(func=benchmark_inference)
+
+    threshold_parser = subparsers.add_parser(
+        "threshold", help="Single-sort threshold search vs. per-threshold F1 loop"
+    )
+    threshold_parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 4000, 16000]
+    )
+    threshold_parser.add_argument("--bootstrap_samples", type=int, default=1000)
+    threshold_parser.set_defaults(func=benchmark_threshold)
+
+    service_parser = subparsers.add_parser(
+        "service", help="Streaming service latency under multi-stream load"
+    )
+    service_parser.add_argument("--streams", type=int, default=8)
+    service_parser.add_argument("--frames", type=int, default=150)
+    service_parser.add_argument(
+        "--fps",
+        type=float,
+        default=30.0,
+        help="Frames per second per stream, 0 for as fast as possible",
+    )
+    service_parser.add_argument("--persons", type=int, default=4)
+    service_parser.add_argument("--keypoints", type=int, default=17)
+    service_parser.add_argument(
+        "--max_batch_size", type=int, default=DEFAULT_MAX_BATCH_SIZE
+    )
+    service_parser.add_argument(
+        "--max_wait_ms",
+        type=float,
+        nargs="+",
+        default=[0.0, 5.0, 20.0],
+        help="Micro-batching delays to compare (default: 0 5 20)",
+    )
+    service_parser.set_defaults(func=benchmark_service)
+
+    dense_parser = subparsers.add_parser(
+        "dense", help="Sparse vs. dense execution of the model on CPU"
+    )
+    dense_parser.add_argument("--batch_size", type=int, default=256)
+    dense_parser.add_argument("--keypoints", type=int, default=17)
+    dense_parser.add_argument("--repeats", type=int, default=5)
+    dense_parser.add_argument(
+        "--dataset_config",
+        type=Path,
+        default=WHOLEBODY_DATASET_CONFIG,
+        help="MMPose dataset config providing the skeleton links",
+    )
+    dense_parser.set_defaults(func=benchmark_dense)
+
+    export_parser = subparsers.add_parser(
+        "export", help="Eager PyTorch vs. exported TorchScript and ONNX latency"
+    )
+    export_parser.add_argument("--keypoints", type=int, default=17)
+    export_parser.add_argument(
+        "--batch_sizes", type=int, nargs="+", default=[1, 8, 64, 256]
+    )
+    export_parser.add_argument("--repeats", type=int, default=10)
+    export_parser.set_defaults(func=benchmark_export)
+
+    startup_parser = subparsers.add_parser(
+        "startup", help="Cold-start time to the first score per backend"
+    )
+    startup_parser.add_argument("--persons", type=int, default=DEFAULT_PERSONS)
+    startup_parser.add_argument("--keypoints", type=int, default=17)
+    startup_parser.add_argument("--repeats", type=int, default=3)
+    startup_parser.set_defaults(func=benchmark_startup)
+
+    loader_parser = subparsers.add_parser(
+        "loader", help="Training epoch time with loader workers and prefetching"
+    )
+    loader_parser.add_argument("--frames", type=int, default=500)
+    loader_parser.add_argument("--persons", type=int, default=DEFAULT_PERSONS)
+    loader_parser.add_argument("--keypoints", type=int, default=17)
+    loader_parser.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE)
+    loader_parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4],
+        help="Worker process counts to compare (default: 1 2 4)",
+    )
+    loader_parser.add_argument("--repeats", type=int, default=3)
+    loader_parser.set_defaults(func=benchmark_loader)
+
+    collate_parser = subparsers.add_parser(
+        "collate", help="Memory and collation time of Data lists vs. packed arrays"
+    )
+    collate_parser.add_argument("--frames", type=int, default=2000)
+    collate_parser.add_argument("--persons", type=int, default=DEFAULT_PERSONS)
+    collate_parser.add_argument("--keypoints", type=int, default=17)
+    collate_parser.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE)
+    collate_parser.add_argument("--repeats", type=int, default=3)
+    collate_parser.set_defaults(func=benchmark_collate)
+
+    subsets_parser = subparsers.add_parser(
+        "subsets", help="Dataset memory and throughput for each keypoint subset"
+    )
+    subsets_parser.add_argument(
+        "--subsets",
+        type=str,
+        nargs="+",
+        default=list(KEYPOINT_SUBSETS),
+        help="Subset names or index lists to compare (default: all presets)",
+    )
+    subsets_parser.add_argument(
+        "--topology", type=str, choices=TOPOLOGY_MODES, default=TOPOLOGY_COMPLETE
+    )
+    subsets_parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    subsets_parser.add_argument("--persons", type=int, default=DEFAULT_PERSONS)
+    subsets_parser.add_argument("--keypoints", type=int, default=WHOLEBODY_KEYPOINTS)
+    subsets_parser.add_argument("--knn_k", type=int, default=DEFAULT_KNN_K)
+    subsets_parser.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE)
+    subsets_parser.add_argument("--repeats", type=int, default=3)
+    subsets_parser.add_argument(
+        "--dataset_config",
+        type=Path,
+        default=WHOLEBODY_DATASET_CONFIG,
+        help="MMPose dataset config providing the skeleton links",
+    )
+    subsets_parser.set_defaults(func=benchmark_subsets)
+
+    confidence_parser = subparsers.add_parser(
+        "confidence", help="Ingestion and scoring time with confidence filtering"
+    )
+    confidence_parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    confidence_parser.add_argument("--persons", type=int, default=DEFAULT_PERSONS)
+    confidence_parser.add_argument("--keypoints", type=int, default=17)
+    confidence_parser.add_argument("--min_instance_score", type=float, default=0.5)
+    confidence_parser.add_argument(
+        "--min_bbox_score",
+        type=float,
+        default=DEFAULT_CONFIDENCE_FILTER["min_bbox_score"],
+    )
+    confidence_parser.add_argument("--max_persons", type=int, default=4)
+    confidence_parser.add_argument("--min_keypoint_score", type=float, default=0.3)
+    confidence_parser.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE)
+    confidence_parser.add_argument("--repeats", type=int, default=3)
+    confidence_parser.set_defaults(func=benchmark_confidence)
+
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the selected benchmark."""
+    args = parse_arguments()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
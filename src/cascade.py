@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Confidence-gated cascade of a cheap prefilter and the full model.
+
+Most person graphs are clearly non-violent (or clearly violent), and for them
+the GCN, GAT, GIN and transformer stack of ViolenceDetectionGNN adds nothing.
+The cascade scores every graph with a small MLP on pose statistics first and
+only runs the full model on the graphs it is unsure about:
+- Scale- and order-invariant pose features (keypoint spread, orientation,
+  bounding box and pairwise-distance statistics), computed for a whole batch
+  at once
+- A prefilter MLP with the (x, edge_index, batch) signature of the full
+  model, so the regular training loop trains it
+- An uncertainty band on the prefilter score, calibrated on validation data
+  so that the cascade keeps a target recall
+- A cascade model that scores lists of graphs for inference.py
+
+Graphs outside the band keep the prefilter decision. Their prefilter score is
+mapped linearly onto the part of the model's score range on the same side of
+the classification threshold, so frame averages and interpretations stay on
+the scale of the full model.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from model import ViolenceDetectionGNN
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Data
+
+# Constants for the cascade
+PREFILTER_HIDDEN_CHANNELS = 32
+NUM_PREFILTER_FEATURES = 11
+DEFAULT_TARGET_RECALL = 0.95
+CALIBRATION_CANDIDATES = 200  # Prefilter score quantiles tried as band edges
+DEFAULT_CASCADE_PATH = "cascade.pt"
+MIN_SCALE = 1e-6  # Smallest pose scale, for degenerate (collapsed) poses
+
+
+def pose_features(x: torch.Tensor, batch: torch.Tensor) -> torch.Tensor:
+    """
+    Compute scale- and order-invariant statistics of a batch of poses.
+
+    Only the valid keypoints of a pose are graph nodes and their keypoint
+    indices are not kept, so the features do not depend on the node order.
+    Lengths are expressed in units of the pose's RMS radius.
+
+    Args:
+        x: Keypoint coordinates [num_nodes, 2]
+        batch: Batch assignment for nodes [num_nodes]
+
+    Returns:
+        Features [num_graphs, NUM_PREFILTER_FEATURES]: log node count, log
+        scale, x variance share, covariance, bounding box width and height,
+        largest radius and mean, std, min and max pairwise distance
+    """
+    from torch_geometric.utils import to_dense_batch
+
+    points, mask = to_dense_batch(x, batch)
+    weights = mask.unsqueeze(-1).to(points.dtype)
+    num_nodes = mask.sum(dim=1).to(points.dtype)
+
+    centroid = (points * weights).sum(dim=1) / num_nodes.unsqueeze(-1)
+    offsets = (points - centroid.unsqueeze(1)) * weights
+    var_x = offsets[..., 0].pow(2).sum(dim=1) / num_nodes
+    var_y = offsets[..., 1].pow(2).sum(dim=1) / num_nodes
+    cov_xy = (offsets[..., 0] * offsets[..., 1]).sum(dim=1) / num_nodes
+    scale_sq = (var_x + var_y).clamp_min(MIN_SCALE**2)
+    scale = scale_sq.sqrt()
+    unit = offsets / scale.view(-1, 1, 1)
+
+    # Padding must not win the extrema
+    inf = torch.finfo(points.dtype).max
+    lowest = unit.masked_fill(~mask.unsqueeze(-1), inf).amin(dim=1)
+    highest = unit.masked_fill(~mask.unsqueeze(-1), -inf).amax(dim=1)
+    radius = unit.norm(dim=-1).amax(dim=1)
+
+    distances = torch.cdist(unit, unit)
+    pair_mask = mask.unsqueeze(1) & mask.unsqueeze(2)
+    pair_mask &= ~torch.eye(mask.size(1), dtype=torch.bool, device=mask.device)
+    num_pairs = num_nodes * (num_nodes - 1)
+    pair_values = distances * pair_mask
+    mean_distance = pair_values.sum(dim=(1, 2)) / num_pairs
+    mean_sq_distance = pair_values.pow(2).sum(dim=(1, 2)) / num_pairs
+    std_distance = (mean_sq_distance - mean_distance.pow(2)).clamp_min(0).sqrt()
+    min_distance = distances.masked_fill(~pair_mask, inf).amin(dim=(1, 2))
+    max_distance = distances.masked_fill(~pair_mask, -inf).amax(dim=(1, 2))
+
+    return torch.stack(
+        [
+            num_nodes.log(),
+            scale.log(),
+            var_x / scale_sq,
+            cov_xy / scale_sq,
+            highest[:, 0] - lowest[:, 0],
+            highest[:, 1] - lowest[:, 1],
+            radius,
+            mean_distance,
+            std_distance,
+            min_distance,
+            max_distance,
+        ],
+        dim=1,
+    )
+
+
+class PrefilterMLP(nn.Module):
+    """
+    Small MLP scoring poses from their summary statistics.
+
+    The features are standardized with statistics of the training set, which
+    are stored as buffers so they travel with the weights.
+    """
+
+    def __init__(self, hidden_channels: int = PREFILTER_HIDDEN_CHANNELS):
+        """
+        Initialize the prefilter.
+
+        Args:
+            hidden_channels: Size of the hidden layers
+        """
+        super(PrefilterMLP, self).__init__()
+
+        # Constructor arguments, saved with the cascade to rebuild the model
+        self.config = {"hidden_channels": hidden_channels}
+
+        self.register_buffer("feature_mean", torch.zeros(NUM_PREFILTER_FEATURES))
+        self.register_buffer("feature_std", torch.ones(NUM_PREFILTER_FEATURES))
+        self.mlp = nn.Sequential(
+            nn.Linear(NUM_PREFILTER_FEATURES, hidden_channels),
+            nn.ReLU(),
+            nn.Linear(hidden_channels, hidden_channels),
+            nn.ReLU(),
+            nn.Linear(hidden_channels, 1),
+        )
+
+    def set_feature_statistics(self, features: torch.Tensor) -> None:
+        """
+        Standardize features with the statistics of a training set.
+
+        Args:
+            features: Pose features of the training graphs
+                      [num_graphs, NUM_PREFILTER_FEATURES]
+        """
+        self.feature_mean.copy_(features.mean(dim=0))
+        self.feature_std.copy_(features.std(dim=0).clamp_min(MIN_SCALE))
+
+    def forward(
+        self,
+        x: torch.Tensor,
+        edge_index: Optional[torch.Tensor],
+        batch: torch.Tensor,
+    ) -> torch.Tensor:
+        """
+        Score a batch of poses.
+
+        Args:
+            x: Keypoint coordinates [num_nodes, 2]
+            edge_index: Unused; the features do not depend on the edges
+            batch: Batch assignment for nodes [num_nodes]
+
+        Returns:
+            Violence score between 0 and 1 [batch_size, 1]
+        """
+        features = (pose_features(x, batch) - self.feature_mean) / self.feature_std
+        return torch.sigmoid(self.mlp(features))
+
+
+def gate_masks(
+    prefilter_scores: np.ndarray, low: float, high: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split graphs by where their prefilter score falls relative to the band.
+
+    Args:
+        prefilter_scores: Prefilter scores [num_graphs]
+        low: Lower band edge; scores below it are decided non-violent
+        high: Upper band edge; scores above it are decided violent
+
+    Returns:
+        Tuple of (decided non-violent mask, decided violent mask)
+    """
+    return prefilter_scores < low, prefilter_scores > high
+
+
+def cascade_scores(
+    prefilter_scores: np.ndarray,
+    model_scores: np.ndarray,
+    low: float,
+    high: float,
+    threshold: float,
+) -> np.ndarray:
+    """
+    Combine prefilter and model scores as the cascade does.
+
+    Args:
+        prefilter_scores: Prefilter scores [num_graphs]
+        model_scores: Full model scores [num_graphs] (only read inside the band)
+        low: Lower band edge
+        high: Upper band edge
+        threshold: Classification threshold of the full model
+
+    Returns:
+        Cascade scores [num_graphs] on the scale of the full model
+    """
+    below, above = gate_masks(prefilter_scores, low, high)
+    scores = np.array(model_scores, dtype=np.float64)
+    # Decided graphs keep their side of the threshold
+    scores[below] = prefilter_scores[below] / low * threshold
+    scores[above] = threshold + (prefilter_scores[above] - high) / (1 - high) * (
+        1 - threshold
+    )
+    return scores
+
+
+def calibrate_band(
+    prefilter_scores: np.ndarray,
+    model_scores: np.ndarray,
+    targets: np.ndarray,
+    threshold: float,
+    target_recall: float = DEFAULT_TARGET_RECALL,
+    num_candidates: int = CALIBRATION_CANDIDATES,
+) -> Tuple[float, float, Dict[str, float]]:
+    """
+    Choose the widest gating that keeps the cascade's recall and precision.
+
+    Band edges are tried at quantiles of the prefilter scores. Among the
+    bands whose cascade recall is at least target_recall and whose precision
+    is at least that of the full model alone, the one deciding the most
+    graphs without the full model wins. Counts for all candidate pairs come
+    from prefix sums over the graphs sorted by prefilter score.
+
+    Args:
+        prefilter_scores: Prefilter scores of validation graphs [num_graphs]
+        model_scores: Full model scores of the same graphs [num_graphs]
+        targets: Binary labels [num_graphs]
+        threshold: Classification threshold of the full model
+        target_recall: Smallest acceptable recall of the cascade
+        num_candidates: Quantiles tried for each band edge
+
+    Returns:
+        Tuple of (low, high, validation statistics of the chosen band); a
+        band of (0, 1) sends every graph to the full model
+
+    Raises:
+        ValueError: If the validation graphs contain no violent example
+    """
+    targets = np.asarray(targets) > 0.5
+    num_positive = int(targets.sum())
+    if num_positive == 0:
+        raise ValueError("Calibration needs violent validation graphs")
+
+    order = np.argsort(prefilter_scores, kind="stable")
+    sorted_scores = prefilter_scores[order]
+    positive = targets[order]
+    model_positive = model_scores[order] >= threshold
+
+    def prefix(values: np.ndarray) -> np.ndarray:
+        return np.concatenate([[0], np.cumsum(values, dtype=np.int64)])
+
+    model_tp = prefix(model_positive & positive)
+    model_fp = prefix(model_positive & ~positive)
+    labels_pos = prefix(positive)
+    labels_neg = prefix(~positive)
+    n = len(sorted_scores)
+
+    # Edges at the quantiles; 0 and 1 leave that side ungated
+    quantiles = np.unique(np.quantile(sorted_scores, np.linspace(0, 1, num_candidates)))
+    lows = np.concatenate([[0.0], quantiles])
+    highs = np.concatenate([quantiles, [1.0]])
+    # Graphs decided below low are the first i, above high the last n - k
+    i = np.searchsorted(sorted_scores, lows, side="left")[:, None]
+    k = np.searchsorted(sorted_scores, highs, side="right")[None, :]
+    valid = (lows[:, None] <= highs[None, :]) & (i <= k)
+    k = np.maximum(k, i)
+
+    # Band graphs keep the model decision, graphs above it are called violent
+    tp = (model_tp[k] - model_tp[i]) + (labels_pos[n] - labels_pos[k])
+    fp = (model_fp[k] - model_fp[i]) + (labels_neg[n] - labels_neg[k])
+    recall = tp / num_positive
+    precision = np.divide(tp, tp + fp, out=np.zeros(tp.shape), where=tp + fp > 0)
+    decided = (i + (n - k)) / n
+
+    model_tp_total = model_tp[n]
+    model_fp_total = model_fp[n]
+    model_precision = (
+        model_tp_total / (model_tp_total + model_fp_total)
+        if model_tp_total + model_fp_total
+        else 0.0
+    )
+    feasible = valid & (recall >= target_recall) & (precision >= model_precision)
+
+    if feasible.any():
+        best = np.unravel_index(
+            np.argmax(np.where(feasible, decided, -1)), decided.shape
+        )
+        low, high = float(lows[best[0]]), float(highs[best[1]])
+        stats = {
+            "recall": float(recall[best]),
+            "precision": float(precision[best]),
+            "full_model_fraction": float(1 - decided[best]),
+        }
+    else:
+        # Not even the full model reaches the target; gate nothing
+        low, high = 0.0, 1.0
+        stats = {
+            "recall": model_tp_total / num_positive,
+            "precision": float(model_precision),
+            "full_model_fraction": 1.0,
+        }
+    stats.update(
+        model_recall=model_tp_total / num_positive, model_precision=model_precision
+    )
+    return low, high, {name: float(value) for name, value in stats.items()}
+
+
+class CascadeModel:
+    """
+    Prefilter and full model scoring lists of pose graphs together.
+
+    Used by inference.py in place of the full model. Counts how many graphs
+    needed the full model, for reporting.
+    """
+
+    def __init__(
+        self,
+        prefilter: PrefilterMLP,
+        model: ViolenceDetectionGNN,
+        low: float,
+        high: float,
+        threshold: float,
+    ):
+        """
+        Combine the two stages.
+
+        Args:
+            prefilter: Trained prefilter
+            model: Full model (or its dense engine)
+            low: Lower band edge of the prefilter score
+            high: Upper band edge of the prefilter score
+            threshold: Classification threshold of the full model
+        """
+        self.prefilter = prefilter.eval()
+        self.model = model.eval()
+        self.low = low
+        self.high = high
+        self.threshold = threshold
+        self.num_graphs = 0
+        self.num_model_graphs = 0
+
+    def predict(self, graphs: List[Data], device: torch.device) -> torch.Tensor:
+        """
+        Score graphs with the prefilter, and the uncertain ones with the model.
+
+        Args:
+            graphs: Pose graphs
+            device: Device to run inference on
+
+        Returns:
+            Violence scores on the CPU as float64 [num_graphs]
+        """
+        from torch_geometric.data import Batch
+
+        sizes = torch.tensor([graph.num_nodes for graph in graphs])
+        x = torch.cat([graph.x for graph in graphs]).to(device)
+        batch = torch.repeat_interleave(torch.arange(len(graphs)), sizes).to(device)
+        prefilter_scores = self.prefilter(x, None, batch).view(-1).cpu().double()
+
+        below, above = gate_masks(prefilter_scores.numpy(), self.low, self.high)
+        uncertain = np.flatnonzero(~below & ~above)
+        model_scores = torch.zeros(len(graphs), dtype=torch.float64)
+        if len(uncertain):
+            model_batch = Batch.from_data_list([graphs[i] for i in uncertain])
+            model_batch = model_batch.to(device)
+            out = self.model(model_batch.x, model_batch.edge_index, model_batch.batch)
+            model_scores[uncertain] = out.view(-1).cpu().double()
+
+        self.num_graphs += len(graphs)
+        self.num_model_graphs += len(uncertain)
+        return torch.from_numpy(
+            cascade_scores(
+                prefilter_scores.numpy(),
+                model_scores.numpy(),
+                self.low,
+                self.high,
+                self.threshold,
+            )
+        )
+
+
+def load_cascade(
+    cascade_path: Path,
+    model: ViolenceDetectionGNN,
+    threshold: float,
+    device: torch.device,
+) -> Tuple[CascadeModel, Dict[str, Any]]:
+    """
+    Load a prefilter and its band written by train_cascade.py.
+
+    Args:
+        cascade_path: Cascade file
+        model: Full model the cascade was calibrated for
+        threshold: Classification threshold used for inference
+        device: Device of the prefilter
+
+    Returns:
+        Tuple of (cascade model, cascade file contents without the weights)
+    """
+    checkpoint = torch.load(cascade_path, map_location="cpu", weights_only=False)
+    prefilter = PrefilterMLP(**checkpoint["prefilter_config"])
+    prefilter.load_state_dict(checkpoint.pop("prefilter_state_dict"))
+    band = checkpoint["band"]
+    cascade = CascadeModel(
+        prefilter.to(device), model, band["low"], band["high"], threshold
+    )
+    return cascade, checkpoint
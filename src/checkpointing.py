@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Resumable training state and early stopping for the training loop.
+
+An interrupted training run should not lose its progress, and epochs after
+the validation AUC has plateaued are wasted compute. This module provides:
+- Early stopping on the validation AUC with a patience, keeping the weights
+  of the best epoch
+- Periodic training-state files with the model, optimizer, RNG and metrics
+  state, written atomically
+- Restoring that state, so a restarted run continues where it stopped, but
+  only with the same run configuration (data, topology, optimizer settings)
+
+The training-state file is separate from the model checkpoint written at the
+end of train.py, which keeps the format read by inference.py.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from model import ViolenceDetectionGNN
+
+# Constants for checkpointing
+TRAINING_STATE_NAME = "training_state.pt"
+TRAINING_STATE_VERSION = 2
+CHECKPOINT_INTERVAL = 1  # Epochs between training-state files
+EARLY_STOPPING_PATIENCE = 10  # Epochs without improvement (0 disables)
+EARLY_STOPPING_MIN_DELTA = 1e-4  # Smallest val AUC gain counted as improvement
+
+
+class EarlyStopping:
+    """
+    Track the best validation AUC and decide when to stop training.
+
+    The weights of the best epoch are kept in memory, so the final model can
+    be the best one rather than the last one.
+    """
+
+    def __init__(
+        self,
+        patience: int = EARLY_STOPPING_PATIENCE,
+        min_delta: float = EARLY_STOPPING_MIN_DELTA,
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            patience: Epochs without improvement before stopping, 0 never stops
+            min_delta: Smallest increase of the score counted as improvement
+        """
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best_score = float("-inf")
+        self.best_epoch = -1
+        self.best_state: Optional[Dict[str, torch.Tensor]] = None
+        self.bad_epochs = 0
+
+    @property
+    def should_stop(self) -> bool:
+        """Whether the patience has run out."""
+        return self.patience > 0 and self.bad_epochs >= self.patience
+
+    def step(self, score: float, model: ViolenceDetectionGNN, epoch: int) -> bool:
+        """
+        Record the validation score of an epoch.
+
+        Args:
+            score: Validation AUC of the epoch
+            model: Model after the epoch
+            epoch: Zero-based epoch index
+
+        Returns:
+            True if the epoch is the new best one
+        """
+        if score > self.best_score + self.min_delta:
+            self.best_score = score
+            self.best_epoch = epoch
+            self.best_state = {
+                name: value.detach().clone()
+                for name, value in model.state_dict().items()
+            }
+            self.bad_epochs = 0
+            return True
+        self.bad_epochs += 1
+        return False
+
+    def restore_best(self, model: ViolenceDetectionGNN) -> None:
+        """
+        Load the weights of the best epoch into a model.
+
+        Args:
+            model: Model to update in place
+        """
+        if self.best_state is not None:
+            model.load_state_dict(self.best_state)
+
+    def state_dict(self) -> Dict[str, Any]:
+        """Return the tracker state for a training-state file."""
+        return {
+            "best_score": self.best_score,
+            "best_epoch": self.best_epoch,
+            "best_state": self.best_state,
+            "bad_epochs": self.bad_epochs,
+        }
+
+    def load_state_dict(self, state: Dict[str, Any]) -> None:
+        """
+        Restore the tracker state.
+
+        Args:
+            state: Dictionary returned by state_dict
+        """
+        self.best_score = state["best_score"]
+        self.best_epoch = state["best_epoch"]
+        self.best_state = state["best_state"]
+        self.bad_epochs = state["bad_epochs"]
+
+
+def _rng_state() -> Dict[str, Any]:
+    """Capture the random number generator states that affect training."""
+    return {
+        "torch": torch.get_rng_state(),
+        "cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else [],
+        "numpy": np.random.get_state(),
+        "python": random.getstate(),
+    }
+
+
+def _set_rng_state(state: Dict[str, Any]) -> None:
+    """Restore random number generator states captured by _rng_state."""
+    torch.set_rng_state(state["torch"])
+    if state["cuda"] and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+    np.random.set_state(state["numpy"])
+    random.setstate(state["python"])
+
+
+def save_training_state(
+    path: Path,
+    epoch: int,
+    model: ViolenceDetectionGNN,
+    optimizer: torch.optim.Optimizer,
+    early_stopping: EarlyStopping,
+    metrics: Dict[str, List[float]],
+    num_train_graphs: int,
+    run_config: Dict[str, Any],
+) -> None:
+    """
+    Atomically write the state needed to resume training.
+
+    Args:
+        path: Training-state file
+        epoch: Number of completed epochs
+        model: Model after the last completed epoch
+        optimizer: Optimizer of the run
+        early_stopping: Best-model tracker of the run
+        metrics: Per-epoch metrics so far
+        num_train_graphs: Size of the training set, checked on resume
+        run_config: Settings the run depends on (topology, optimizer, data
+                    fingerprint), checked on resume
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    state = {
+        "version": TRAINING_STATE_VERSION,
+        "epoch": epoch,
+        "model_config": dict(model.config),
+        "model_state_dict": model.state_dict(),
+        "optimizer_state_dict": optimizer.state_dict(),
+        "early_stopping": early_stopping.state_dict(),
+        "metrics": metrics,
+        "num_train_graphs": num_train_graphs,
+        "run_config": run_config,
+        "rng_state": _rng_state(),
+    }
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_training_state(
+    path: Path,
+    model: ViolenceDetectionGNN,
+    optimizer: torch.optim.Optimizer,
+    early_stopping: EarlyStopping,
+    num_train_graphs: int,
+    device: torch.device,
+    run_config: Dict[str, Any],
+) -> Tuple[int, Dict[str, List[float]]]:
+    """
+    Restore a run from a training-state file.
+
+    Args:
+        path: Training-state file written by save_training_state
+        model: Model to restore in place
+        optimizer: Optimizer to restore in place
+        early_stopping: Best-model tracker to restore in place
+        num_train_graphs: Size of the current training set
+        device: Device the model is on
+        run_config: Settings of the current run (see save_training_state)
+
+    Returns:
+        Tuple of (number of completed epochs, per-epoch metrics so far)
+
+    Raises:
+        ValueError: If the state belongs to a different model, training set or
+                    run configuration
+    """
+    # The file holds RNG states (NumPy arrays, tuples), not only tensors
+    state = torch.load(path, map_location=device, weights_only=False)
+    if state.get("version") != TRAINING_STATE_VERSION:
+        raise ValueError(f"Unsupported training state version in {path}")
+    if state["model_config"] != dict(model.config):
+        raise ValueError(
+            f"Training state {path} was written for the model configuration "
+            f"{state['model_config']}, not {dict(model.config)}"
+        )
+    if state["num_train_graphs"] != num_train_graphs:
+        raise ValueError(
+            f"Training state {path} was written for {state['num_train_graphs']} "
+            f"training graphs, not {num_train_graphs}"
+        )
+    changed = [
+        f"{name} {state['run_config'].get(name)!r} -> {value!r}"
+        for name, value in run_config.items()
+        if state["run_config"].get(name) != value
+    ]
+    if changed:
+        raise ValueError(
+            f"Training state {path} was written for a different run: "
+            + ", ".join(changed)
+        )
+
+    model.load_state_dict(state["model_state_dict"])
+    optimizer.load_state_dict(state["optimizer_state_dict"])
+    early_stopping.load_state_dict(state["early_stopping"])
+    # RNG states must stay on the CPU regardless of map_location
+    rng_state = state["rng_state"]
+    rng_state["torch"] = rng_state["torch"].cpu()
+    rng_state["cuda"] = [s.cpu() for s in rng_state["cuda"]]
+    _set_rng_state(rng_state)
+    return state["epoch"], state["metrics"]
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Dense fixed-topology execution engine for ViolenceDetectionGNN.
+
+Every pose graph has the same keypoint layout, so a batch can be stored as a
+padded [batch, keypoints, channels] tensor with a validity mask and an
+adjacency matrix shared by all graphs. Message passing then becomes batched
+matrix multiplication instead of scatter/gather over edge_index, which is
+much cheaper on CPU. It provides:
+- Dense equivalents of the GCN, GAT and GIN layers, JumpingKnowledge and
+  multi-scale pooling of PoseGNN, using the parameters of a trained model
+- A drop-in wrapper with the (x, edge_index, batch) signature of
+  ViolenceDetectionGNN, so trained checkpoints load unchanged
+- Conversion of padded keypoint arrays and PyG batches to dense inputs
+
+The dense path is for inference only: batch normalization uses the running
+statistics of the trained model.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from gnn import MIN_VALID_KEYPOINTS, TOPOLOGY_COMPLETE, TOPOLOGY_SKELETON, PoseGNN
+from model import ViolenceDetectionGNN
+
+if TYPE_CHECKING:
+    from torch_geometric.nn import GATConv, GCNConv, GINConv
+
+
+def dense_adjacency(
+    num_keypoints: int,
+    topology: str = TOPOLOGY_COMPLETE,
+    skeleton_links: Optional[Sequence[Sequence[int]]] = None,
+) -> Optional[torch.Tensor]:
+    """
+    Build the adjacency matrix shared by all graphs of a keypoint layout.
+
+    Edges touching an invalid keypoint are removed per graph by the validity
+    mask, which reproduces the filtering of gnn.pose_graph_arrays.
+
+    Args:
+        num_keypoints: Number of keypoints per person
+        topology: "complete" or "skeleton"; the k-nearest-neighbour edges of
+                  "skeleton_knn" differ per graph and need to_dense_inputs
+        skeleton_links: Pairs of keypoint indices, required for "skeleton"
+
+    Returns:
+        Adjacency [num_keypoints, num_keypoints] without self loops, or None
+        for the complete topology (every valid pair is connected)
+    """
+    if topology == TOPOLOGY_COMPLETE:
+        return None
+    if topology != TOPOLOGY_SKELETON:
+        raise ValueError(
+            f"A shared adjacency exists for '{TOPOLOGY_COMPLETE}' and "
+            f"'{TOPOLOGY_SKELETON}' topologies only, got {topology}"
+        )
+    if skeleton_links is None:
+        raise ValueError(f"The '{topology}' topology requires skeleton_links")
+
+    links = np.asarray(skeleton_links, dtype=np.int64).reshape(-1, 2)
+    links = links[((links >= 0) & (links < num_keypoints)).all(axis=1)]
+    adj = torch.zeros(num_keypoints, num_keypoints)
+    adj[links[:, 0], links[:, 1]] = 1.0
+    adj[links[:, 1], links[:, 0]] = 1.0
+    adj.fill_diagonal_(0.0)
+    return adj
+
+
+def dense_inputs_from_keypoints(
+    keypoints: np.ndarray,
+) -> Tuple[torch.Tensor, torch.Tensor, np.ndarray]:
+    """
+    Convert padded person keypoints to dense model inputs.
+
+    Keypoints stay in their original slots. Invalid keypoints (zeros or NaNs)
+    are masked out, and persons with fewer than MIN_VALID_KEYPOINTS valid
+    keypoints are dropped, as in gnn.pose_graph_arrays.
+
+    Args:
+        keypoints: Keypoints of many persons [num_persons, num_keypoints, 2]
+
+    Returns:
+        Tuple of (node features [batch, num_keypoints, 2], validity mask
+        [batch, num_keypoints], indices of the kept persons)
+    """
+    valid = ~np.isnan(keypoints).any(axis=2) & (keypoints != 0).any(axis=2)
+    keep = np.flatnonzero(valid.sum(axis=1) >= MIN_VALID_KEYPOINTS)
+    coords = np.where(valid[keep, :, None], keypoints[keep], 0.0)
+    return (
+        torch.tensor(coords, dtype=torch.float),
+        torch.from_numpy(valid[keep]),
+        keep,
+    )
+
+
+def to_dense_inputs(
+    x: torch.Tensor,
+    edge_index: torch.Tensor,
+    batch: torch.Tensor,
+    topology: str = TOPOLOGY_COMPLETE,
+) -> Tuple[torch.Tensor, torch.Tensor, Optional[torch.Tensor]]:
+    """
+    Convert a PyG batch to dense model inputs.
+
+    Args:
+        x: Node features [num_nodes, in_channels]
+        edge_index: Graph connectivity [2, num_edges]
+        batch: Batch assignment for nodes [num_nodes]
+        topology: Graph edge topology; complete graphs need no edge_index
+
+    Returns:
+        Tuple of (node features [batch, max_nodes, in_channels], validity mask
+        [batch, max_nodes], per-graph adjacency [batch, max_nodes, max_nodes]
+        indexed as [target, source], or None for complete graphs)
+    """
+    from torch_geometric.utils import to_dense_adj, to_dense_batch
+
+    x_dense, mask = to_dense_batch(x, batch)
+    if topology == TOPOLOGY_COMPLETE:
+        return x_dense, mask, None
+
+    adj = to_dense_adj(edge_index, batch, max_num_nodes=x_dense.size(1))
+    return x_dense, mask, adj.transpose(1, 2)
+
+
+def _masked_adjacency(mask: torch.Tensor, adj: Optional[torch.Tensor]) -> torch.Tensor:
+    """
+    Restrict an adjacency to the valid nodes of each graph.
+
+    Args:
+        mask: Validity mask [batch, num_nodes]
+        adj: Shared [num_nodes, num_nodes] or per-graph adjacency, or None
+             for complete graphs
+
+    Returns:
+        Adjacency without self loops [batch, num_nodes, num_nodes]
+    """
+    m = mask.to(torch.float)
+    pairs = m.unsqueeze(2) * m.unsqueeze(1)
+    if adj is not None:
+        pairs = pairs * adj
+    eye = torch.eye(mask.size(1), dtype=pairs.dtype, device=pairs.device)
+    return pairs * (1.0 - eye)
+
+
+def _per_node(module: nn.Module, x: torch.Tensor) -> torch.Tensor:
+    """Apply a node-wise module (e.g. BatchNorm1d) to [batch, nodes, channels]."""
+    return module(x.reshape(-1, x.size(-1))).view(x.size(0), x.size(1), -1)
+
+
+def dense_gcn(conv: GCNConv, x: torch.Tensor, adj_hat: torch.Tensor) -> torch.Tensor:
+    """
+    Dense GCNConv: D^-1/2 (A + I) D^-1/2 X W + b.
+
+    Args:
+        conv: Trained GCNConv (symmetric normalization, self loops)
+        x: Node features [batch, num_nodes, in_channels]
+        adj_hat: Adjacency with self loops [batch, num_nodes, num_nodes]
+
+    Returns:
+        Node features [batch, num_nodes, out_channels]
+    """
+    deg_inv_sqrt = adj_hat.sum(dim=2).pow(-0.5)
+    deg_inv_sqrt = deg_inv_sqrt.masked_fill(torch.isinf(deg_inv_sqrt), 0.0)
+    norm = deg_inv_sqrt.unsqueeze(2) * adj_hat * deg_inv_sqrt.unsqueeze(1)
+    out = torch.bmm(norm, conv.lin(x))
+    if conv.bias is not None:
+        out = out + conv.bias
+    return out
+
+
+def dense_gat(conv: GATConv, x: torch.Tensor, adj_hat: torch.Tensor) -> torch.Tensor:
+    """
+    Dense GATConv with masked softmax attention over each node's neighbours.
+
+    Args:
+        conv: Trained GATConv (self loops, no edge features)
+        x: Node features [batch, num_nodes, in_channels]
+        adj_hat: Adjacency with self loops [batch, num_nodes, num_nodes]
+
+    Returns:
+        Node features [batch, num_nodes, heads * out_channels] (or
+        [batch, num_nodes, out_channels] if heads are averaged)
+    """
+    batch_size, num_nodes, _ = x.shape
+    heads, channels = conv.heads, conv.out_channels
+
+    # Recent releases name the shared projection "lin", older ones "lin_src"
+    lin = getattr(conv, "lin", None)
+    if lin is None:
+        lin = conv.lin_src
+    h = lin(x).view(batch_size, num_nodes, heads, channels)
+    alpha_src = (h * conv.att_src).sum(dim=-1).transpose(1, 2)  # [B, H, N]
+    alpha_dst = (h * conv.att_dst).sum(dim=-1).transpose(1, 2)  # [B, H, N]
+
+    # Attention logits [B, H, target, source]
+    logits = alpha_dst.unsqueeze(3) + alpha_src.unsqueeze(2)
+    logits = F.leaky_relu(logits, conv.negative_slope)
+    logits = logits.masked_fill(adj_hat.unsqueeze(1) == 0, float("-inf"))
+    attention = torch.softmax(logits, dim=-1)
+
+    out = torch.matmul(attention, h.transpose(1, 2))  # [B, H, N, C]
+    out = out.transpose(1, 2)
+    if conv.concat:
+        out = out.reshape(batch_size, num_nodes, heads * channels)
+    else:
+        out = out.mean(dim=2)
+    if conv.bias is not None:
+        out = out + conv.bias
+    return out
+
+
+def dense_gin(conv: GINConv, x: torch.Tensor, adj: torch.Tensor) -> torch.Tensor:
+    """
+    Dense GINConv: MLP((1 + eps) * x + sum of neighbour features).
+
+    Args:
+        conv: Trained GINConv
+        x: Node features [batch, num_nodes, channels]
+        adj: Adjacency without self loops [batch, num_nodes, num_nodes]
+
+    Returns:
+        Node features [batch, num_nodes, out_channels]
+    """
+    out = (1 + conv.eps) * x + torch.bmm(adj, x)
+    return _per_node(conv.nn, out)
+
+
+def dense_pose_gnn(
+    gnn: PoseGNN, x: torch.Tensor, mask: torch.Tensor, adj: Optional[torch.Tensor]
+) -> torch.Tensor:
+    """
+    Run PoseGNN on dense inputs with its trained parameters (eval mode).
+
+    Args:
+        gnn: Trained PoseGNN
+        x: Node features [batch, num_nodes, in_channels]
+        mask: Validity mask [batch, num_nodes]
+        adj: Shared or per-graph adjacency, or None for complete graphs
+
+    Returns:
+        Graph embeddings [batch, hidden_channels]
+    """
+    adj = _masked_adjacency(mask, adj)
+    eye = torch.eye(adj.size(1), dtype=adj.dtype, device=adj.device)
+    adj_hat = adj + eye
+
+    # Layer 1: GCN
+    x1 = F.relu(_per_node(gnn.batch_norm1, dense_gcn(gnn.conv1, x, adj_hat)))
+
+    # Layer 2: GAT
+    x2 = F.relu(_per_node(gnn.batch_norm2, dense_gat(gnn.conv2, x1, adj_hat)))
+
+    # Layer 3: GIN with residual connection to layer 1
+    x3 = dense_gin(gnn.conv3, x2, adj) + x1
+    x3 = F.relu(_per_node(gnn.batch_norm3, x3))
+
+    # JumpingKnowledge
+    if gnn.jk.mode == "cat":
+        h = torch.cat([x1, x2, x3], dim=-1)
+    elif gnn.jk.mode == "max":
+        h = torch.stack([x1, x2, x3], dim=-1).max(dim=-1)[0]
+    else:
+        raise ValueError(f"Unsupported JumpingKnowledge mode: {gnn.jk.mode}")
+
+    # Multi-scale pooling over the valid nodes
+    m = mask.unsqueeze(-1)
+    x_sum = (h * m).sum(dim=1)
+    x_mean = x_sum / m.sum(dim=1).clamp(min=1)
+    x_max = h.masked_fill(~m, float("-inf")).max(dim=1)[0]
+    x_pooled = (x_mean + x_max + x_sum) / 3.0
+
+    return gnn.project(x_pooled)
+
+
+class DenseViolenceDetectionGNN(nn.Module):
+    """
+    Dense execution engine for a trained ViolenceDetectionGNN.
+
+    Holds the submodules of the wrapped model under the same names, so
+    checkpoints of ViolenceDetectionGNN can be loaded into either. Calling
+    the engine with (x, edge_index, batch) makes it a drop-in replacement in
+    the inference code; forward_dense scores padded inputs directly.
+    """
+
+    def __init__(self, model: ViolenceDetectionGNN, topology: str = TOPOLOGY_COMPLETE):
+        """
+        Wrap a model.
+
+        Args:
+            model: Trained ViolenceDetectionGNN
+            topology: Graph edge topology of the batches passed to forward
+        """
+        super(DenseViolenceDetectionGNN, self).__init__()
+        self.gnn = model.gnn
+        self.transformer = model.transformer
+        self.lin1 = model.lin1
+        self.lin2 = model.lin2
+        self.topology = topology
+        self.eval()
+
+    def forward_dense(
+        self,
+        x: torch.Tensor,
+        mask: torch.Tensor,
+        adj: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        """
+        Score padded pose graphs.
+
+        Args:
+            x: Node features [batch, num_nodes, in_channels]
+            mask: Validity mask [batch, num_nodes]
+            adj: Shared [num_nodes, num_nodes] or per-graph adjacency indexed
+                 as [target, source], or None for complete graphs
+
+        Returns:
+            Violence score between 0 and 1 [batch, 1]
+        """
+        if self.training:
+            raise RuntimeError("The dense engine supports inference only")
+
+        x = dense_pose_gnn(self.gnn, x, mask, adj)
+        x = self.transformer(x)
+        x = F.relu(self.lin1(x))
+        return torch.sigmoid(self.lin2(x))
+
+    def forward(
+        self, x: torch.Tensor, edge_index: torch.Tensor, batch: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Score a PyG batch, like ViolenceDetectionGNN.forward.
+
+        Args:
+            x: Node features [num_nodes, in_channels]
+            edge_index: Graph connectivity [2, num_edges]
+            batch: Batch assignment for nodes [num_nodes]
+
+        Returns:
+            Violence score between 0 and 1 [batch_size, 1]
+        """
+        return self.forward_dense(*to_dense_inputs(x, edge_index, batch, self.topology))
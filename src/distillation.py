@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Knowledge distillation of the violence model into a compact student.
+
+A full-size model (the teacher) is too heavy for CPU boxes that score many
+cameras at once. A smaller ViolenceDetectionGNN (narrower, with fewer
+attention heads and transformer layers, on a sparse graph topology) trained
+to match the teacher's scores recovers much of the accuracy it loses when
+trained on the labels alone. This module provides:
+- The teacher's scores for every graph of the student's dataset, computed
+  once, since the teacher is frozen
+- A Dataset that attaches those scores to the student's batches
+- The distillation loss, mixing the label loss with the temperature-softened
+  teacher scores
+- A throughput measurement to report the accuracy vs. speed trade-off
+
+The teacher and student read the same packed graphs: a teacher trained on
+complete graphs gets them rebuilt from the student's keypoints, since the
+complete topology only depends on the nodes. Other teacher topologies must
+match the student's, and both must use the same keypoint subset.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.utils.data import Dataset
+from tqdm import tqdm
+
+from gnn import TOPOLOGY_COMPLETE, batch_from_arrays
+from graph_cache import PackedGraphDataset
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Batch, Data
+
+# Constants for distillation
+DISTILLATION_TEMPERATURE = 2.0  # Softening of the teacher and student logits
+DISTILLATION_ALPHA = 0.5  # Weight of the label loss (the rest is the teacher's)
+TEACHER_BATCH_SIZE = 256  # Graphs per teacher forward pass
+LOGIT_EPS = 1e-6  # Clamp of the teacher scores before they become logits
+TIMING_REPEATS = 3  # Timed passes over the batches (best one is kept)
+
+
+def check_teacher_topology(
+    teacher_topology: Dict[str, Any], student_topology: Dict[str, Any]
+) -> None:
+    """
+    Check that a teacher can score the graphs of a student.
+
+    Both must keep the same keypoints, since the student's graphs provide the
+    teacher's nodes.
+
+    Args:
+        teacher_topology: Topology options the teacher was trained with
+        student_topology: Topology options of the student's graphs
+
+    Raises:
+        ValueError: If the teacher's graphs cannot be built from the student's
+    """
+    if teacher_topology["keypoint_subset"] != student_topology["keypoint_subset"] or (
+        teacher_topology["mode"] != TOPOLOGY_COMPLETE
+        and teacher_topology != student_topology
+    ):
+        raise ValueError(
+            f"A teacher trained on {teacher_topology} graphs needs the same "
+            f"student topology, not {student_topology}"
+        )
+
+
+def teacher_batch(
+    graphs: PackedGraphDataset,
+    indices: Sequence[int],
+    teacher_topology: Dict[str, Any],
+) -> Batch:
+    """
+    Collate graphs of a student's dataset in the topology of a teacher.
+
+    Args:
+        graphs: Packed graphs of the student
+        indices: Graph indices in batch order
+        teacher_topology: Topology options the teacher was trained with
+
+    Returns:
+        PyTorch Geometric Batch for the teacher
+    """
+    if teacher_topology == graphs.topology:
+        return graphs.__getitems__(indices)
+    # Complete graphs only depend on the nodes, which all topologies share
+    return batch_from_arrays(graphs.coords, graphs.node_ptr, indices)
+
+
+def compute_teacher_scores(
+    teacher: nn.Module,
+    graphs: PackedGraphDataset,
+    teacher_topology: Dict[str, Any],
+    device: torch.device,
+    batch_size: int = TEACHER_BATCH_SIZE,
+) -> np.ndarray:
+    """
+    Score every graph of a student's dataset with the teacher.
+
+    The teacher runs in evaluation mode, so its scores are a fixed target
+    that is computed once instead of in every epoch.
+
+    Args:
+        teacher: Trained model (left in evaluation mode)
+        graphs: Packed graphs of the student
+        teacher_topology: Topology options the teacher was trained with
+        device: Device of the teacher
+        batch_size: Graphs per forward pass
+
+    Returns:
+        Teacher scores [num_graphs]
+
+    Raises:
+        ValueError: If the teacher's graphs cannot be built from the student's
+    """
+    check_teacher_topology(teacher_topology, graphs.topology)
+
+    scores = np.empty(len(graphs), dtype=np.float32)
+    teacher.eval()
+    with torch.no_grad():
+        for start in tqdm(
+            range(0, len(graphs), batch_size), desc="Scoring with the teacher"
+        ):
+            indices = np.arange(start, min(start + batch_size, len(graphs)))
+            batch = teacher_batch(graphs, indices, teacher_topology).to(device)
+            out = teacher(batch.x, batch.edge_index, batch.batch)
+            scores[indices] = out.view(-1).cpu().numpy()
+    return scores
+
+
+class TeacherScoredDataset(Dataset):
+    """
+    Packed graphs of a student with the teacher's score of each graph.
+
+    Batches carry the score as a teacher attribute next to the label, which
+    is what distillation_loss reads. Indices are those of the graph dataset,
+    so the train/validation/test split applies unchanged.
+    """
+
+    def __init__(self, graphs: PackedGraphDataset, teacher_scores: np.ndarray):
+        """
+        Attach teacher scores to a graph dataset.
+
+        Args:
+            graphs: Packed graphs of the student
+            teacher_scores: Teacher score of every graph [num_graphs]
+        """
+        super(TeacherScoredDataset, self).__init__()
+        self.graphs = graphs
+        self.teacher_scores = teacher_scores
+
+    def __len__(self) -> int:
+        """Number of graphs in the dataset."""
+        return len(self.graphs)
+
+    def __getitem__(self, idx: int) -> Data:
+        """
+        Rebuild a single graph with its label and teacher score.
+
+        Args:
+            idx: Graph index
+
+        Returns:
+            PyTorch Geometric Data object with y and teacher attributes
+        """
+        graph = self.graphs[idx]
+        graph.teacher = torch.tensor([self.teacher_scores[idx]], dtype=torch.float)
+        return graph
+
+    def __getitems__(self, indices: Sequence[int]) -> Batch:
+        """
+        Collate several graphs with their labels and teacher scores.
+
+        Args:
+            indices: Graph indices in batch order
+
+        Returns:
+            PyTorch Geometric Batch with y and teacher attributes
+        """
+        batch = self.graphs.__getitems__(indices)
+        batch.teacher = torch.from_numpy(
+            self.teacher_scores[np.asarray(indices, dtype=np.int64)]
+        )
+        return batch
+
+
+def distillation_loss(
+    logits: torch.Tensor,
+    batch: Batch,
+    temperature: float = DISTILLATION_TEMPERATURE,
+    alpha: float = DISTILLATION_ALPHA,
+) -> torch.Tensor:
+    """
+    Mix the label loss with the loss against the teacher's softened scores.
+
+    Both logits are divided by the temperature, which flattens them so the
+    student also learns how sure the teacher is. The student's logits come
+    straight from the model, so confident students keep their gradients; the
+    stored teacher scores are turned back into logits. The teacher term is
+    scaled by the squared temperature to keep its gradients comparable to the
+    label term [Hinton et al., 2015].
+
+    Args:
+        logits: Student scores before the sigmoid [batch_size, 1]
+        batch: Batch with y and teacher attributes (see TeacherScoredDataset)
+        temperature: Softening temperature
+        alpha: Weight of the label loss, between 0 and 1
+
+    Returns:
+        Scalar loss
+    """
+    label_loss = F.binary_cross_entropy_with_logits(logits, batch.y.view(-1, 1))
+    student_logits = logits / temperature
+    teacher_logits = torch.logit(batch.teacher.view(-1, 1), eps=LOGIT_EPS)
+    soft_targets = torch.sigmoid(teacher_logits / temperature)
+    teacher_loss = F.binary_cross_entropy_with_logits(student_logits, soft_targets)
+    return alpha * label_loss + (1 - alpha) * temperature**2 * teacher_loss
+
+
+def count_parameters(model: nn.Module) -> int:
+    """Number of weights of a model."""
+    return sum(p.numel() for p in model.parameters())
+
+
+def measure_throughput(model: nn.Module, batches: List[Batch]) -> float:
+    """
+    Measure how many graphs per second a model scores.
+
+    Args:
+        model: Model to time (left in evaluation mode)
+        batches: Pre-collated batches on the model's device
+
+    Returns:
+        Graphs per second of the fastest pass over the batches
+    """
+    num_graphs = sum(b.num_graphs for b in batches)
+    model.eval()
+    best_time = float("inf")
+    with torch.no_grad():
+        for _ in range(TIMING_REPEATS):
+            start = time.perf_counter()
+            for b in batches:
+                model(b.x, b.edge_index, b.batch)
+            best_time = min(best_time, time.perf_counter() - start)
+    return num_graphs / best_time
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Multi-process data-parallel training helpers.
+
+train.py runs distributed when it is started by torchrun (or any launcher
+that sets the RANK, WORLD_SIZE, MASTER_ADDR and MASTER_PORT environment
+variables). Ranks communicate through the gloo backend, which works on CPU
+across local processes and across nodes:
+- Process group setup from the launcher environment
+- Rank queries that fall back to a single process when not distributed
+- Console output restricted to the main process
+- Collective helpers for metrics that every rank must agree on
+"""
+
+from __future__ import annotations
+
+import builtins
+import os
+from typing import Any, List
+
+import torch
+import torch.distributed as dist
+
+# Constants for distributed training
+DISTRIBUTED_BACKEND = "gloo"
+
+
+def is_distributed() -> bool:
+    """Whether a process group has been initialized."""
+    return dist.is_available() and dist.is_initialized()
+
+
+def get_rank() -> int:
+    """Global rank of this process (0 when not distributed)."""
+    return dist.get_rank() if is_distributed() else 0
+
+
+def get_world_size() -> int:
+    """Number of processes (1 when not distributed)."""
+    return dist.get_world_size() if is_distributed() else 1
+
+
+def get_local_world_size() -> int:
+    """Number of processes on this node (1 when not distributed)."""
+    return int(os.environ.get("LOCAL_WORLD_SIZE", get_world_size()))
+
+
+def is_main_process() -> bool:
+    """Whether this process evaluates, saves and prints."""
+    return get_rank() == 0
+
+
+_builtin_print = builtins.print
+
+
+def _main_process_print(*args: Any, force: bool = False, **kwargs: Any) -> None:
+    """Print only on the main process unless force is set."""
+    if force or is_main_process():
+        _builtin_print(*args, **kwargs)
+
+
+def init_distributed(backend: str = DISTRIBUTED_BACKEND) -> bool:
+    """
+    Join the process group described by the launcher environment.
+
+    Without a WORLD_SIZE above 1 this does nothing, so a plain
+    `python train.py` keeps training in a single process. In a process group,
+    print is silenced on all ranks but the main one (pass force=True to
+    print anyway).
+
+    Args:
+        backend: torch.distributed backend
+
+    Returns:
+        True if training runs distributed
+    """
+    if int(os.environ.get("WORLD_SIZE", "1")) <= 1:
+        return False
+    dist.init_process_group(backend=backend)
+    builtins.print = _main_process_print
+    return True
+
+
+def cleanup_distributed() -> None:
+    """Leave the process group and restore print."""
+    if is_distributed():
+        dist.destroy_process_group()
+    builtins.print = _builtin_print
+
+
+def barrier() -> None:
+    """Wait for all ranks (no-op when not distributed)."""
+    if is_distributed():
+        dist.barrier()
+
+
+def all_reduce_sum(tensor: torch.Tensor) -> torch.Tensor:
+    """
+    Sum a tensor over all ranks in place.
+
+    Args:
+        tensor: CPU tensor to reduce
+
+    Returns:
+        The reduced tensor
+    """
+    if is_distributed():
+        dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor
+
+
+def broadcast_values(values: List[float]) -> List[float]:
+    """
+    Share values computed on the main process with every rank.
+
+    Args:
+        values: Values on the main process (any placeholders elsewhere)
+
+    Returns:
+        The main process's values
+    """
+    if not is_distributed():
+        return values
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.broadcast(tensor, src=0)
+    return tensor.tolist()
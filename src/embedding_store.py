@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Precomputed PoseGNN embeddings for head-only training.
+
+Retraining only the transformer and classifier head (or retuning the
+threshold) does not change the graph network, yet a regular epoch runs
+PoseGNN over every graph again. With the GNN frozen, its output is a fixed
+vector per graph, so this module computes it once:
+- A store of the embeddings of all graphs in a memory-mapped array, keyed by
+  the GNN weights and the graph data, so it is rebuilt only when either changes
+- A Dataset that slices whole batches of embeddings out of the store
+- A module running the head of a model on those embeddings, with the same
+  call signature as the full model, so the regular training and evaluation
+  loops train it unchanged
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import Dataset
+from tqdm import tqdm
+
+from graph_cache import PackedGraphDataset
+from model import ViolenceDetectionGNN
+
+if TYPE_CHECKING:
+    from loaders import DevicePrefetcher
+
+# Constants for the embedding store
+EMBEDDING_STORE_DIR = Path("embedding_store")
+EMBEDDING_STORE_VERSION = 1
+EMBEDDINGS_NAME = "embeddings.npy"
+EMBEDDING_LABELS_NAME = "labels.npy"
+EMBEDDING_MANIFEST_NAME = "manifest.json"
+KEY_LENGTH = 16  # Hex digits of the store key
+
+
+class EmbeddingBatch:
+    """
+    Batch of precomputed graph embeddings.
+
+    Mirrors the attributes of a PyTorch Geometric Batch that the training and
+    evaluation loops read: x holds one embedding per graph and there are no
+    edges or node-to-graph assignments.
+    """
+
+    def __init__(self, x: torch.Tensor, y: torch.Tensor):
+        """
+        Wrap a batch.
+
+        Args:
+            x: Graph embeddings [num_graphs, hidden_channels]
+            y: Binary labels [num_graphs]
+        """
+        self.x = x
+        self.y = y
+        self.edge_index = None
+        self.batch = None
+
+    @property
+    def num_graphs(self) -> int:
+        """Number of graphs in the batch."""
+        return len(self.x)
+
+    def pin_memory(self) -> EmbeddingBatch:
+        """Copy the batch into pinned host memory (called by DataLoader)."""
+        return EmbeddingBatch(self.x.pin_memory(), self.y.pin_memory())
+
+    def to(self, device: torch.device, non_blocking: bool = False) -> EmbeddingBatch:
+        """
+        Move the batch to a device.
+
+        Args:
+            device: Target device
+            non_blocking: Copy asynchronously from pinned memory
+
+        Returns:
+            Batch on the device
+        """
+        return EmbeddingBatch(
+            self.x.to(device, non_blocking=non_blocking),
+            self.y.to(device, non_blocking=non_blocking),
+        )
+
+
+class EmbeddingDataset(Dataset):
+    """
+    Memory-mapped graph embeddings with their labels.
+
+    Indices are those of the graph dataset the store was built from, so the
+    train/validation/test split of the graphs applies unchanged.
+    """
+
+    def __init__(self, store_dir: Path):
+        """
+        Open an embedding store.
+
+        Args:
+            store_dir: Directory written by build_embedding_store
+        """
+        super(EmbeddingDataset, self).__init__()
+        self.store_dir = store_dir
+        self.embeddings = np.load(store_dir / EMBEDDINGS_NAME, mmap_mode="r")
+        self.labels = np.load(store_dir / EMBEDDING_LABELS_NAME, mmap_mode="r")
+
+    def __len__(self) -> int:
+        """Number of embedded graphs."""
+        return len(self.labels)
+
+    def __getitem__(self, idx: int) -> EmbeddingBatch:
+        """
+        Get the embedding of a single graph.
+
+        Args:
+            idx: Graph index
+
+        Returns:
+            EmbeddingBatch of one graph
+        """
+        return self.__getitems__([idx])
+
+    def __getitems__(self, indices: Sequence[int]) -> EmbeddingBatch:
+        """
+        Slice the embeddings of a whole batch out of the store.
+
+        Args:
+            indices: Graph indices in batch order
+
+        Returns:
+            EmbeddingBatch of the graphs
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        return EmbeddingBatch(
+            torch.from_numpy(self.embeddings[indices]),
+            torch.from_numpy(self.labels[indices].astype(np.float32)),
+        )
+
+
+class EmbeddingHead(nn.Module):
+    """
+    The transformer and classifier of a model, applied to stored embeddings.
+
+    The head shares its modules with the wrapped model, so training it trains
+    the model. Its forward pass takes the graph arguments of the full model
+    and ignores the edges and node assignments.
+    """
+
+    def __init__(self, model: ViolenceDetectionGNN):
+        """
+        Wrap a model whose GNN is frozen.
+
+        Args:
+            model: Model providing the head
+        """
+        super(EmbeddingHead, self).__init__()
+        self.model = model
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Constructor arguments of the wrapped model."""
+        return self.model.config
+
+    def forward(
+        self,
+        x: torch.Tensor,
+        edge_index: Optional[torch.Tensor] = None,
+        batch: Optional[torch.Tensor] = None,
+        return_logits: bool = False,
+    ) -> torch.Tensor:
+        """
+        Score graph embeddings.
+
+        Args:
+            x: Graph embeddings [batch_size, hidden_channels]
+            edge_index: Unused
+            batch: Unused
+            return_logits: Return the scores before the sigmoid instead
+
+        Returns:
+            Violence score between 0 and 1 [batch_size, 1]
+        """
+        return self.model.classify(x, return_logits)
+
+
+def _hash_arrays(digest: Any, arrays: Sequence[np.ndarray]) -> None:
+    """Feed the contents of arrays (including their dtypes) into a digest."""
+    for array in arrays:
+        digest.update(str(array.dtype).encode())
+        digest.update(np.ascontiguousarray(array).data)
+
+
+def embedding_store_key(model: ViolenceDetectionGNN, graphs: PackedGraphDataset) -> str:
+    """
+    Compute the key of the embeddings of a GNN on a graph dataset.
+
+    Args:
+        model: Model whose GNN produces the embeddings
+        graphs: Packed graphs that are embedded
+
+    Returns:
+        Hex digest of the GNN weights, the graph arrays and their topology
+    """
+    # The head does not affect the embeddings, only the GNN weights do
+    digest = hashlib.sha256()
+    for name, value in model.gnn.state_dict().items():
+        digest.update(name.encode())
+        _hash_arrays(digest, [value.detach().cpu().numpy()])
+    digest.update(json.dumps(graphs.topology, sort_keys=True).encode())
+    _hash_arrays(
+        digest,
+        [graphs.coords, graphs.node_ptr, graphs.pairs, graphs.pair_ptr, graphs.labels],
+    )
+    return digest.hexdigest()[:KEY_LENGTH]
+
+
+def build_embedding_store(
+    model: ViolenceDetectionGNN,
+    loader: DevicePrefetcher,
+    store_root: Path = EMBEDDING_STORE_DIR,
+) -> EmbeddingDataset:
+    """
+    Embed every graph with a model's GNN, reusing an existing store.
+
+    The GNN runs in evaluation mode (no dropout), which is the fixed function
+    a frozen GNN computes during head-only training. A new store is written to
+    a temporary directory and moved into place when complete.
+
+    Args:
+        model: Model whose GNN is embedded (left in evaluation mode)
+        loader: Device loader over the whole packed graph dataset, unshuffled
+        store_root: Directory holding one store per key
+
+    Returns:
+        EmbeddingDataset over the embeddings of all graphs
+    """
+    graphs = loader.dataset
+    store_dir = store_root / embedding_store_key(model, graphs)
+    manifest_path = store_dir / EMBEDDING_MANIFEST_NAME
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if json.load(f).get("version") == EMBEDDING_STORE_VERSION:
+                print(f"Using GNN embeddings from {store_dir}")
+                return EmbeddingDataset(store_dir)
+
+    tmp_dir = store_root / f"{store_dir.name}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.rmtree(store_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    hidden_channels = model.config["hidden_channels"]
+    embeddings = np.lib.format.open_memmap(
+        tmp_dir / EMBEDDINGS_NAME,
+        mode="w+",
+        dtype=np.float32,
+        shape=(len(graphs), hidden_channels),
+    )
+    model.eval()
+    offset = 0
+    with torch.no_grad():
+        for batch in tqdm(loader, desc="Embedding graphs"):
+            out = model.embed(batch.x, batch.edge_index, batch.batch)
+            embeddings[offset : offset + len(out)] = out.cpu().numpy()
+            offset += len(out)
+    embeddings.flush()
+    del embeddings
+
+    np.save(tmp_dir / EMBEDDING_LABELS_NAME, np.asarray(graphs.labels))
+    with open(tmp_dir / EMBEDDING_MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": EMBEDDING_STORE_VERSION,
+                "num_graphs": len(graphs),
+                "in_channels": model.config["in_channels"],
+                "hidden_channels": model.config["hidden_channels"],
+                "topology": graphs.topology,
+            },
+            f,
+            indent=2,
+        )
+    os.replace(tmp_dir, store_dir)
+    print(f"Saved GNN embeddings of {len(graphs)} graphs to {store_dir}")
+    return EmbeddingDataset(store_dir)
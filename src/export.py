@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+Export a trained violence detection model for optimized runtimes.
+
+The exported model is the dense execution engine (see dense.py) with the
+keypoint preprocessing built in, so it only needs plain tensors:
+- Input "keypoints": float32 [persons, keypoints, 2] pixel coordinates, where
+  keypoints at (0, 0) or containing NaN are invalid; models trained on a
+  keypoint subset take only the subset's keypoints, in subset order
+- Output "scores": float32 [persons] violence scores between 0 and 1
+
+Persons that would not form a graph (fewer than MIN_VALID_KEYPOINTS valid
+keypoints, or no remaining skeleton link) must be dropped by the caller, as in
+gnn.pose_graph_arrays. The decision threshold, graph topology, skeleton links
+and preprocessing rules are embedded as JSON metadata (ONNX
+metadata_props or a TorchScript extra file). After export, the model is
+checked against the eager PyTorch model on real and synthetic poses.
+"""
+
+from __future__ import annotations
+
+import argparse
+import inspect
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from dense import DenseViolenceDetectionGNN, dense_adjacency
+from gnn import (
+    MIN_VALID_KEYPOINTS,
+    TOPOLOGY_COMPLETE,
+    TOPOLOGY_SKELETON_KNN,
+    create_pose_graph,
+    pose_graph_arrays,
+    skeleton_links_from_meta,
+    subset_skeleton_links,
+)
+from inference import (
+    DEFAULT_MODEL_PATH,
+    EXPORT_METADATA_KEY,
+    OnnxViolenceModel,
+    iter_frame_keypoints,
+    load_model_and_threshold,
+    predict_violence,
+)
+from model import is_quantized
+from pose_io import iter_frames
+
+# Constants for export
+EXPORT_FORMAT_ONNX = "onnx"
+EXPORT_FORMAT_TORCHSCRIPT = "torchscript"
+EXPORT_FORMATS = (EXPORT_FORMAT_ONNX, EXPORT_FORMAT_TORCHSCRIPT)
+EXPORT_VERSION = 2  # Bump when the exported inputs, outputs or metadata change
+METADATA_FILE = "metadata.json"  # TorchScript extra file
+ONNX_OPSET = 18
+DEFAULT_KEYPOINTS = 17  # Example size for complete graphs (any size works)
+PARITY_PERSONS = 256
+PARITY_TOLERANCE = 1e-4
+
+
+class ExportableViolenceModel(nn.Module):
+    """Dense engine with keypoint validity masking, for tracing and export."""
+
+    def __init__(
+        self, dense: DenseViolenceDetectionGNN, adjacency: Optional[torch.Tensor]
+    ):
+        """
+        Initialize the exportable model.
+
+        Args:
+            dense: Dense engine wrapping the trained model
+            adjacency: Shared adjacency of the keypoint layout, or None for
+                       complete graphs
+        """
+        super(ExportableViolenceModel, self).__init__()
+        self.dense = dense
+        if adjacency is not None:
+            self.register_buffer("adjacency", adjacency)
+        else:
+            self.adjacency = None
+
+    def forward(self, keypoints: torch.Tensor) -> torch.Tensor:
+        """
+        Score padded person keypoints.
+
+        Args:
+            keypoints: Keypoint coordinates [persons, keypoints, 2]
+
+        Returns:
+            Violence scores [persons]
+        """
+        valid = ~torch.isnan(keypoints).any(dim=-1) & (keypoints != 0).any(dim=-1)
+        x = torch.where(valid.unsqueeze(-1), keypoints, torch.zeros_like(keypoints))
+        return self.dense.forward_dense(x, valid, self.adjacency).view(-1)
+
+
+def export_metadata(
+    threshold: float,
+    metrics: Optional[Dict],
+    topology: Dict[str, Any],
+    num_keypoints: Optional[int],
+    skeleton_links: Optional[List[List[int]]] = None,
+) -> Dict[str, Any]:
+    """
+    Describe an exported model so that it can be run without the checkpoint.
+
+    Args:
+        threshold: Classification threshold of the model
+        metrics: Threshold metrics stored in the checkpoint, if any
+        topology: Graph topology options the model was trained with
+        num_keypoints: Keypoints per person, or None if any number works
+        skeleton_links: Links the fixed adjacency was built from, or None for
+                        complete graphs
+
+    Returns:
+        JSON-serializable metadata dictionary
+    """
+    return {
+        "export_version": EXPORT_VERSION,
+        "threshold": float(threshold),
+        "metrics": metrics,
+        "topology": topology,
+        "num_keypoints": num_keypoints,
+        "skeleton_links": skeleton_links,
+        "min_valid_keypoints": MIN_VALID_KEYPOINTS,
+        "input": "keypoints: float32 [persons, keypoints, 2]; (0, 0) or NaN is invalid",
+        "output": "scores: float32 [persons]",
+    }
+
+
+def check_exportable(topology: Dict[str, Any]) -> None:
+    """
+    Check that a topology has a fixed adjacency the exported model can embed.
+
+    Args:
+        topology: Graph topology options the model was trained with
+
+    Raises:
+        ValueError: For the "skeleton_knn" topology, whose edges depend on
+                    the keypoint positions of every person
+    """
+    if topology["mode"] == TOPOLOGY_SKELETON_KNN:
+        raise ValueError(
+            f"The '{TOPOLOGY_SKELETON_KNN}' topology has per-graph edges "
+            "and cannot be exported with a fixed adjacency."
+        )
+
+
+def export_onnx(
+    module: ExportableViolenceModel,
+    example: torch.Tensor,
+    output_path: Path,
+    metadata: Dict[str, Any],
+) -> None:
+    """
+    Export to ONNX with dynamic person (and, if allowed, keypoint) axes.
+
+    Args:
+        module: Model to export
+        example: Example keypoints [persons, keypoints, 2]
+        output_path: Destination .onnx path
+        metadata: Metadata stored under EXPORT_METADATA_KEY
+
+    Raises:
+        ValueError: If the model's topology cannot be exported
+    """
+    import onnx
+
+    check_exportable(metadata["topology"])
+
+    dynamic_axes = {"keypoints": {0: "persons"}, "scores": {0: "persons"}}
+    if metadata["num_keypoints"] is None:
+        dynamic_axes["keypoints"][1] = "num_keypoints"
+
+    # Recent releases default to the dynamo exporter, which ignores
+    # dynamic_axes; older ones only have the TorchScript-based exporter
+    options: Dict[str, Any] = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        options["dynamo"] = False
+
+    torch.onnx.export(
+        module,
+        (example,),
+        str(output_path),
+        input_names=["keypoints"],
+        output_names=["scores"],
+        dynamic_axes=dynamic_axes,
+        opset_version=ONNX_OPSET,
+        **options,
+    )
+
+    onnx_model = onnx.load(str(output_path))
+    entry = onnx_model.metadata_props.add()
+    entry.key = EXPORT_METADATA_KEY
+    entry.value = json.dumps(metadata)
+    onnx.save(onnx_model, str(output_path))
+
+
+def export_torchscript(
+    module: ExportableViolenceModel,
+    example: torch.Tensor,
+    output_path: Path,
+    metadata: Dict[str, Any],
+) -> None:
+    """
+    Export a traced TorchScript module.
+
+    Args:
+        module: Model to export
+        example: Example keypoints [persons, keypoints, 2]
+        output_path: Destination path
+        metadata: Metadata stored as METADATA_FILE
+
+    Raises:
+        ValueError: If the model's topology cannot be exported
+    """
+    check_exportable(metadata["topology"])
+    with torch.no_grad():
+        traced = torch.jit.trace(module, (example,))
+    torch.jit.save(
+        traced, str(output_path), _extra_files={METADATA_FILE: json.dumps(metadata)}
+    )
+
+
+def load_exported(
+    model_path: Path, export_format: str
+) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Load an exported model as a function from keypoints to scores.
+
+    Args:
+        model_path: Path to the exported model
+        export_format: One of EXPORT_FORMATS
+
+    Returns:
+        Function mapping keypoints [persons, keypoints, 2] to scores [persons]
+    """
+    if export_format == EXPORT_FORMAT_ONNX:
+        return OnnxViolenceModel(model_path).predict
+
+    module = torch.jit.load(str(model_path))
+
+    def predict(keypoints: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            return module(torch.from_numpy(keypoints.astype(np.float32))).numpy()
+
+    return predict
+
+
+def parity_keypoints(
+    num_keypoints: int,
+    reference_json: Optional[Path] = None,
+    num_persons: int = PARITY_PERSONS,
+    seed: int = 0,
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+    topology: str = TOPOLOGY_COMPLETE,
+    skeleton_links: Optional[List[List[int]]] = None,
+) -> np.ndarray:
+    """
+    Collect person keypoints for the parity check.
+
+    Real poses from reference_json are used first; the rest are synthetic
+    poses with randomly invalidated keypoints. Only persons that form a graph
+    under the topology are kept, since the eager model drops the others.
+
+    Args:
+        num_keypoints: Keypoints per person
+        reference_json: Optional MMPose result file
+        num_persons: Number of persons to return
+        seed: Random seed for the synthetic poses
+        keypoint_subset: Keypoint indices kept from the reference poses, or
+                         None for every keypoint
+        confidence: Instance confidence filter applied to the reference poses,
+                    or None
+        topology: Graph edge topology of the exported model
+        skeleton_links: Skeleton links for sparse topologies
+
+    Returns:
+        Keypoints [num_persons, num_keypoints, 2] of persons that form a graph
+
+    Raises:
+        ValueError: If the reference poses have fewer keypoints than
+                    keypoint_subset needs
+    """
+    persons: List[np.ndarray] = []
+    if reference_json is not None:
+        for _, frame_keypoints in iter_frame_keypoints(
+            reference_json, keypoint_subset, confidence, topology, skeleton_links
+        ):
+            persons.extend(kp for kp in frame_keypoints if len(kp) == num_keypoints)
+            if len(persons) >= num_persons:
+                break
+
+    rng = np.random.default_rng(seed)
+    while len(persons) < num_persons:
+        keypoints = rng.random((num_keypoints, 2)) * np.array([1920.0, 1080.0])
+        keypoints[rng.random(num_keypoints) < 0.2] = 0.0
+        if pose_graph_arrays(keypoints, topology, skeleton_links) is not None:
+            persons.append(keypoints)
+
+    return np.stack(persons[:num_persons])
+
+
+def check_parity(
+    model: nn.Module,
+    predict: Callable[[np.ndarray], np.ndarray],
+    keypoints: np.ndarray,
+    topology: Dict[str, Any],
+    skeleton_links: Optional[List[List[int]]],
+    device: torch.device,
+) -> float:
+    """
+    Compare an exported model with the eager sparse PyTorch model.
+
+    Persons that do not form a graph under the topology are dropped from both
+    sides before comparing, as inference does.
+
+    Args:
+        model: Trained eager ViolenceDetectionGNN
+        predict: Exported model as returned by load_exported
+        keypoints: Person keypoints [persons, keypoints, 2]
+        topology: Graph topology options the model was trained with
+        skeleton_links: Skeleton links for sparse topologies
+        device: Device of the eager model
+
+    Returns:
+        Maximum absolute score difference
+    """
+    graphs = [
+        create_pose_graph(
+            kp,
+            topology=topology["mode"],
+            skeleton_links=skeleton_links,
+            knn_k=topology["knn_k"],
+        )
+        for kp in keypoints
+    ]
+    keep = [i for i, graph in enumerate(graphs) if graph is not None]
+    if not keep:
+        return 0.0
+    expected = np.array(predict_violence(model, [graphs[i] for i in keep], device))
+    actual = predict(keypoints[keep].astype(np.float32)).astype(np.float64)
+    return float(np.max(np.abs(actual - expected)))
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the export script.
+
+    Returns:
+        Parsed command-line arguments
+    """
+    parser = argparse.ArgumentParser(description="Export the violence model")
+    parser.add_argument(
+        "--model_path",
+        type=str,
+        default=DEFAULT_MODEL_PATH,
+        help=f"Path to trained model (default: {DEFAULT_MODEL_PATH})",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=EXPORT_FORMATS,
+        default=EXPORT_FORMAT_ONNX,
+        help=f"Export format (default: {EXPORT_FORMAT_ONNX})",
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=None,
+        help="Destination file (default: model path with .onnx or .ts suffix)",
+    )
+    parser.add_argument(
+        "--reference_json",
+        type=str,
+        default=None,
+        help=(
+            "MMPose result file providing the keypoint layout and skeleton "
+            "links (required for skeleton topologies) and real poses for the "
+            "parity check"
+        ),
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Classification threshold to embed. Uses model's threshold if None.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """
+    Export a trained model and check it against the eager model.
+
+    This function:
+    1. Loads the checkpoint and its threshold and topology
+    2. Determines the keypoint layout (from the reference file, if given)
+    3. Exports the dense engine with embedded metadata
+    4. Reloads the export and compares its scores with the eager model
+    """
+    args = parse_arguments()
+
+    model_path = Path(args.model_path)
+    suffix = ".onnx" if args.format == EXPORT_FORMAT_ONNX else ".ts"
+    output_path = (
+        Path(args.output_path) if args.output_path else model_path.with_suffix(suffix)
+    )
+    reference_json = Path(args.reference_json) if args.reference_json else None
+
+    device = torch.device("cpu")
+    try:
+        model, model_threshold, metrics, topology = load_model_and_threshold(
+            model_path, device
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    if is_quantized(model):
+        print(
+            "Error: Quantized checkpoints cannot be exported; export the float "
+            "checkpoint instead."
+        )
+        return
+    model.eval()
+    threshold = args.threshold if args.threshold is not None else model_threshold
+    print(f"Model loaded from {model_path}")
+    print(f"Graph topology: {topology['mode']}")
+
+    try:
+        check_exportable(topology)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    skeleton_links = None
+    num_keypoints = None
+    if reference_json is not None:
+        meta_info, frame = next(iter_frames(reference_json), (None, None))
+        skeleton_links = subset_skeleton_links(
+            skeleton_links_from_meta(meta_info), topology["keypoint_subset"]
+        )
+        instances = frame.get("instances", []) if frame else []
+        if instances:
+            num_keypoints = len(instances[0].get("keypoints", []))
+    if topology["keypoint_subset"] is not None:
+        # The exported model takes the subset's keypoints only
+        num_keypoints = len(topology["keypoint_subset"])
+
+    if topology["mode"] != TOPOLOGY_COMPLETE:
+        if skeleton_links is None or not num_keypoints:
+            print(
+                f"Error: The '{topology['mode']}' topology needs --reference_json "
+                "with skeleton links in its meta_info and at least one person."
+            )
+            return
+        adjacency = dense_adjacency(num_keypoints, topology["mode"], skeleton_links)
+        if not adjacency.any():
+            print("Error: No skeleton link of --reference_json fits the keypoints.")
+            return
+        fixed_keypoints: Optional[int] = num_keypoints
+    else:
+        adjacency = None
+        fixed_keypoints = None
+
+    module = ExportableViolenceModel(
+        DenseViolenceDetectionGNN(model, topology["mode"]), adjacency
+    ).eval()
+    metadata = export_metadata(
+        threshold,
+        metrics,
+        topology,
+        fixed_keypoints,
+        None if topology["mode"] == TOPOLOGY_COMPLETE else skeleton_links,
+    )
+    try:
+        keypoints = parity_keypoints(
+            num_keypoints or DEFAULT_KEYPOINTS,
+            reference_json,
+            keypoint_subset=topology["keypoint_subset"],
+            confidence=topology["confidence"],
+            topology=topology["mode"],
+            skeleton_links=skeleton_links,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    example = torch.tensor(keypoints[:2], dtype=torch.float)
+
+    if args.format == EXPORT_FORMAT_ONNX:
+        export_onnx(module, example, output_path, metadata)
+    else:
+        export_torchscript(module, example, output_path, metadata)
+    print(f"Exported {args.format} model to {output_path}")
+
+    max_diff = check_parity(
+        model,
+        load_exported(output_path, args.format),
+        keypoints,
+        topology,
+        skeleton_links,
+        device,
+    )
+    status = "OK" if max_diff <= PARITY_TOLERANCE else "FAILED"
+    print(
+        f"Parity with eager model on {len(keypoints)} persons: "
+        f"max |diff| = {max_diff:.2e} ({status}, tolerance {PARITY_TOLERANCE})"
+    )
+    if max_diff > PARITY_TOLERANCE:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
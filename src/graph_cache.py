@@ -0,0 +1,687 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk cache of preprocessed pose graphs.
+
+Parsing MMPose JSON files and building graphs can take longer than training
+itself, so this module stores the result once and reuses it across runs:
+- One shard per source JSON file, keyed by file path, mtime, size and the
+  graph topology options, so only new or changed files are reprocessed
+- A consolidated store of concatenated arrays plus offsets (node coordinates,
+  edge pairs, labels, camera ids and source-file ids)
+- A memory-mapped Dataset that rebuilds PyTorch Geometric graphs on access
+
+Shards and stores live in one directory per set of topology options. A store
+is never rewritten: a new one is built in a temporary directory, moved into
+place with an atomic rename and recorded as the latest store, so processes
+that still map the previous store (sweep workers, another train.py) keep
+reading consistent arrays.
+
+Every process that opens a store holds a shared lock on it (also DataLoader
+and sweep workers that reopen it by path). After a build, stores whose source
+files have changed are deleted once no process holds them, and shards that no
+remaining store refers to are deleted with them. Stores of other file sets
+that are still up to date are kept, so switching between sample percentages
+or camera sets never parses a file twice.
+
+Graphs are stored as their valid keypoint coordinates and, for sparse
+topologies, their undirected edge pairs. Complete-graph edges are rebuilt from
+the cached edge templates in gnn.py, which keeps the store compact.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from tqdm import tqdm
+
+from gnn import (
+    DEFAULT_KNN_K,
+    TOPOLOGY_COMPLETE,
+    batch_from_arrays,
+    pose_graph_from_arrays,
+)
+from pose_io import iter_graph_arrays, list_json_files
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Batch, Data
+
+# Bump when the on-disk layout or graph construction changes
+CACHE_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+LATEST_STORE_NAME = "latest_store.json"
+LOCK_NAME = "lock"  # Shared while a store is open or a topology is being built
+STORE_KEY_LENGTH = 16  # Hex digits of the topology and store directory keys
+SHARD_ARRAYS = ("coords", "node_ptr", "pairs", "pair_ptr")
+STORE_ARRAYS = (
+    "coords",
+    "node_ptr",
+    "pairs",
+    "pair_ptr",
+    "labels",
+    "camera_ids",
+    "file_ids",
+)
+
+
+def _file_key(json_file: Path, topology: Dict[str, Any]) -> str:
+    """
+    Compute the cache key of a source file.
+
+    Args:
+        json_file: Path to the MMPose JSON file
+        topology: Graph topology options ({"mode": ..., "knn_k": ...})
+
+    Returns:
+        Hex digest identifying the file contents and graph options
+    """
+    stat = json_file.stat()
+    payload = json.dumps(
+        [
+            CACHE_VERSION,
+            str(json_file.resolve()),
+            stat.st_mtime_ns,
+            stat.st_size,
+            topology["mode"],
+            topology["knn_k"],
+            topology["keypoint_subset"],
+            topology["confidence"],
+        ]
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _manifest_entries(
+    files: Sequence[Tuple[Path, float, int]], topology: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Describe source files as manifest entries.
+
+    Args:
+        files: (json_file, label, camera_id) tuples from pose_io.list_json_files
+        topology: Graph topology options ({"mode": ..., "knn_k": ...})
+
+    Returns:
+        One entry (path, key, label, camera) per file, in file order
+    """
+    return [
+        {
+            "path": str(json_file),
+            "key": _file_key(json_file, topology),
+            "label": label,
+            "camera": camera_id,
+        }
+        for json_file, label, camera_id in files
+    ]
+
+
+def _entries_digest(entries: List[Dict[str, Any]]) -> str:
+    """Hash the keys, labels and camera ids of manifest entries."""
+    payload = json.dumps([(e["key"], e["label"], e["camera"]) for e in entries])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _topology_dir(cache_dir: Path, topology: Dict[str, Any]) -> Path:
+    """
+    Directory holding the shards and stores of one set of topology options.
+
+    Args:
+        cache_dir: Root directory of the cache
+        topology: Graph topology options ({"mode": ..., "knn_k": ...})
+
+    Returns:
+        Path of the topology directory
+    """
+    payload = json.dumps([CACHE_VERSION, topology], sort_keys=True)
+    key = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:STORE_KEY_LENGTH]
+    return cache_dir / f"topology-{key}"
+
+
+def dataset_fingerprint(
+    sources: Sequence[Tuple[Path, Path]],
+    sample_percentage: int,
+    topology: Dict[str, Any],
+) -> str:
+    """
+    Identify the graphs built from a set of source files.
+
+    The fingerprint covers the keys, labels and camera ids the cache manifest
+    would hold, so it changes whenever a file is added, removed or modified,
+    or the topology options change, with or without the graph cache.
+
+    Args:
+        sources: (violent_path, non_violent_path) pairs; the index of each
+                 pair is used as its camera id
+        sample_percentage: Percentage of files to process per directory (1-100)
+        topology: Graph topology options ({"mode": ..., "knn_k": ...})
+
+    Returns:
+        Hex digest of the manifest entries
+    """
+    return _entries_digest(
+        _manifest_entries(list_json_files(sources, sample_percentage), topology)
+    )
+
+
+def _lock(path: Path, shared: bool = True, blocking: bool = True) -> Optional[IO]:
+    """
+    Take an advisory lock on a lock file, creating it if needed.
+
+    The lock is held until the returned file is closed (also when the process
+    exits), and is inherited by forked children.
+
+    Args:
+        path: Lock file; its directory must exist
+        shared: Take a shared lock instead of an exclusive one
+        blocking: Wait for the lock instead of giving up
+
+    Returns:
+        Open lock file, or None if the lock is held elsewhere and blocking is
+        False
+    """
+    lock_file = open(path, "a")
+    flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    try:
+        fcntl.flock(lock_file, flags if blocking else flags | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def _write_shard(shard_path: Path, arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Atomically write the graph arrays of one source file.
+
+    Only the arrays named in SHARD_ARRAYS are kept; the frame grouping is not
+    needed for training.
+
+    Args:
+        shard_path: Destination .npz path
+        arrays: Graph arrays as returned by pose_io.load_graph_arrays
+    """
+    tmp_path = shard_path.with_suffix(".tmp.npz")
+    np.savez(tmp_path, **{name: arrays[name] for name in SHARD_ARRAYS})
+    os.replace(tmp_path, shard_path)
+
+
+def _consolidate(
+    store_dir: Path,
+    shard_dir: Path,
+    entries: List[Dict[str, Any]],
+) -> None:
+    """
+    Concatenate per-file shards into the memory-mappable store.
+
+    Output arrays are written through memory maps, so peak memory is bounded
+    by the largest single shard rather than the whole dataset.
+
+    Args:
+        store_dir: Directory of the consolidated store
+        shard_dir: Directory holding per-file shards
+        entries: Manifest entries (key, label, camera) in store order
+    """
+    # First pass: sizes only
+    num_graphs = num_nodes = num_pairs = 0
+    for entry in entries:
+        with np.load(shard_dir / f"{entry['key']}.npz") as shard:
+            node_ptr, pair_ptr = shard["node_ptr"], shard["pair_ptr"]
+        entry["num_graphs"] = len(node_ptr) - 1
+        num_graphs += len(node_ptr) - 1
+        num_nodes += int(node_ptr[-1])
+        num_pairs += int(pair_ptr[-1])
+
+    def open_array(name: str, dtype: Any, shape: Tuple[int, ...]) -> np.ndarray:
+        return np.lib.format.open_memmap(
+            store_dir / f"{name}.npy", mode="w+", dtype=dtype, shape=shape
+        )
+
+    out = {
+        "coords": open_array("coords", np.float64, (num_nodes, 2)),
+        "node_ptr": open_array("node_ptr", np.int64, (num_graphs + 1,)),
+        "pairs": open_array("pairs", np.int32, (num_pairs, 2)),
+        "pair_ptr": open_array("pair_ptr", np.int64, (num_graphs + 1,)),
+        "labels": open_array("labels", np.float32, (num_graphs,)),
+        "camera_ids": open_array("camera_ids", np.int64, (num_graphs,)),
+        "file_ids": open_array("file_ids", np.int64, (num_graphs,)),
+    }
+    out["node_ptr"][0] = 0
+    out["pair_ptr"][0] = 0
+
+    # Second pass: copy shard contents with global offsets
+    g = n = p = 0
+    for file_id, entry in enumerate(entries):
+        with np.load(shard_dir / f"{entry['key']}.npz") as shard:
+            coords, node_ptr = shard["coords"], shard["node_ptr"]
+            pairs, pair_ptr = shard["pairs"], shard["pair_ptr"]
+        count = len(node_ptr) - 1
+        out["coords"][n : n + len(coords)] = coords
+        out["node_ptr"][g + 1 : g + count + 1] = node_ptr[1:] + n
+        out["pairs"][p : p + len(pairs)] = pairs
+        out["pair_ptr"][g + 1 : g + count + 1] = pair_ptr[1:] + p
+        out["labels"][g : g + count] = entry["label"]
+        out["camera_ids"][g : g + count] = entry["camera"]
+        out["file_ids"][g : g + count] = file_id
+        g, n, p = g + count, n + len(coords), p + len(pairs)
+
+    for array in out.values():
+        array.flush()
+
+
+class PackedGraphDataset(Dataset):
+    """
+    Dataset of pose graphs packed into concatenated arrays.
+
+    All graphs share one coordinate array, one pair array and their per-graph
+    offsets instead of being held as individual Data objects. Single graphs
+    are rebuilt on access, while __getitems__ collates whole batches straight
+    from the arrays (see gnn.batch_from_arrays).
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], topology: Dict[str, Any]):
+        """
+        Wrap packed graph arrays.
+
+        Args:
+            arrays: Arrays named as in STORE_ARRAYS
+            topology: Graph topology options ({"mode": ..., "knn_k": ...})
+        """
+        super(PackedGraphDataset, self).__init__()
+        self.topology = topology
+        self._set_arrays(arrays)
+
+    def _set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Attach the packed arrays."""
+        self.coords = arrays["coords"]
+        self.node_ptr = arrays["node_ptr"]
+        self.pairs = arrays["pairs"]
+        self.pair_ptr = arrays["pair_ptr"]
+        self.labels = arrays["labels"]
+        self.camera_ids = arrays["camera_ids"]
+        self.file_ids = arrays["file_ids"]
+
+    def __len__(self) -> int:
+        """Number of graphs in the dataset."""
+        return len(self.labels)
+
+    def __getitem__(self, idx: int) -> Data:
+        """
+        Rebuild a single graph with its label.
+
+        Args:
+            idx: Graph index
+
+        Returns:
+            PyTorch Geometric Data object with a y attribute
+        """
+        start, end = self.node_ptr[idx], self.node_ptr[idx + 1]
+        valid_keypoints = np.asarray(self.coords[start:end])
+
+        pairs = None
+        if self.topology["mode"] != TOPOLOGY_COMPLETE:
+            start, end = self.pair_ptr[idx], self.pair_ptr[idx + 1]
+            pairs = np.asarray(self.pairs[start:end], dtype=np.int64)
+
+        graph = pose_graph_from_arrays(valid_keypoints, pairs)
+        graph.y = torch.tensor([self.labels[idx]], dtype=torch.float)
+        return graph
+
+    def __getitems__(self, indices: Sequence[int]) -> Batch:
+        """
+        Collate several graphs into one batch without per-graph Data objects.
+
+        DataLoader calls this with the indices of a whole batch (also through
+        a Subset); loaders.make_loader passes the result through as is.
+
+        Args:
+            indices: Graph indices in batch order
+
+        Returns:
+            PyTorch Geometric Batch with a y attribute
+        """
+        complete = self.topology["mode"] == TOPOLOGY_COMPLETE
+        return batch_from_arrays(
+            self.coords,
+            self.node_ptr,
+            indices,
+            pairs=None if complete else self.pairs,
+            pair_ptr=None if complete else self.pair_ptr,
+            labels=self.labels,
+        )
+
+
+class GraphCacheDataset(PackedGraphDataset):
+    """
+    Memory-mapped dataset of preprocessed pose graphs.
+
+    Graphs are rebuilt on access from the consolidated store, so the dataset
+    only keeps the memory-mapped arrays resident.
+    """
+
+    def __init__(self, store_dir: Path):
+        """
+        Open a consolidated graph store.
+
+        Args:
+            store_dir: Directory written by build_graph_cache
+
+        Raises:
+            ValueError: If the store has been deleted
+        """
+        self.store_dir = store_dir
+        self._hold()
+        with open(store_dir / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        self.files = [entry["path"] for entry in manifest["files"]]
+        super(GraphCacheDataset, self).__init__(
+            self._open_arrays(), manifest["topology"]
+        )
+
+    def _hold(self) -> None:
+        """
+        Lock the store against deletion for the lifetime of the dataset.
+
+        Raises:
+            ValueError: If the store has been deleted
+        """
+        try:
+            self._lock_file = _lock(self.store_dir / LOCK_NAME)
+        except FileNotFoundError:
+            self._lock_file = None
+        if self._lock_file is None or not (self.store_dir / MANIFEST_NAME).exists():
+            raise ValueError(f"Graph store {self.store_dir} has been deleted")
+
+    def _open_arrays(self) -> Dict[str, np.ndarray]:
+        """Memory-map the store arrays."""
+        return {
+            name: np.load(self.store_dir / f"{name}.npy", mmap_mode="r")
+            for name in STORE_ARRAYS
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Pickle the dataset without its arrays and lock.
+
+        DataLoader workers started with spawn receive a pickled copy of the
+        dataset; memory maps would be pickled as full in-memory arrays.
+        """
+        state = self.__dict__.copy()
+        for name in (*STORE_ARRAYS, "_lock_file"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restore a pickled dataset by locking and memory-mapping the store."""
+        self.__dict__.update(state)
+        self._hold()
+        self._set_arrays(self._open_arrays())
+
+
+def pack_graph_arrays(
+    file_arrays: Iterable[Tuple[Dict[str, np.ndarray], float, int]],
+    topology: Dict[str, Any],
+) -> PackedGraphDataset:
+    """
+    Pack the graph arrays of several source files into one in-memory dataset.
+
+    This is the in-memory counterpart of the consolidated store, used when
+    the graph cache is disabled.
+
+    Args:
+        file_arrays: (arrays, label, camera id) per source file, with arrays
+                     as returned by pose_io.load_graph_arrays
+        topology: Graph topology options ({"mode": ..., "knn_k": ...})
+
+    Returns:
+        PackedGraphDataset over the graphs of all files, in file order
+    """
+    columns: Dict[str, List[np.ndarray]] = {name: [] for name in STORE_ARRAYS}
+    node_offset = pair_offset = 0
+    for file_id, (arrays, label, camera_id) in enumerate(file_arrays):
+        node_ptr, pair_ptr = arrays["node_ptr"], arrays["pair_ptr"]
+        count = len(node_ptr) - 1
+        columns["coords"].append(arrays["coords"])
+        columns["node_ptr"].append(node_ptr[1:] + node_offset)
+        columns["pairs"].append(arrays["pairs"])
+        columns["pair_ptr"].append(pair_ptr[1:] + pair_offset)
+        columns["labels"].append(np.full(count, label))
+        columns["camera_ids"].append(np.full(count, camera_id))
+        columns["file_ids"].append(np.full(count, file_id))
+        node_offset += int(node_ptr[-1])
+        pair_offset += int(pair_ptr[-1])
+
+    dtypes = {
+        "coords": np.float64,
+        "node_ptr": np.int64,
+        "pairs": np.int32,
+        "pair_ptr": np.int64,
+        "labels": np.float32,
+        "camera_ids": np.int64,
+        "file_ids": np.int64,
+    }
+    columns["node_ptr"].insert(0, np.zeros(1))
+    columns["pair_ptr"].insert(0, np.zeros(1))
+    columns["coords"].append(np.empty((0, 2)))
+    columns["pairs"].append(np.empty((0, 2)))
+    packed = {
+        name: np.concatenate(parts).astype(dtypes[name], copy=False)
+        for name, parts in columns.items()
+    }
+    return PackedGraphDataset(packed, topology)
+
+
+def build_graph_cache(
+    sources: Sequence[Tuple[Path, Path]],
+    cache_dir: Path,
+    sample_percentage: int = 100,
+    topology: str = TOPOLOGY_COMPLETE,
+    knn_k: int = DEFAULT_KNN_K,
+    num_workers: int = 0,
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+) -> GraphCacheDataset:
+    """
+    Preprocess MMPose JSON files into the graph cache and open it.
+
+    Only files whose path, mtime, size or topology options changed since the
+    last run are parsed again. A new consolidated store is built only when no
+    store of the same files exists; outdated stores and their shards are then
+    deleted, except those other processes still hold.
+
+    Args:
+        sources: (violent_path, non_violent_path) pairs; the index of each
+                 pair is used as its camera id
+        cache_dir: Root directory of the cache
+        sample_percentage: Percentage of files to process per directory (1-100)
+        topology: Graph edge topology (see gnn.TOPOLOGY_MODES)
+        knn_k: Number of nearest neighbours for the "skeleton_knn" topology
+        num_workers: Number of worker processes for parsing changed files
+                     (0 parses in this process)
+        keypoint_subset: Keypoint indices to keep (see gnn.KEYPOINT_SUBSETS),
+                         or None to keep every keypoint
+        confidence: Instance confidence filter (see
+                    pose_io.make_confidence_filter), or None to keep every person
+
+    Returns:
+        GraphCacheDataset over all cached graphs
+    """
+    topology_options = {
+        "mode": topology,
+        "knn_k": knn_k,
+        "keypoint_subset": None if keypoint_subset is None else list(keypoint_subset),
+        "confidence": confidence,
+    }
+    files = list_json_files(sources, sample_percentage)
+
+    topology_dir = _topology_dir(cache_dir, topology_options)
+    shard_dir = topology_dir / "shards"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    # Held until the new store is in place, so that no shard it needs is pruned
+    build_lock = _lock(topology_dir / LOCK_NAME)
+    assert build_lock is not None
+    entries = _manifest_entries(files, topology_options)
+
+    # Parse only the files without an up-to-date shard
+    missing = [e for e in entries if not (shard_dir / f"{e['key']}.npz").exists()]
+    shard_arrays = iter_graph_arrays(
+        (Path(e["path"]) for e in missing),
+        topology,
+        knn_k,
+        num_workers,
+        topology_options["keypoint_subset"],
+        confidence,
+    )
+    for entry, arrays in tqdm(
+        zip(missing, shard_arrays), total=len(missing), desc="Caching pose graphs"
+    ):
+        _write_shard(shard_dir / f"{entry['key']}.npz", arrays)
+    print(f"Graph cache: {len(missing)} of {len(files)} files (re)processed")
+
+    # A store is identified by its files, so an existing one is up to date
+    store_dir = topology_dir / f"store-{_entries_digest(entries)[:STORE_KEY_LENGTH]}"
+    if not (store_dir / MANIFEST_NAME).exists():
+        tmp_dir = topology_dir / f"{store_dir.name}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        (tmp_dir / LOCK_NAME).touch()
+        _consolidate(tmp_dir, shard_dir, entries)
+        manifest = {
+            "version": CACHE_VERSION,
+            "topology": topology_options,
+            "files": entries,
+        }
+        with open(tmp_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        try:
+            os.replace(tmp_dir, store_dir)
+        except OSError:
+            # Another process moved the same store into place first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    _set_latest_store(cache_dir, store_dir)
+    graphs = GraphCacheDataset(store_dir)
+    _remove_stale(topology_dir, build_lock)
+    return graphs
+
+
+def _set_latest_store(cache_dir: Path, store_dir: Path) -> None:
+    """
+    Atomically record the store that open_graph_cache opens.
+
+    Args:
+        cache_dir: Root directory of the cache
+        store_dir: Store built last
+    """
+    tmp_path = cache_dir / f"{LATEST_STORE_NAME}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"store": str(store_dir.relative_to(cache_dir))}, f)
+    os.replace(tmp_path, cache_dir / LATEST_STORE_NAME)
+
+
+def _is_current(store_dir: Path) -> bool:
+    """
+    Check whether the source files of a store are unchanged.
+
+    Args:
+        store_dir: Consolidated store
+
+    Returns:
+        True if every source file still exists with the key it was stored under
+    """
+    with open(store_dir / MANIFEST_NAME, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    for entry in manifest["files"]:
+        json_file = Path(entry["path"])
+        if not json_file.exists():
+            return False
+        if _file_key(json_file, manifest["topology"]) != entry["key"]:
+            return False
+    return True
+
+
+def _remove_stale(topology_dir: Path, build_lock: IO) -> None:
+    """
+    Delete the outdated stores and the unused shards of a topology.
+
+    A store is outdated once one of its source files changed or disappeared,
+    and it is only deleted when no process holds it open. Shards are deleted
+    when no remaining store refers to them, and only while no other process
+    is building a store of the topology (which may still need them).
+
+    Args:
+        topology_dir: Directory of the topology options
+        build_lock: Shared build lock of this process, released here
+    """
+    for path in topology_dir.glob("store-*"):
+        if path.name.endswith(".tmp") or not (path / MANIFEST_NAME).exists():
+            continue
+        if _is_current(path):
+            continue
+        store_lock = _lock(path / LOCK_NAME, shared=False, blocking=False)
+        if store_lock is None:
+            continue  # Still open elsewhere; a later build deletes it
+        with store_lock:
+            # Moved away first, so that no process can open it any more
+            doomed = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            os.replace(path, doomed)
+        shutil.rmtree(doomed, ignore_errors=True)
+
+    # Upgrade to an exclusive lock, which fails while others are building
+    try:
+        fcntl.flock(build_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        build_lock.close()
+        return
+    with build_lock:
+        referenced = set()
+        for manifest_path in topology_dir.glob(f"store-*/{MANIFEST_NAME}"):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                referenced.update(f"{e['key']}.npz" for e in json.load(f)["files"])
+        for path in (topology_dir / "shards").glob("*.npz"):
+            if path.name not in referenced and not path.name.endswith(".tmp.npz"):
+                path.unlink(missing_ok=True)
+
+
+def open_graph_cache(cache_dir: Path) -> GraphCacheDataset:
+    """
+    Open the store built last without checking its source files.
+
+    Args:
+        cache_dir: Root directory of the cache
+
+    Returns:
+        GraphCacheDataset over the graphs of the latest store
+
+    Raises:
+        ValueError: If the cache has not been built
+    """
+    latest_path = cache_dir / LATEST_STORE_NAME
+    store_dir = None
+    if latest_path.exists():
+        with open(latest_path, "r", encoding="utf-8") as f:
+            store_dir = cache_dir / json.load(f)["store"]
+    if store_dir is None or not (store_dir / MANIFEST_NAME).exists():
+        raise ValueError(
+            f"No graph cache in {cache_dir}; build it with train.py --preprocess_only"
+        )
+    return GraphCacheDataset(store_dir)
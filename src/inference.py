@@ -4,34 +4,161 @@ Violence detection inference script for MMPose JSON files.
 
 This script uses a trained Graph Neural Network model to predict violence
 scores from human pose data in MMPose JSON format. It provides:
-- Command-line interface for batch processing
+- Command-line interface for single files and batch processing of
+  directories, glob patterns or manifest files
 - Score interpretation based on configurable thresholds
 - Detailed per-frame analytics and overall statistics
+- An optional cascade, in which a cheap prefilter decides the clear cases
+  and only uncertain person graphs reach the full model
+- An optional pipelined batch mode, in which parsing, graph building,
+  scoring and writing run concurrently
 """
 
 from __future__ import annotations
 
 import argparse
+import glob
 import json
+import os
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import numpy as np
 import torch
-from torch_geometric.data import Data
+from tqdm import tqdm
 
 # Import from separate component files
-from gnn import create_pose_graph
-from model import ViolenceDetectionGNN, get_device
+from cascade import CascadeModel, load_cascade
+from dense import DenseViolenceDetectionGNN
+from gnn import (
+    DEFAULT_KNN_K,
+    DEFAULT_PREPROCESSING,
+    TOPOLOGY_COMPLETE,
+    create_pose_graph,
+    pose_graph_arrays,
+    skeleton_links_from_meta,
+    subset_skeleton_links,
+)
+from model import (
+    QUANTIZED_DEVICE,
+    ViolenceDetectionGNN,
+    get_device,
+    is_quantized,
+    quantize_model,
+)
+from pipeline import DEFAULT_QUEUE_SIZE, Pipeline, format_report
+from pose_io import (
+    graphs_from_arrays,
+    iter_frames,
+    iter_graph_arrays,
+    select_instances,
+)
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Data
 
 # Constants for inference
 DEFAULT_MODEL_PATH = "violence_detection_model.pt"
 DEFAULT_OUTPUT_PATH = "violence_scores.json"
 THRESHOLD_MARGIN = 0.2  # Margin for interpretation confidence levels
-MODEL_IN_CHANNELS = 2
-MODEL_HIDDEN_CHANNELS = 64
-MODEL_TRANSFORMER_HEADS = 4
-MODEL_TRANSFORMER_LAYERS = 2
+# Architecture of checkpoints saved without a model config
+LEGACY_MODEL_CONFIG = {
+    "in_channels": 2,
+    "hidden_channels": 64,
+    "transformer_heads": 4,
+    "transformer_layers": 2,
+}
+DEFAULT_BATCH_SIZE = 256  # Person graphs per forward pass
+DEFAULT_TOPOLOGY = {
+    "mode": TOPOLOGY_COMPLETE,
+    "knn_k": DEFAULT_KNN_K,
+    "keypoint_subset": None,
+    "confidence": None,
+}
+ENGINE_SPARSE = "sparse"  # PyG message passing over edge_index
+ENGINE_DENSE = "dense"  # Batched matmuls over padded graphs (see dense.py)
+ENGINES = (ENGINE_SPARSE, ENGINE_DENSE)
+BACKEND_TORCH = "torch"  # PyTorch checkpoint
+BACKEND_ONNXRUNTIME = "onnxruntime"  # ONNX model written by export.py
+BACKENDS = (BACKEND_TORCH, BACKEND_ONNXRUNTIME)
+EXPORT_METADATA_KEY = "violence_detection"  # Metadata of exported models
+DEFAULT_OUTPUT_DIR = "violence_scores"
+RESULTS_SUFFIX = "_results.json"  # Per-file output name, as in the Makefile
+SUMMARY_FILE_NAME = "summary.json"
+# Leave one core for scoring while the others parse upcoming files
+DEFAULT_NUM_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+SUMMARY_FIELDS = (
+    "overall_violence_score",
+    "is_violent_overall",
+    "violent_frame_percentage",
+    "interpretation",
+)
+
+
+class OnnxViolenceModel:
+    """
+    Exported violence model running on onnxruntime.
+
+    The model takes padded person keypoints and returns one score per person
+    (see export.py); the threshold and graph topology are read from the
+    metadata embedded at export time.
+    """
+
+    def __init__(self, model_path: Path, device: str = "cpu"):
+        """
+        Build the onnxruntime session.
+
+        Args:
+            model_path: Path to the .onnx file written by export.py
+            device: "cpu" or "cuda"
+        """
+        import onnxruntime as ort
+
+        providers = (
+            ["CPUExecutionProvider"]
+            if device == "cpu"
+            else ["CUDAExecutionProvider", "CPUExecutionProvider"]
+        )
+        try:
+            self.session = ort.InferenceSession(str(model_path), providers=providers)
+        except Exception as e:
+            # onnxruntime errors do not share a more specific base class
+            raise ValueError(f"Cannot load ONNX model {model_path}: {e}") from e
+        self.input_name = self.session.get_inputs()[0].name
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if EXPORT_METADATA_KEY not in metadata:
+            raise ValueError(f"{model_path} was not exported by export.py")
+        self.metadata = json.loads(metadata[EXPORT_METADATA_KEY])
+        self.threshold = float(self.metadata["threshold"])
+        self.metrics = self.metadata.get("metrics")
+        self.topology = dict(DEFAULT_TOPOLOGY, **self.metadata["topology"])
+        # Links the exported adjacency was built from (None for complete graphs)
+        self.skeleton_links = self.metadata["skeleton_links"]
+
+    def predict(self, keypoints: np.ndarray) -> np.ndarray:
+        """
+        Score padded person keypoints.
+
+        Args:
+            keypoints: Keypoints [persons, keypoints, 2] of persons that form
+                       a graph (see iter_frame_keypoints)
+
+        Returns:
+            Violence scores [persons]
+        """
+        feed = {self.input_name: keypoints.astype(np.float32)}
+        return self.session.run(None, feed)[0]
 
 
 def interpret_score(score: float, threshold: float) -> Tuple[str, bool]:
@@ -60,90 +187,741 @@ def interpret_score(score: float, threshold: float) -> Tuple[str, bool]:
         return "Likely violent", is_violent
 
 
-def load_and_process_json(json_file: Path) -> List[Tuple[int, List[Data]]]:
+def build_frame_graphs(
+    instances: List[Dict[str, Any]],
+    topology: str = TOPOLOGY_COMPLETE,
+    skeleton_links: Optional[List[List[int]]] = None,
+    knn_k: int = DEFAULT_KNN_K,
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+) -> List[Data]:
+    """
+    Build the pose graphs of one frame's person instances.
+
+    Args:
+        instances: Person instances in MMPose format (dicts with "keypoints")
+        topology: Graph edge topology (see gnn.TOPOLOGY_MODES)
+        skeleton_links: Skeleton links from the file's meta_info, in the
+                        indexing of keypoint_subset
+        knn_k: Number of nearest neighbours for the "skeleton_knn" topology
+        keypoint_subset: Keypoint indices the model was trained on, or None
+                         for every keypoint
+        confidence: Instance confidence filter the model was trained with
+                    (see pose_io.make_confidence_filter), or None
+
+    Returns:
+        Graphs of the instances with valid poses that pass the confidence
+        filter, in instance order
+
+    Raises:
+        ValueError: If a pose has fewer keypoints than keypoint_subset needs
+    """
+    frame_graphs = []
+    for keypoints in select_instances(instances, keypoint_subset, confidence):
+        # Create graph from keypoints
+        graph = create_pose_graph(
+            keypoints,
+            topology=topology,
+            skeleton_links=skeleton_links,
+            knn_k=knn_k,
+        )
+        if graph is not None:
+            frame_graphs.append(graph)
+    return frame_graphs
+
+
+def iter_frame_graphs(
+    json_file: Path,
+    topology: str = TOPOLOGY_COMPLETE,
+    knn_k: int = DEFAULT_KNN_K,
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[int, List[Data]]]:
+    """
+    Stream the pose graphs of an MMPose JSON file frame by frame.
+
+    The file is read incrementally, so graphs for a frame are built as soon
+    as the frame has been parsed and memory does not grow with video length.
+    Frames without any valid pose are skipped.
+
+    Args:
+        json_file: Path to the JSON file
+        topology: Graph edge topology (see gnn.TOPOLOGY_MODES)
+        knn_k: Number of nearest neighbours for the "skeleton_knn" topology
+        keypoint_subset: Keypoint indices the model was trained on, or None
+                         for every keypoint
+        confidence: Instance confidence filter the model was trained with
+                    (see pose_io.make_confidence_filter), or None
+
+    Yields:
+        Tuples containing (frame_id, list_of_graph_data)
+    """
+    for meta_info, frame_data in iter_frames(json_file):
+        # Skeleton links are needed by the sparse topologies
+        skeleton_links = subset_skeleton_links(
+            skeleton_links_from_meta(meta_info), keypoint_subset
+        )
+
+        frame_id = frame_data.get("frame_id")
+        frame_graphs = build_frame_graphs(
+            frame_data.get("instances", []),
+            topology,
+            skeleton_links,
+            knn_k,
+            keypoint_subset,
+            confidence,
+        )
+
+        if frame_graphs:
+            yield frame_id, frame_graphs
+
+
+def iter_frame_keypoints(
+    json_file: Path,
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+    topology: str = TOPOLOGY_COMPLETE,
+    skeleton_links: Optional[Sequence[Sequence[int]]] = None,
+) -> Iterator[Tuple[int, List[np.ndarray]]]:
+    """
+    Stream the person keypoints of an MMPose JSON file frame by frame.
+
+    This is the input of exported models, which build their graphs
+    internally. Persons that would not form a graph (fewer than
+    MIN_VALID_KEYPOINTS valid keypoints, or no remaining edge in a sparse
+    topology) are dropped, and frames without any valid pose are skipped, as
+    in iter_frame_graphs.
+
+    Args:
+        json_file: Path to the JSON file
+        keypoint_subset: Keypoint indices the model was exported for, or None
+                         for every keypoint
+        confidence: Instance confidence filter the model was exported with, or
+                    None
+        topology: Graph edge topology the model was exported with
+        skeleton_links: Skeleton links of the exported adjacency, required
+                        for sparse topologies (OnnxViolenceModel.skeleton_links)
+
+    Yields:
+        Tuples containing (frame_id, list of keypoint arrays [num_keypoints, 2])
+
+    Raises:
+        ValueError: If a pose has fewer keypoints than keypoint_subset needs
+    """
+    for _, frame_data in iter_frames(json_file):
+        frame_keypoints = [
+            keypoints
+            for keypoints in select_instances(
+                frame_data.get("instances", []), keypoint_subset, confidence
+            )
+            if pose_graph_arrays(keypoints, topology, skeleton_links) is not None
+        ]
+
+        if frame_keypoints:
+            yield frame_data.get("frame_id"), frame_keypoints
+
+
+def load_and_process_json(
+    json_file: Path,
+    topology: str = TOPOLOGY_COMPLETE,
+    knn_k: int = DEFAULT_KNN_K,
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+) -> List[Tuple[int, List[Data]]]:
     """
     Load and process a single MMPose JSON file for inference.
 
     Extracts pose keypoints from the MMPose JSON format and converts them
-    to graph representations suitable for GNN processing.
+    to graph representations suitable for GNN processing. The topology must
+    match the one the model was trained with. Use iter_frame_graphs to
+    process frames as they are parsed instead of collecting them all.
 
     Args:
         json_file: Path to the JSON file
+        topology: Graph edge topology (see gnn.TOPOLOGY_MODES)
+        knn_k: Number of nearest neighbours for the "skeleton_knn" topology
+        keypoint_subset: Keypoint indices the model was trained on, or None
+                         for every keypoint
+        confidence: Instance confidence filter the model was trained with
+                    (see pose_io.make_confidence_filter), or None
 
     Returns:
         List of tuples containing (frame_id, list_of_graph_data)
     """
-    graphs = []
+    return list(
+        iter_frame_graphs(json_file, topology, knn_k, keypoint_subset, confidence)
+    )
 
-    with open(json_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    # Process each frame in the JSON file
-    for frame_data in data.get("instance_info", []):
-        frame_id = frame_data.get("frame_id")
-        instances = frame_data.get("instances", [])
+def frame_graphs_from_arrays(
+    arrays: Dict[str, np.ndarray], topology: str = TOPOLOGY_COMPLETE
+) -> Iterator[Tuple[Any, List[Data]]]:
+    """
+    Group the graphs of one file by frame.
 
-        frame_graphs = []
-        for instance in instances:
-            keypoints = instance.get("keypoints", [])
-            if keypoints:
-                # Convert to numpy array
-                keypoints_np = np.array(keypoints)
+    Args:
+        arrays: Graph arrays as returned by pose_io.load_graph_arrays
+        topology: Graph edge topology the arrays were built with
 
-                # Create graph from keypoints
-                graph = create_pose_graph(keypoints_np)
-                if graph is not None:
-                    frame_graphs.append(graph)
+    Yields:
+        Tuples containing (frame_id, list_of_graph_data), with frame ids as
+        stored in the file, as in iter_frame_graphs
+    """
+    graphs = graphs_from_arrays(arrays, topology)
+    frame_ptr = arrays["frame_ptr"]
+    for i, frame_id in enumerate(arrays["frame_ids"].tolist()):
+        yield frame_id, graphs[frame_ptr[i] : frame_ptr[i + 1]]
 
-        if frame_graphs:
-            graphs.append((frame_id, frame_graphs))
 
-    return graphs
+def resolve_input_files(source: str) -> List[Path]:
+    """
+    Expand a batch input into the MMPose JSON files it refers to.
 
+    The source may be a directory (all *.json files in it), a glob pattern
+    ("**" matches subdirectories), a single JSON file, or a manifest text file
+    listing one JSON path per line. Blank manifest lines and lines starting
+    with "#" are ignored; relative paths are resolved against the manifest's
+    directory.
 
-def predict_violence(
+    Args:
+        source: Directory, glob pattern, JSON file or manifest file
+
+    Returns:
+        List of JSON file paths in deterministic order
+    """
+    path = Path(source)
+
+    if path.is_dir():
+        files = sorted(path.glob("*.json"))
+    elif any(char in source for char in "*?["):
+        files = sorted(Path(f) for f in glob.glob(source, recursive=True))
+    elif not path.is_file():
+        raise ValueError(f"Input {source} does not exist")
+    elif path.suffix == ".json":
+        files = [path]
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        files = [
+            path.parent / line for line in lines if line and not line.startswith("#")
+        ]
+        missing = [str(f) for f in files if not f.is_file()]
+        if missing:
+            raise ValueError(f"Files listed in {source} do not exist: {missing}")
+
+    if not files:
+        raise ValueError(f"No JSON files found for input: {source}")
+    return files
+
+
+def _forward_batch(
     model: ViolenceDetectionGNN, graphs: List[Data], device: torch.device
+) -> torch.Tensor:
+    """
+    Score a list of graphs with a single forward pass.
+
+    Args:
+        model: Trained GNN model (in eval mode), a CascadeModel, or an
+               OnnxViolenceModel
+        graphs: Graphs to collate into one PyG batch, or person keypoint
+                arrays for an OnnxViolenceModel
+        device: Device to run inference on
+
+    Returns:
+        Violence scores on the CPU as float64 [num_graphs]
+    """
+    if isinstance(model, OnnxViolenceModel):
+        return torch.from_numpy(model.predict(np.stack(graphs)).astype(np.float64))
+    if isinstance(model, CascadeModel):
+        return model.predict(graphs, device)
+
+    from torch_geometric.data import Batch
+
+    batch = Batch.from_data_list(graphs).to(device)
+    scores = model(batch.x, batch.edge_index, batch.batch)
+    return scores.view(-1).cpu().double()
+
+
+def predict_violence(
+    model: ViolenceDetectionGNN,
+    graphs: List[Data],
+    device: torch.device,
+    batch_size: int = DEFAULT_BATCH_SIZE,
 ) -> List[float]:
     """
     Predict violence scores for graphs.
 
-    Runs each pose graph through the model to generate a violence score,
-    handling batch creation for single-graph inference.
+    Collates the pose graphs into PyG batches of up to batch_size graphs, so
+    each batch costs one forward pass and one device synchronization.
 
     Args:
         model: Trained GNN model
         graphs: List of graph data objects
         device: Device to run inference on
+        batch_size: Maximum number of graphs per forward pass
 
     Returns:
         List of violence scores between 0 and 1
     """
-    model.eval()
+    if isinstance(model, torch.nn.Module):
+        model.eval()
     scores = []
 
     with torch.no_grad():
-        for graph in graphs:
-            graph = graph.to(device)
+        for start in range(0, len(graphs), batch_size):
+            scores.append(
+                _forward_batch(model, graphs[start : start + batch_size], device)
+            )
 
-            # Add batch dimension for single graph
-            if not hasattr(graph, "batch"):
-                graph.batch = torch.zeros(
-                    graph.x.shape[0], dtype=torch.long, device=device
-                )
+    return torch.cat(scores).tolist() if scores else []
+
+
+def _frame_means(scores: torch.Tensor, frame_sizes: List[int]) -> torch.Tensor:
+    """
+    Average person scores per frame with a segment reduction.
+
+    Args:
+        scores: Person scores of consecutive frames [sum(frame_sizes)]
+        frame_sizes: Number of persons in each frame
+
+    Returns:
+        Mean score of each frame [len(frame_sizes)], 0 for frames without
+        persons
+    """
+    sizes = torch.tensor(frame_sizes)
+    frame_index = torch.repeat_interleave(torch.arange(len(frame_sizes)), sizes)
+    sums = torch.zeros(len(frame_sizes), dtype=scores.dtype)
+    sums.index_add_(0, frame_index, scores)
+    return sums / sizes.clamp(min=1).to(scores.dtype)
+
+
+def score_frames(
+    model: ViolenceDetectionGNN,
+    frames: Iterable[Tuple[int, List[Data]]],
+    device: torch.device,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[Tuple[int, float, List[float]]]:
+    """
+    Score a stream of frames, batching person graphs across frames.
+
+    Graphs from consecutive frames are collated into batches of exactly
+    batch_size graphs (the last batch may be smaller). A frame is emitted as
+    soon as all of its graphs have been scored, with its average computed by
+    a segment reduction over the batch scores. A frame without graphs gets an
+    average score of 0.
+
+    Args:
+        model: Trained GNN model
+        frames: Iterable of (frame_id, list_of_graph_data), e.g. from
+                iter_frame_graphs
+        device: Device to run inference on
+        batch_size: Number of graphs per forward pass
+
+    Yields:
+        Tuples of (frame_id, average frame score, list of person scores)
+    """
+    if isinstance(model, torch.nn.Module):
+        model.eval()
+
+    pending_frames: List[Tuple[int, int]] = []  # (frame_id, num_graphs)
+    unscored: List[Data] = []
+    scored = torch.empty(0, dtype=torch.float64)
+
+    def emit(flush: bool) -> Iterator[Tuple[int, float, List[float]]]:
+        nonlocal scored
+        # Frames whose graphs have all been scored
+        sizes = [size for _, size in pending_frames]
+        ends = np.cumsum(sizes)
+        num_done = (
+            len(sizes) if flush else int(np.searchsorted(ends, len(scored), "right"))
+        )
+        if num_done == 0:
+            return
+
+        num_scores = int(ends[num_done - 1])
+        frame_scores = scored[:num_scores]
+        means = _frame_means(frame_scores, sizes[:num_done]).tolist()
+        person_scores = frame_scores.tolist()
+
+        start = 0
+        for (frame_id, size), mean in zip(pending_frames[:num_done], means):
+            yield frame_id, mean, person_scores[start : start + size]
+            start += size
+
+        del pending_frames[:num_done]
+        scored = scored[num_scores:]
+
+    with torch.no_grad():
+        for frame_id, frame_graphs in frames:
+            pending_frames.append((frame_id, len(frame_graphs)))
+            unscored.extend(frame_graphs)
+
+            while len(unscored) >= batch_size:
+                batch_scores = _forward_batch(model, unscored[:batch_size], device)
+                scored = torch.cat([scored, batch_scores])
+                del unscored[:batch_size]
+                yield from emit(flush=False)
+
+        if unscored:
+            scored = torch.cat([scored, _forward_batch(model, unscored, device)])
+        yield from emit(flush=True)
+
+
+def summarize_frames(
+    file_name: str,
+    scored_frames: Iterable[Tuple[int, float, List[float]]],
+    threshold: float,
+) -> Optional[Dict[str, Any]]:
+    """
+    Interpret scored frames and compute the overall statistics of one file.
+
+    Args:
+        file_name: Name of the scored input file
+        scored_frames: Tuples of (frame_id, average score, person scores), e.g.
+                       from score_frames
+        threshold: Classification threshold
+
+    Returns:
+        Output dictionary with per-frame results and overall statistics, or
+        None if no frame contained valid pose data
+    """
+    results = []
+    violent_frame_count = 0
+
+    for frame_id, avg_score, frame_scores in scored_frames:
+        interpretation, is_violent = interpret_score(avg_score, threshold)
+        if is_violent:
+            violent_frame_count += 1
+
+        results.append(
+            {
+                "frame_id": frame_id,
+                "violence_score": float(avg_score),
+                "is_violent": bool(is_violent),
+                "interpretation": interpretation,
+                "person_scores": [float(score) for score in frame_scores],
+            }
+        )
+
+    if not results:
+        return None
+
+    overall_score = np.mean([r["violence_score"] for r in results])
+    overall_interpretation, is_violent_overall = interpret_score(
+        overall_score, threshold
+    )
+    violent_percentage = (violent_frame_count / len(results)) * 100
+
+    return {
+        "file_name": str(file_name),
+        "results": results,
+        "overall_violence_score": float(overall_score),
+        "is_violent_overall": bool(is_violent_overall),
+        "violent_frame_percentage": float(violent_percentage),
+        "classification_threshold": float(threshold),
+        "interpretation": str(overall_interpretation),
+    }
+
+
+def _write_json(output_file: Path, data: Dict[str, Any]) -> None:
+    """
+    Atomically write a JSON file, so an interrupted run never leaves a
+    partial result that would later be mistaken for a finished one.
+
+    Args:
+        output_file: Destination path
+        data: JSON-serializable dictionary
+    """
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_file, output_file)
+
+
+def _read_summary(output_file: Path) -> Optional[Dict[str, Any]]:
+    """
+    Read the overall statistics of an existing result file.
+
+    Args:
+        output_file: Result file written by a previous run
+
+    Returns:
+        Summary fields of the file, or None if it is missing or unreadable
+    """
+    try:
+        with open(output_file, "r", encoding="utf-8") as f:
+            output_data = json.load(f)
+        return {field: output_data[field] for field in SUMMARY_FIELDS}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
 
-            # Forward pass
-            score = model(graph.x, graph.edge_index, graph.batch)
-            scores.append(score.item())
 
-    return scores
+def _plan_outputs(
+    input_files: List[Path], output_dir: Path, overwrite: bool
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Path, Path, Dict[str, Any]]]]:
+    """
+    Assign result files to batch inputs and find the ones still to score.
+
+    Args:
+        input_files: MMPose JSON files to score
+        output_dir: Directory for the per-file results
+        overwrite: Rescore files that already have a result
+
+    Returns:
+        Tuple of (one summary entry per input file, (input file, output file,
+        summary entry) of the files to score)
+
+    Raises:
+        ValueError: If two input files would write the same result file
+    """
+    output_files = [output_dir / f"{f.stem}{RESULTS_SUFFIX}" for f in input_files]
+    if len(set(output_files)) != len(output_files):
+        raise ValueError("Input files must have distinct names in batch mode")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    summary = []
+    pending = []
+    for input_file, output_file in zip(input_files, output_files):
+        entry = {"file_name": input_file.name, "output_file": str(output_file)}
+        previous = None if overwrite else _read_summary(output_file)
+        if previous is not None:
+            entry.update(status="skipped", **previous)
+        else:
+            pending.append((input_file, output_file, entry))
+        summary.append(entry)
+
+    print(f"Scoring {len(pending)} of {len(input_files)} files")
+    return summary, pending
+
+
+def _finish_file(
+    input_file: Path,
+    output_file: Path,
+    entry: Dict[str, Any],
+    scored_frames: Iterable[Tuple[int, float, List[float]]],
+    threshold: float,
+) -> Dict[str, Any]:
+    """
+    Write the results of one file and record them in its summary entry.
+
+    Args:
+        input_file: Scored MMPose JSON file
+        output_file: Result file to write
+        entry: Summary entry of the file, updated in place
+        scored_frames: Scored frames of the file, as yielded by score_frames
+        threshold: Classification threshold
+
+    Returns:
+        The updated summary entry
+    """
+    output_data = summarize_frames(input_file.name, scored_frames, threshold)
+    if output_data is None:
+        entry["status"] = "no_pose_data"
+        return entry
+
+    _write_json(output_file, output_data)
+    entry.update(
+        status="scored", **{field: output_data[field] for field in SUMMARY_FIELDS}
+    )
+    return entry
+
+
+def score_files(
+    model: ViolenceDetectionGNN,
+    input_files: List[Path],
+    output_dir: Path,
+    threshold: float,
+    device: torch.device,
+    topology: Dict[str, Any] = DEFAULT_TOPOLOGY,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    num_workers: int = DEFAULT_NUM_WORKERS,
+    overwrite: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Score many MMPose JSON files with one loaded model.
+
+    Upcoming files are parsed into graph arrays by num_workers background
+    processes while the model scores the current one (an OnnxViolenceModel
+    reads keypoints in this process instead). Each file's results are
+    written to <output_dir>/<stem>_results.json. Files whose result already
+    exists and is readable are skipped unless overwrite is set, so an
+    interrupted run can simply be restarted.
+
+    Args:
+        model: Trained GNN model or OnnxViolenceModel
+        input_files: MMPose JSON files to score
+        output_dir: Directory for the per-file results
+        threshold: Classification threshold
+        device: Device to run inference on
+        topology: Graph topology options the model was trained with
+        batch_size: Person graphs per forward pass
+        num_workers: Number of parsing processes (0 parses in this process)
+        overwrite: Rescore files that already have a result
+
+    Returns:
+        One summary entry per input file, in input order
+    """
+    summary, pending = _plan_outputs(input_files, output_dir, overwrite)
+    pending_files = [input_file for input_file, _, _ in pending]
+    if isinstance(model, OnnxViolenceModel):
+        # Exported models take keypoints, which are streamed in this process
+        file_frames = (
+            iter_frame_keypoints(
+                f,
+                topology["keypoint_subset"],
+                topology["confidence"],
+                topology["mode"],
+                model.skeleton_links,
+            )
+            for f in pending_files
+        )
+    else:
+        file_frames = (
+            frame_graphs_from_arrays(arrays, topology["mode"])
+            for arrays in iter_graph_arrays(
+                pending_files,
+                topology["mode"],
+                topology["knn_k"],
+                num_workers,
+                topology["keypoint_subset"],
+                topology["confidence"],
+            )
+        )
+
+    for (input_file, output_file, entry), frames in tqdm(
+        zip(pending, file_frames), total=len(pending), desc="Scoring files"
+    ):
+        _finish_file(
+            input_file,
+            output_file,
+            entry,
+            score_frames(model, frames, device, batch_size),
+            threshold,
+        )
+
+    return summary
+
+
+def score_files_pipelined(
+    model: ViolenceDetectionGNN,
+    input_files: List[Path],
+    output_dir: Path,
+    threshold: float,
+    device: torch.device,
+    topology: Dict[str, Any] = DEFAULT_TOPOLOGY,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    num_workers: int = DEFAULT_NUM_WORKERS,
+    overwrite: bool = False,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, float]]]:
+    """
+    Score many MMPose JSON files with the steps running as a pipeline.
+
+    Does what score_files does, but parsing, graph building, model scoring
+    and result writing each run on their own thread (see pipeline.py):
+    - parse: num_workers processes turn files into graph arrays (an
+      OnnxViolenceModel only lists the files here)
+    - build: graph arrays are split into the pose graphs of each frame (an
+      OnnxViolenceModel reads the keypoints of each frame here)
+    - score: graphs are batched across frames and files for the model
+    - write: the results of each file are summarized and written
+
+    Items between the stages are frames, buffered in queues of queue_size
+    frames, so the model stage always has the next frames ready while
+    memory stays bounded.
+
+    Args:
+        model: Trained GNN model or OnnxViolenceModel
+        input_files: MMPose JSON files to score
+        output_dir: Directory for the per-file results
+        threshold: Classification threshold
+        device: Device to run inference on
+        topology: Graph topology options the model was trained with
+        batch_size: Person graphs per forward pass
+        num_workers: Number of parsing processes (0 parses on the parse thread)
+        overwrite: Rescore files that already have a result
+        queue_size: Frames buffered after each stage
+
+    Returns:
+        Tuple of (one summary entry per input file, in input order, per-stage
+        statistics as returned by Pipeline.report)
+    """
+    summary, pending = _plan_outputs(input_files, output_dir, overwrite)
+    pending_files = [input_file for input_file, _, _ in pending]
+
+    # Frames are tagged with the position of their file in pending
+    if isinstance(model, OnnxViolenceModel):
+        source: Iterable[Tuple[int, Any]] = enumerate(pending_files)
+
+        def build(files: Iterator[Tuple[int, Path]]) -> Iterator[Tuple[Any, Any]]:
+            for index, input_file in files:
+                for frame_id, frame in iter_frame_keypoints(
+                    input_file,
+                    topology["keypoint_subset"],
+                    topology["confidence"],
+                    topology["mode"],
+                    model.skeleton_links,
+                ):
+                    yield (index, frame_id), frame
+
+    else:
+        source = enumerate(
+            iter_graph_arrays(
+                pending_files,
+                topology["mode"],
+                topology["knn_k"],
+                num_workers,
+                topology["keypoint_subset"],
+                topology["confidence"],
+            )
+        )
+
+        def build(
+            file_arrays: Iterator[Tuple[int, Dict[str, np.ndarray]]],
+        ) -> Iterator[Tuple[Any, Any]]:
+            for index, arrays in file_arrays:
+                for frame_id, graphs in frame_graphs_from_arrays(
+                    arrays, topology["mode"]
+                ):
+                    yield (index, frame_id), graphs
+
+    def score(frames: Iterator[Tuple[Any, Any]]) -> Iterator[Tuple[Any, float, Any]]:
+        return score_frames(model, frames, device, batch_size)
+
+    def write(scored: Iterator[Tuple[Any, float, Any]]) -> Iterator[Dict[str, Any]]:
+        # Frames arrive in file order; a file is complete once a later file's
+        # frame (or the end of the stream) arrives
+        index = 0
+        frames: List[Tuple[int, float, List[float]]] = []
+        for (file_index, frame_id), mean, person_scores in scored:
+            while index < file_index:
+                yield _finish_file(*pending[index], frames, threshold)
+                frames = []
+                index += 1
+            frames.append((frame_id, mean, person_scores))
+        while index < len(pending):
+            yield _finish_file(*pending[index], frames, threshold)
+            frames = []
+            index += 1
+
+    pipeline = Pipeline(
+        ("parse", source),
+        [("build", build), ("score", score), ("write", write)],
+        queue_size,
+    )
+    for _ in tqdm(pipeline, total=len(pending), desc="Scoring files"):
+        pass
+
+    return summary, pipeline.report()
 
 
 def parse_arguments() -> argparse.Namespace:
     """
     Parse command line arguments for the inference script.
 
-    Defines and processes command-line arguments for model path, input file,
-    output file, classification threshold, and metrics display options.
+    Defines and processes command-line arguments for model path, input file
+    or batch input, output locations, classification threshold, and metrics
+    display options.
 
     Returns:
         Parsed command-line arguments
@@ -155,8 +933,14 @@ def parse_arguments() -> argparse.Namespace:
         default=DEFAULT_MODEL_PATH,
         help=f"Path to trained model (default: {DEFAULT_MODEL_PATH})",
     )
-    parser.add_argument(
-        "--input_file", type=str, required=True, help="Path to input MMPose JSON file"
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
+        "--input_file", type=str, help="Path to input MMPose JSON file"
+    )
+    input_group.add_argument(
+        "--inputs",
+        type=str,
+        help="Directory, glob pattern or manifest of JSON files to score in batch",
     )
     parser.add_argument(
         "--output_file",
@@ -164,12 +948,78 @@ def parse_arguments() -> argparse.Namespace:
         default=DEFAULT_OUTPUT_PATH,
         help=f"Path to output JSON file (default: {DEFAULT_OUTPUT_PATH})",
     )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        default=DEFAULT_OUTPUT_DIR,
+        help=f"Output directory in batch mode (default: {DEFAULT_OUTPUT_DIR})",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=DEFAULT_NUM_WORKERS,
+        help=(
+            "Processes parsing upcoming files in batch mode, 0 parses in the main "
+            f"process (default: {DEFAULT_NUM_WORKERS})"
+        ),
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Rescore files that already have results in batch mode",
+    )
     parser.add_argument(
         "--threshold",
         type=float,
         default=None,
         help="Classification threshold (0-1). Uses model's threshold if None.",
     )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Person graphs per forward pass (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help=(
+            "Run parsing, graph building, scoring and writing concurrently in "
+            "batch mode, and report the use of each stage"
+        ),
+    )
+    parser.add_argument(
+        "--queue_size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f"Frames buffered between pipeline stages (default: {DEFAULT_QUEUE_SIZE})",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        default=BACKEND_TORCH,
+        help=(
+            f"Model runtime; {BACKEND_ONNXRUNTIME} expects a model written by "
+            f"export.py (default: {BACKEND_TORCH})"
+        ),
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=ENGINES,
+        default=ENGINE_SPARSE,
+        help=f"Execution engine of the torch backend (default: {ENGINE_SPARSE})",
+    )
+    parser.add_argument(
+        "--cascade",
+        type=str,
+        default=None,
+        help=(
+            "Cascade file written by train_cascade.py; a prefilter decides clear "
+            "cases and only uncertain graphs reach the model (torch backend)"
+        ),
+    )
     parser.add_argument(
         "--show_metrics",
         action="store_true",
@@ -178,45 +1028,81 @@ def parse_arguments() -> argparse.Namespace:
     return parser.parse_args()
 
 
+def print_cascade_usage(cascade: CascadeModel) -> None:
+    """
+    Report how many person graphs the full model scored in a cascade.
+
+    Args:
+        cascade: Cascade used for scoring
+    """
+    share = cascade.num_model_graphs / max(cascade.num_graphs, 1)
+    print(
+        f"Cascade: {cascade.num_model_graphs}/{cascade.num_graphs} person graphs "
+        f"({share:.1%}) scored by the full model"
+    )
+
+
 def load_model_and_threshold(
     model_path: Path, device: torch.device
-) -> Tuple[ViolenceDetectionGNN, float, Optional[Dict]]:
+) -> Tuple[ViolenceDetectionGNN, float, Optional[Dict], Dict]:
     """
     Load the model and threshold from a saved model file.
 
     Handles both legacy model format (weights only) and newer format
-    with state dict, threshold, and metrics information.
+    with state dict, threshold, metrics and graph topology information.
+    Checkpoints carry the model architecture and keypoint preprocessing
+    settings (see model.build_checkpoint); older ones fall back to the legacy
+    architecture, and those without topology information were trained on
+    complete graphs. Quantized checkpoints (see quantize.py) are rebuilt as
+    int8 models under the quantization engine they were built with, and
+    always run on the CPU regardless of the requested device.
 
     Args:
         model_path: Path to the saved model file
         device: Device to load the model to
 
     Returns:
-        Tuple of (model, threshold, metrics)
-    """
-    checkpoint = torch.load(model_path, map_location=device, weights_only=False)
+        Tuple of (model, threshold, metrics, topology)
 
-    # Create model with standard parameters
-    model = ViolenceDetectionGNN(
-        in_channels=MODEL_IN_CHANNELS,
-        hidden_channels=MODEL_HIDDEN_CHANNELS,
-        transformer_heads=MODEL_TRANSFORMER_HEADS,
-        transformer_layers=MODEL_TRANSFORMER_LAYERS,
-    ).to(device)
+    Raises:
+        ValueError: If the checkpoint needs preprocessing this code does not do,
+                    or a quantization engine this machine does not support
+    """
+    checkpoint = torch.load(model_path, map_location="cpu", weights_only=False)
+    if not isinstance(checkpoint, dict) or "model_state_dict" not in checkpoint:
+        checkpoint = {"model_state_dict": checkpoint}
+
+    preprocessing = dict(DEFAULT_PREPROCESSING, **checkpoint.get("preprocessing", {}))
+    if preprocessing != DEFAULT_PREPROCESSING:
+        raise ValueError(
+            f"Model {model_path} expects preprocessing {preprocessing}, "
+            f"but this version implements {DEFAULT_PREPROCESSING}"
+        )
 
     # Default threshold if not found in model
     DEFAULT_THRESHOLD = 0.5
 
-    if isinstance(checkpoint, dict) and "model_state_dict" in checkpoint:
-        model.load_state_dict(checkpoint["model_state_dict"])
-        threshold = checkpoint.get("threshold", DEFAULT_THRESHOLD)
-        metrics = checkpoint.get("metrics", None)
+    model = ViolenceDetectionGNN(**checkpoint.get("model_config", LEGACY_MODEL_CONFIG))
+    if "quantization" in checkpoint:
+        quantization = checkpoint["quantization"]
+        # Quantized weights are packed for the engine that built them
+        if quantization["engine"] not in torch.backends.quantized.supported_engines:
+            raise ValueError(
+                f"Model {model_path} was quantized for the "
+                f"'{quantization['engine']}' engine, which is not supported here "
+                f"(supported: {torch.backends.quantized.supported_engines})"
+            )
+        torch.backends.quantized.engine = quantization["engine"]
+        model = quantize_model(model, quantization["mode"])
     else:
-        model.load_state_dict(checkpoint)
-        threshold = DEFAULT_THRESHOLD
-        metrics = None
+        model = model.to(device)
+
+    model.load_state_dict(checkpoint["model_state_dict"])
+    threshold = checkpoint.get("threshold", DEFAULT_THRESHOLD)
+    metrics = checkpoint.get("metrics", None)
+    topology = checkpoint.get("topology", DEFAULT_TOPOLOGY)
 
-    return model, threshold, metrics
+    return model, threshold, metrics, dict(DEFAULT_TOPOLOGY, **topology)
 
 
 def main() -> None:
@@ -226,26 +1112,71 @@ def main() -> None:
     This function orchestrates the entire inference process:
     1. Parses command-line arguments
     2. Loads the model and threshold
-    3. Processes pose data from input file
+    3. Processes pose data from the input file, or from every file of the
+       batch input
     4. Generates predictions for each frame
     5. Calculates overall statistics
-    6. Saves results to output file
+    6. Saves results to the output file, or per-file results and a summary
+       to the output directory
     """
     args = parse_arguments()
 
-    input_file = Path(args.input_file)
-    output_file = Path(args.output_file)
     model_path = Path(args.model_path)
 
-    if not input_file.exists():
-        print(f"Error: Input file {input_file} does not exist.")
+    if args.pipeline and args.inputs is None:
+        print("Error: --pipeline requires --inputs.")
         return
 
+    if args.inputs is not None:
+        try:
+            input_files = resolve_input_files(args.inputs)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+    else:
+        input_file = Path(args.input_file)
+        if not input_file.exists():
+            print(f"Error: Input file {input_file} does not exist.")
+            return
+
     device = get_device()
-    print(f"Using device: {device}")
 
-    model, model_threshold, metrics = load_model_and_threshold(model_path, device)
-    print(f"Model loaded from {model_path}")
+    if args.backend == BACKEND_ONNXRUNTIME:
+        try:
+            model = OnnxViolenceModel(model_path, device.type)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        model_threshold, metrics, topology = (
+            model.threshold,
+            model.metrics,
+            model.topology,
+        )
+        print(f"Model loaded from {model_path}")
+        print(f"Graph topology: {topology['mode']}")
+        print(f"Execution backend: {args.backend}")
+    else:
+        try:
+            model, model_threshold, metrics, topology = load_model_and_threshold(
+                model_path, device
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        if is_quantized(model):
+            device = QUANTIZED_DEVICE
+        print(f"Model loaded from {model_path}")
+        print(f"Graph topology: {topology['mode']}")
+
+        if args.engine == ENGINE_DENSE:
+            model = DenseViolenceDetectionGNN(model, topology["mode"])
+        print(f"Execution engine: {args.engine}")
+
+    if topology["keypoint_subset"] is not None:
+        print(f"Keypoint subset: {len(topology['keypoint_subset'])} keypoints")
+    if topology["confidence"] is not None:
+        print(f"Confidence filter: {topology['confidence']}")
+    print(f"Using device: {device}")
 
     threshold = args.threshold if args.threshold is not None else model_threshold
     source_text = " (from model)" if args.threshold is None else " (user-specified)"
@@ -256,63 +1187,126 @@ def main() -> None:
         for metric, value in metrics.items():
             print(f"  {metric}: {value}")
 
-    print(f"Processing input file: {input_file}")
-    graph_data = load_and_process_json(input_file)
-
-    if not graph_data:
-        print("No valid pose data found in the input file.")
+    if args.cascade is not None:
+        if args.backend != BACKEND_TORCH:
+            print(f"Error: --cascade requires the {BACKEND_TORCH} backend.")
+            return
+        model, cascade_info = load_cascade(Path(args.cascade), model, threshold, device)
+        print(
+            f"Cascade loaded from {args.cascade}: prefilter band "
+            f"[{model.low:.4f}, {model.high:.4f}]"
+        )
+        if abs(cascade_info["threshold"] - threshold) > 1e-6:
+            print(
+                f"Warning: the cascade was calibrated for threshold "
+                f"{cascade_info['threshold']:.4f}"
+            )
+
+    if args.inputs is not None:
+        output_dir = Path(args.output_dir)
+        score_args = dict(
+            topology=topology,
+            batch_size=args.batch_size,
+            num_workers=args.num_workers,
+            overwrite=args.overwrite,
+        )
+        pipeline_report = None
+        try:
+            if args.pipeline:
+                summary, pipeline_report = score_files_pipelined(
+                    model,
+                    input_files,
+                    output_dir,
+                    threshold,
+                    device,
+                    queue_size=args.queue_size,
+                    **score_args,
+                )
+            else:
+                summary = score_files(
+                    model, input_files, output_dir, threshold, device, **score_args
+                )
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+
+        statuses = [entry["status"] for entry in summary]
+        violent_files = sum(bool(entry.get("is_violent_overall")) for entry in summary)
+        summary_file = output_dir / SUMMARY_FILE_NAME
+        summary_data = {
+            "classification_threshold": float(threshold),
+            "num_files": len(summary),
+            "num_violent_files": violent_files,
+            "files": summary,
+        }
+        if isinstance(model, CascadeModel):
+            summary_data["cascade"] = {
+                "num_graphs": model.num_graphs,
+                "num_model_graphs": model.num_model_graphs,
+            }
+            print_cascade_usage(model)
+        if pipeline_report is not None:
+            summary_data["pipeline"] = pipeline_report
+            print(format_report(pipeline_report))
+        _write_json(summary_file, summary_data)
+
+        print(
+            f"Scored {statuses.count('scored')}, skipped {statuses.count('skipped')}, "
+            f"no pose data {statuses.count('no_pose_data')}"
+        )
+        print(f"Violent files: {violent_files}/{len(summary)}")
+        print(f"Summary saved to {summary_file}")
         return
 
-    results = []
-    violent_frame_count = 0
-
-    for frame_id, frame_graphs in graph_data:
-        frame_scores = predict_violence(model, frame_graphs, device)
-        avg_score = np.mean(frame_scores) if frame_scores else 0.0
-
-        interpretation, is_violent = interpret_score(avg_score, threshold)
-        if is_violent:
-            violent_frame_count += 1
+    output_file = Path(args.output_file)
 
-        results.append(
-            {
-                "frame_id": frame_id,
-                "violence_score": float(avg_score),
-                "is_violent": bool(is_violent),
-                "interpretation": interpretation,
-                "person_scores": [float(score) for score in frame_scores],
-            }
+    print(f"Processing input file: {input_file}")
+    if args.backend == BACKEND_ONNXRUNTIME:
+        graph_data = iter_frame_keypoints(
+            input_file,
+            topology["keypoint_subset"],
+            topology["confidence"],
+            topology["mode"],
+            model.skeleton_links,
+        )
+    else:
+        graph_data = iter_frame_graphs(
+            input_file,
+            topology=topology["mode"],
+            knn_k=topology["knn_k"],
+            keypoint_subset=topology["keypoint_subset"],
+            confidence=topology["confidence"],
         )
 
-    overall_score = np.mean([r["violence_score"] for r in results]) if results else 0.0
-    overall_interpretation, is_violent_overall = interpret_score(
-        overall_score, threshold
-    )
+    # Frames are scored as soon as they are parsed, in batches across frames
+    try:
+        output_data = summarize_frames(
+            input_file.name,
+            score_frames(model, graph_data, device, args.batch_size),
+            threshold,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
 
-    total_frames = len(results)
-    violent_percentage = (
-        (violent_frame_count / total_frames) * 100 if total_frames else 0
-    )
+    if output_data is None:
+        print("No valid pose data found in the input file.")
+        return
 
+    total_frames = len(output_data["results"])
+    violent_frame_count = sum(r["is_violent"] for r in output_data["results"])
+    violent_percentage = output_data["violent_frame_percentage"]
     violent_stat = f"{violent_frame_count}/{total_frames} ({violent_percentage:.2f}%)"
     print(f"Violent frames: {violent_stat}")
 
-    output_data = {
-        "file_name": str(input_file.name),
-        "results": results,
-        "overall_violence_score": float(overall_score),
-        "is_violent_overall": bool(is_violent_overall),
-        "violent_frame_percentage": float(violent_percentage),
-        "classification_threshold": float(threshold),
-        "interpretation": str(overall_interpretation),
-    }
-
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(output_data, f, indent=2)
 
     print(f"Results saved to {output_file}")
-    print(f"Overall violence score: {overall_score}")
-    print(f"Interpretation: {overall_interpretation}")
+    print(f"Overall violence score: {output_data['overall_violence_score']}")
+    print(f"Interpretation: {output_data['interpretation']}")
+    if isinstance(model, CascadeModel):
+        print_cascade_usage(model)
 
 
 if __name__ == "__main__":
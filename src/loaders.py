@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Batch loading for the training and evaluation loops.
+
+PyTorch Geometric collates graphs in Python, and with the default DataLoader
+settings it does so in the training process, between two optimizer steps.
+This module takes collation off that critical path:
+- Whole-batch collation straight from packed graph arrays (see
+  graph_cache.PackedGraphDataset), without per-graph Data objects
+- Worker processes that read and collate graphs, kept alive across epochs
+- Pinned host memory with non-blocking copies to the device
+- A background thread that keeps the next batches collated while the model
+  works on the current one
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import torch
+from torch.utils.data import DataLoader as TorchDataLoader
+from torch.utils.data import Dataset, Sampler, Subset
+from torch_geometric.loader import DataLoader
+
+from distillation import TeacherScoredDataset
+from embedding_store import EmbeddingDataset
+from graph_cache import PackedGraphDataset
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Batch
+
+# Constants for batch loading
+# One core is left to the training process itself
+LOADER_WORKERS = min(4, max(0, (os.cpu_count() or 1) - 1))
+WORKER_PREFETCH_FACTOR = 2  # Batches collated ahead by each worker process
+PREFETCH_BATCHES = 2  # Collated batches held ready by the prefetch thread
+QUEUE_POLL_SECONDS = 0.1  # How often a blocked prefetch thread checks for stop
+
+_END = object()
+
+
+def _collated(batch: Batch) -> Batch:
+    """Pass through a batch the dataset already collated in __getitems__."""
+    return batch
+
+
+class DevicePrefetcher:
+    """
+    Iterate over a DataLoader with batches collated ahead on a thread.
+
+    The thread pulls batches from the loader (and its workers) into a bounded
+    queue, so the next batch is ready as soon as the current step finishes.
+    Batches are moved to the device as they are handed out, without blocking
+    when the loader pins memory for a CUDA device.
+    """
+
+    def __init__(
+        self,
+        loader: TorchDataLoader,
+        device: torch.device,
+        num_batches: int = PREFETCH_BATCHES,
+    ):
+        """
+        Wrap a loader.
+
+        Args:
+            loader: DataLoader yielding PyTorch Geometric batches
+            device: Device the batches are moved to
+            num_batches: Batches collated ahead, 0 loads them synchronously
+        """
+        self.loader = loader
+        self.device = device
+        self.num_batches = num_batches
+        self.non_blocking = loader.pin_memory and device.type == "cuda"
+
+    @property
+    def dataset(self) -> Dataset:
+        """Dataset of the wrapped loader."""
+        return self.loader.dataset
+
+    def __len__(self) -> int:
+        """Number of batches per pass."""
+        return len(self.loader)
+
+    def set_epoch(self, epoch: int) -> None:
+        """
+        Reseed the shuffling of a distributed sampler for an epoch.
+
+        Args:
+            epoch: Zero-based epoch index
+        """
+        if hasattr(self.loader.sampler, "set_epoch"):
+            self.loader.sampler.set_epoch(epoch)
+
+    def __iter__(self) -> Iterator[Batch]:
+        """Yield device batches of one pass over the loader."""
+        batches = self._prefetch() if self.num_batches > 0 else iter(self.loader)
+        for batch in batches:
+            yield batch.to(self.device, non_blocking=self.non_blocking)
+
+    def _prefetch(self) -> Iterator[Batch]:
+        """Yield host batches collated by a background thread."""
+        ready: queue.Queue = queue.Queue(maxsize=self.num_batches)
+        stop = threading.Event()
+
+        def put(item: object) -> bool:
+            # Give up once the consumer is gone instead of blocking forever
+            while not stop.is_set():
+                try:
+                    ready.put(item, timeout=QUEUE_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce() -> None:
+            try:
+                for batch in self.loader:
+                    if not put(batch):
+                        return
+                put(_END)
+            except BaseException as e:  # re-raised in the consuming thread
+                put(e)
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+
+
+def make_loader(
+    dataset: Dataset,
+    batch_size: int,
+    device: torch.device,
+    shuffle: bool = False,
+    num_workers: int = LOADER_WORKERS,
+    pin_memory: bool = True,
+    prefetch_batches: int = PREFETCH_BATCHES,
+    sampler: Optional[Sampler] = None,
+) -> DevicePrefetcher:
+    """
+    Create a prefetching graph loader for a device.
+
+    Packed graph datasets (also with teacher scores) and embedding stores,
+    also behind a Subset, are collated a whole batch at a time by the dataset
+    itself; any other graph dataset goes through the PyTorch Geometric
+    DataLoader.
+
+    Args:
+        dataset: Dataset of PyTorch Geometric graphs
+        batch_size: Graphs per batch
+        device: Device the batches are moved to
+        shuffle: Whether to reshuffle the graphs every pass
+        num_workers: Worker processes collating batches, 0 collates in-process
+        pin_memory: Pin host batches for non-blocking copies (CUDA only)
+        prefetch_batches: Batches collated ahead by a background thread
+        sampler: Sampler choosing the graphs (e.g. a DistributedSampler for
+                 this rank's shard), used instead of shuffle
+
+    Returns:
+        DevicePrefetcher over the configured DataLoader
+    """
+    worker_options = {}
+    if num_workers > 0:
+        worker_options = {
+            "persistent_workers": True,
+            "prefetch_factor": WORKER_PREFETCH_FACTOR,
+        }
+    options = {
+        "batch_size": batch_size,
+        "shuffle": shuffle and sampler is None,
+        "sampler": sampler,
+        "num_workers": num_workers,
+        "pin_memory": pin_memory and device.type == "cuda",
+        **worker_options,
+    }
+    base = dataset.dataset if isinstance(dataset, Subset) else dataset
+    if isinstance(base, (PackedGraphDataset, EmbeddingDataset, TeacherScoredDataset)):
+        loader = TorchDataLoader(dataset, collate_fn=_collated, **options)
+    else:
+        loader = DataLoader(dataset, **options)
+    return DevicePrefetcher(loader, device, num_batches=prefetch_batches)
@@ -7,18 +7,33 @@ data, combining a Graph Neural Network and Transformer components.
 It includes:
 - Device detection for optimal hardware utilization
 - ViolenceDetectionGNN model that combines GNN and Transformer processing
+- Self-describing checkpoints carrying the architecture and preprocessing
+- Post-training int8 quantization of the model's linear layers for CPU inference
 """
 
 from __future__ import annotations
 
+import copy
+import warnings
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
 # Import components from separate files
-from gnn import PoseGNN
+from gnn import DEFAULT_PREPROCESSING, PoseGNN
 from transformer import TransformerEncoder
 
+if TYPE_CHECKING:
+    from torch_geometric.data import Batch
+
+# Post-training quantization modes (int8 kernels run on the CPU only)
+QUANT_DYNAMIC = "dynamic"  # int8 weights, activations quantized on the fly
+QUANT_STATIC = "static"  # int8 weights and calibrated activation ranges
+QUANT_MODES = (QUANT_DYNAMIC, QUANT_STATIC)
+QUANTIZED_DEVICE = torch.device("cpu")
+
 
 def get_device() -> torch.device:
     """
@@ -61,6 +76,8 @@ class ViolenceDetectionGNN(nn.Module):
         hidden_channels: int = 64,
         transformer_heads: int = 4,
         transformer_layers: int = 2,
+        gnn_heads: int = 4,
+        jk_mode: str = "cat",
     ):
         """
         Initialize the full model.
@@ -71,11 +88,26 @@ class ViolenceDetectionGNN(nn.Module):
             hidden_channels: Size of hidden representations
             transformer_heads: Number of attention heads in transformer
             transformer_layers: Number of transformer layers
+            gnn_heads: Number of attention heads in the GAT layer
+            jk_mode: JumpingKnowledge aggregation of the GNN layers
+                     ("cat" or "max")
         """
         super(ViolenceDetectionGNN, self).__init__()
 
+        # Constructor arguments, saved with checkpoints to rebuild the model
+        self.config = {
+            "in_channels": in_channels,
+            "hidden_channels": hidden_channels,
+            "transformer_heads": transformer_heads,
+            "transformer_layers": transformer_layers,
+            "gnn_heads": gnn_heads,
+            "jk_mode": jk_mode,
+        }
+
         # GNN component
-        self.gnn = PoseGNN(in_channels, hidden_channels)
+        self.gnn = PoseGNN(
+            in_channels, hidden_channels, heads=gnn_heads, jk_mode=jk_mode
+        )
 
         # Transformer component
         self.transformer = TransformerEncoder(
@@ -90,7 +122,11 @@ class ViolenceDetectionGNN(nn.Module):
         self.lin2 = nn.Linear(hidden_channels // 2, 1)
 
     def forward(
-        self, x: torch.Tensor, edge_index: torch.Tensor, batch: torch.Tensor
+        self,
+        x: torch.Tensor,
+        edge_index: torch.Tensor,
+        batch: torch.Tensor,
+        return_logits: bool = False,
     ) -> torch.Tensor:
         """
         Forward pass through the full model.
@@ -103,13 +139,40 @@ class ViolenceDetectionGNN(nn.Module):
             x: Node features [num_nodes, in_channels]
             edge_index: Graph connectivity [2, num_edges]
             batch: Batch assignment for nodes [num_nodes]
+            return_logits: Return the scores before the sigmoid instead
 
         Returns:
             Violence score between 0 and 1 [batch_size, 1]
         """
-        # Process through GNN to get graph embeddings
-        x = self.gnn(x, edge_index, batch)
+        return self.classify(self.embed(x, edge_index, batch), return_logits)
+
+    def embed(
+        self, x: torch.Tensor, edge_index: torch.Tensor, batch: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Compute the graph embeddings of the GNN.
+
+        Args:
+            x: Node features [num_nodes, in_channels]
+            edge_index: Graph connectivity [2, num_edges]
+            batch: Batch assignment for nodes [num_nodes]
+
+        Returns:
+            Graph embeddings [batch_size, hidden_channels]
+        """
+        return self.gnn(x, edge_index, batch)
+
+    def classify(self, x: torch.Tensor, return_logits: bool = False) -> torch.Tensor:
+        """
+        Score graph embeddings with the transformer and classifier head.
 
+        Args:
+            x: Graph embeddings [batch_size, hidden_channels]
+            return_logits: Return the scores before the sigmoid instead
+
+        Returns:
+            Violence score between 0 and 1 [batch_size, 1]
+        """
         # Process through transformer to capture contextual patterns
         x = self.transformer(x)
 
@@ -118,6 +181,188 @@ class ViolenceDetectionGNN(nn.Module):
         x = F.relu(x)
         x = F.dropout(x, p=self.DROPOUT_RATE, training=self.training)
         x = self.lin2(x)
+        if return_logits:
+            return x
 
         # Output violence score between 0 and 1
         return torch.sigmoid(x)
+
+
+def build_checkpoint(
+    model: ViolenceDetectionGNN,
+    threshold: float,
+    metrics: Optional[Dict[str, float]],
+    topology: Dict[str, Any],
+    **extra: Any,
+) -> Dict[str, Any]:
+    """
+    Assemble a checkpoint that describes how to rebuild and feed the model.
+
+    Args:
+        model: Trained model (float or quantized)
+        threshold: Classification threshold
+        metrics: Threshold metrics, if any
+        topology: Graph topology options the model was trained with
+        **extra: Additional entries (e.g. quantization settings)
+
+    Returns:
+        Dictionary for torch.save, read by inference.load_model_and_threshold
+    """
+    return {
+        "model_state_dict": model.state_dict(),
+        "model_config": dict(model.config),
+        "preprocessing": dict(DEFAULT_PREPROCESSING),
+        "threshold": threshold,
+        "metrics": metrics,
+        "topology": topology,
+        **extra,
+    }
+
+
+class StaticQuantLinear(nn.Module):
+    """
+    Linear layer that quantizes its input with a calibrated scale.
+
+    The graph convolutions have no int8 kernels, so static quantization is
+    applied per linear layer: activations are quantized on entry and
+    dequantized on exit, with the ranges recorded during calibration.
+
+    torch.ao.quantization (torch >= 1.13) is imported on first use, so that
+    the float model works with older torch releases.
+    """
+
+    def __init__(self, linear: nn.Linear):
+        """
+        Wrap a float linear layer.
+
+        Args:
+            linear: Linear layer to quantize
+        """
+        from torch.ao.quantization import DeQuantStub, QuantStub
+
+        super(StaticQuantLinear, self).__init__()
+
+        self.quant = QuantStub()
+        self.linear = linear
+        self.dequant = DeQuantStub()
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Apply the (quantized) linear layer to float inputs.
+
+        Args:
+            x: Input features [..., in_features]
+
+        Returns:
+            Output features [..., out_features]
+        """
+        return self.dequant(self.linear(self.quant(x)))
+
+
+def _quantizable_linears(model: nn.Module) -> List[Tuple[nn.Module, str]]:
+    """
+    Find the linear layers covered by int8 quantization.
+
+    Only plain nn.Linear layers qualify: the attention output projection is a
+    NonDynamicallyQuantizableLinear and the PyG convolutions use their own
+    linear class, both of which stay in float32.
+
+    Args:
+        model: Model to search
+
+    Returns:
+        List of (parent module, attribute name) pairs
+    """
+    return [
+        (parent, name)
+        for parent in model.modules()
+        for name, child in parent.named_children()
+        if type(child) is nn.Linear
+    ]
+
+
+def quantize_model(
+    model: ViolenceDetectionGNN,
+    mode: str = QUANT_DYNAMIC,
+    calibration_batches: Optional[Iterable[Batch]] = None,
+) -> ViolenceDetectionGNN:
+    """
+    Quantize the linear layers of a trained model to int8.
+
+    Dynamic quantization needs no data. Static quantization records the input
+    range of every linear layer on the calibration batches; without batches it
+    only builds the quantized structure, e.g. to load a quantized state dict.
+
+    Args:
+        model: Trained float model (left unchanged)
+        mode: One of QUANT_MODES
+        calibration_batches: Batches of pose graphs for static calibration
+
+    Returns:
+        Quantized copy of the model on the CPU, in evaluation mode
+    """
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+
+    from torch.ao.quantization import (
+        convert,
+        get_default_qconfig,
+        prepare,
+        quantize_dynamic,
+    )
+
+    model = copy.deepcopy(model).to(QUANTIZED_DEVICE).eval()
+
+    # The fused transformer kernel of torch >= 1.12 reads float weights
+    # directly; clearing this private flag sends quantized encoder layers down
+    # the regular (module by module) path. Releases without the fast path
+    # lack the flag and need nothing.
+    for module in model.modules():
+        if isinstance(module, nn.TransformerEncoderLayer) and hasattr(
+            module, "activation_relu_or_gelu"
+        ):
+            module.activation_relu_or_gelu = 0
+
+    if mode == QUANT_DYNAMIC:
+        return quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    qconfig = get_default_qconfig(torch.backends.quantized.engine)
+    for parent, name in _quantizable_linears(model):
+        wrapper = StaticQuantLinear(getattr(parent, name))
+        wrapper.qconfig = qconfig
+        setattr(parent, name, wrapper)
+
+    with warnings.catch_warnings():
+        # Observers without calibration data fall back to placeholder ranges
+        warnings.simplefilter("ignore", UserWarning)
+        prepare(model, inplace=True)
+        with torch.no_grad():
+            for batch in calibration_batches or ():
+                batch = batch.to(QUANTIZED_DEVICE)
+                model(batch.x, batch.edge_index, batch.batch)
+        convert(model, inplace=True)
+
+    return model
+
+
+def is_quantized(model: nn.Module) -> bool:
+    """
+    Check whether a model contains int8 layers (and must run on the CPU).
+
+    Args:
+        model: Model to check
+
+    Returns:
+        True if any layer is quantized
+    """
+    try:
+        from torch.ao.nn.quantized import Linear as QuantizedLinear
+        from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+    except ImportError:
+        # Older torch releases cannot build the int8 models of quantize_model
+        return False
+
+    return any(
+        isinstance(module, (QuantizedLinear, DynamicQuantizedLinear))
+        for module in model.modules()
+    )
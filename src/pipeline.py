@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Pipelined execution of processing stages on threads.
+
+Batch inference parses JSON files, builds pose graphs, runs the model and
+writes results. Run one after another, each step leaves the CPU (or the GPU)
+idle while the others work. This module runs the steps as a pipeline:
+- One thread per stage, connected by bounded queues, so a slow stage applies
+  backpressure instead of letting finished items pile up in memory
+- Stages that transform a stream of items, so a stage may batch across items
+  (e.g. the model stage collates graphs of consecutive frames)
+- Exceptions raised in any stage are re-raised in the consuming thread
+- Per-stage accounting of busy time, time waiting for input and time blocked
+  on a full output queue, and of the queue depths, for tuning
+
+Threads suit these stages because model forward passes and file I/O release
+the GIL; JSON decoding can still run on worker processes inside a stage
+(see pose_io.iter_graph_arrays).
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Constants for pipelined execution
+DEFAULT_QUEUE_SIZE = 64  # Items buffered between two stages
+QUEUE_POLL_SECONDS = 0.1  # How often a blocked stage checks for stop
+
+_END = object()
+
+# A stage turns the stream of items of the previous stage into its own
+Transform = Callable[[Iterator[Any]], Iterable[Any]]
+
+
+class StageStats:
+    """
+    Time accounting of one pipeline stage.
+
+    Busy time is the time the stage spends neither waiting for input nor
+    blocked on its full output queue. The depth of the output queue is
+    sampled every time the stage hands out an item.
+    """
+
+    def __init__(self, name: str):
+        """
+        Start empty statistics.
+
+        Args:
+            name: Name of the stage
+        """
+        self.name = name
+        self.items = 0
+        self.elapsed = 0.0
+        self.input_wait = 0.0
+        self.output_wait = 0.0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def report(self, wall_time: float) -> Dict[str, float]:
+        """
+        Summarize the statistics.
+
+        Args:
+            wall_time: Duration of the whole pipeline run in seconds
+
+        Returns:
+            Dictionary with the number of items handed out, the busy, input
+            wait and output wait shares of the wall time, and the mean and
+            maximum depth of the output queue
+        """
+        busy = max(self.elapsed - self.input_wait - self.output_wait, 0.0)
+        return {
+            "items": self.items,
+            "busy": busy / wall_time if wall_time else 0.0,
+            "input_wait": self.input_wait / wall_time if wall_time else 0.0,
+            "output_wait": self.output_wait / wall_time if wall_time else 0.0,
+            "mean_queue_depth": self.depth_total / self.items if self.items else 0.0,
+            "max_queue_depth": self.depth_max,
+        }
+
+
+class Pipeline:
+    """
+    Chain of stages running concurrently, each on its own thread.
+
+    The source stage iterates an iterable; every following stage is a
+    function from the iterator of items of the previous stage to its own
+    items. Iterating the pipeline yields the items of the last stage in the
+    calling thread.
+    """
+
+    def __init__(
+        self,
+        source: Tuple[str, Iterable[Any]],
+        stages: List[Tuple[str, Transform]],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ):
+        """
+        Define the pipeline.
+
+        Args:
+            source: (name, iterable) of the first stage
+            stages: (name, transform) of the following stages, in order
+            queue_size: Items buffered after each stage
+
+        Raises:
+            ValueError: If queue_size is not positive or stage names repeat
+        """
+        if queue_size < 1:
+            raise ValueError(f"queue_size must be positive, got {queue_size}")
+        names = [source[0]] + [name for name, _ in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Pipeline stage names must be unique, got {names}")
+
+        self.source = source
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = {name: StageStats(name) for name in names}
+        self.wall_time = 0.0
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the statistics of every stage of the last run.
+
+        Returns:
+            Dictionary mapping stage names to StageStats.report results
+        """
+        return {
+            name: stats.report(self.wall_time) for name, stats in self.stats.items()
+        }
+
+    def __iter__(self) -> Iterator[Any]:
+        """Run the stages and yield the items of the last one."""
+        names = list(self.stats)
+        outboxes = [queue.Queue(maxsize=self.queue_size) for _ in names]
+        stop = threading.Event()
+        self.stats = {name: StageStats(name) for name in names}
+
+        def put(outbox: queue.Queue, item: Any, stats: StageStats) -> bool:
+            # Give up once the consumer is gone instead of blocking forever
+            start = time.perf_counter()
+            while not stop.is_set():
+                try:
+                    outbox.put(item, timeout=QUEUE_POLL_SECONDS)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                return False
+            stats.output_wait += time.perf_counter() - start
+            depth = outbox.qsize()
+            stats.depth_total += depth
+            stats.depth_max = max(stats.depth_max, depth)
+            return True
+
+        def receive(inbox: queue.Queue, stats: Optional[StageStats]) -> Iterator[Any]:
+            while True:
+                start = time.perf_counter()
+                while True:
+                    if stop.is_set():
+                        return
+                    try:
+                        item = inbox.get(timeout=QUEUE_POLL_SECONDS)
+                        break
+                    except queue.Empty:
+                        continue
+                if stats is not None:
+                    stats.input_wait += time.perf_counter() - start
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+
+        def run(index: int) -> None:
+            stats = self.stats[names[index]]
+            outbox = outboxes[index]
+            start = time.perf_counter()
+            try:
+                if index == 0:
+                    items = self.source[1]
+                else:
+                    items = self.stages[index - 1][1](
+                        receive(outboxes[index - 1], stats)
+                    )
+                for item in items:
+                    stats.items += 1
+                    if not put(outbox, item, stats):
+                        return
+                put(outbox, _END, stats)
+            except BaseException as e:  # re-raised in the consuming thread
+                put(outbox, e, stats)
+            finally:
+                stats.elapsed = time.perf_counter() - start
+
+        threads = [
+            threading.Thread(
+                target=run, args=(i,), name=f"pipeline-{name}", daemon=True
+            )
+            for i, name in enumerate(names)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            yield from receive(outboxes[-1], None)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            self.wall_time = time.perf_counter() - start
+
+
+def format_report(report: Dict[str, Dict[str, float]]) -> str:
+    """
+    Format the statistics of a pipeline run as a table.
+
+    Args:
+        report: Statistics as returned by Pipeline.report
+
+    Returns:
+        Table with one row per stage
+    """
+    lines = [
+        f"{'Stage':<10}{'Items':>8}{'Busy':>8}{'In wait':>9}{'Out wait':>10}"
+        f"{'Queue mean':>12}{'Queue max':>11}"
+    ]
+    for name, stats in report.items():
+        lines.append(
+            f"{name:<10}{stats['items']:>8}{stats['busy']:>8.1%}"
+            f"{stats['input_wait']:>9.1%}{stats['output_wait']:>10.1%}"
+            f"{stats['mean_queue_depth']:>12.1f}{stats['max_queue_depth']:>11}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Reading MMPose result files into pose graph arrays.
+
+This module is the single ingestion path shared by training, the graph cache
+and inference. It provides:
+- A streaming reader that yields one frame at a time, so peak memory does not
+  depend on the length of the video
+- Listing of labelled JSON files for any number of cameras
+- Filtering of low-confidence person instances and keypoints by their
+  MMPose scores
+- Per-file conversion of every person instance into compact graph arrays
+- A worker-pool reader that keeps results in input order with a bounded
+  number of in-flight files
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import re
+import warnings
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+from gnn import (
+    DEFAULT_KNN_K,
+    TOPOLOGY_COMPLETE,
+    pose_graph_arrays,
+    pose_graph_from_arrays,
+    select_keypoints,
+    skeleton_links_from_meta,
+    subset_skeleton_links,
+)
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Data
+
+# Files queued per worker; bounds the memory held by finished results
+PREFETCH_PER_WORKER = 2
+
+# Characters read from disk at a time by the streaming reader
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Instance confidence filtering (see select_instances); 0 disables a filter
+DEFAULT_CONFIDENCE_FILTER = {
+    "min_instance_score": 0.0,  # Smallest mean keypoint score of a person
+    "min_bbox_score": 0.0,  # Smallest detector score of a person's bounding box
+    "max_persons": 0,  # Most confident persons kept per frame
+    "min_keypoint_score": 0.0,  # Keypoints scored below are marked invalid
+}
+
+
+class _IncrementalJSONReader:
+    """
+    Minimal pull parser over a text stream.
+
+    Structural characters are consumed one at a time and complete values are
+    decoded with json.JSONDecoder.raw_decode, so only the value being decoded
+    (plus one chunk) is held in memory.
+    """
+
+    def __init__(self, stream: IO[str], chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Initialize the reader.
+
+        Args:
+            stream: Text stream positioned at the start of a JSON document
+            chunk_size: Number of characters to read at a time
+        """
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_size: int = 0) -> None:
+        """Drop consumed text and read at least one more chunk."""
+        self._buf = self._buf[self._pos :]
+        self._pos = 0
+        chunk = self._stream.read(max(self._chunk_size, min_size))
+        if not chunk:
+            self._eof = True
+        self._buf += chunk
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                raise ValueError("Unexpected end of JSON document")
+            self._fill()
+
+    def expect(self, chars: str) -> str:
+        """Consume the next structural character, which must be one of chars."""
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(
+                f"Expected one of {chars!r} in JSON document, got {char!r}"
+            )
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                # Grow geometrically so large values are decoded in O(n)
+                self._fill(len(self._buf) - self._pos)
+                continue
+            if end == len(self._buf) and not self._eof:
+                # A number may continue in the next chunk
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+
+def iter_frames(
+    json_file: Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Tuple[Optional[Dict[str, Any]], Dict[str, Any]]]:
+    """
+    Stream the frames of an MMPose result file one at a time.
+
+    The file is the dictionary written by MMPose's topdown_demo_with_mmdet.py,
+    with "meta_info" and "instance_info" keys. Each element of "instance_info"
+    is decoded only when it is reached, so peak memory is bounded by the size
+    of a single frame rather than the whole file.
+
+    MMPose writes "meta_info" before "instance_info"; if a file stores it
+    afterwards, frames are yielded with meta_info None.
+
+    Args:
+        json_file: Path to the MMPose JSON file
+        chunk_size: Number of characters to read at a time
+
+    Yields:
+        Tuples of (meta_info seen so far, frame dictionary)
+    """
+    meta_info = None
+
+    with open(json_file, "r", encoding="utf-8") as f:
+        reader = _IncrementalJSONReader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+
+        while True:
+            key = reader.value()
+            reader.expect(":")
+
+            if key == "instance_info" and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield meta_info, reader.value()
+                        if reader.expect(",]") == "]":
+                            break
+            elif key == "meta_info":
+                meta_info = reader.value()
+            else:
+                reader.value()
+
+            if reader.expect(",}") == "}":
+                break
+
+
+def make_confidence_filter(
+    min_instance_score: float = 0.0,
+    min_bbox_score: float = 0.0,
+    max_persons: int = 0,
+    min_keypoint_score: float = 0.0,
+) -> Optional[Dict[str, Any]]:
+    """
+    Collect instance confidence filter settings.
+
+    Args:
+        min_instance_score: Smallest mean keypoint score of a kept person
+        min_bbox_score: Smallest bounding box score of a kept person
+        max_persons: Most confident persons kept per frame (0 keeps all)
+        min_keypoint_score: Keypoints scored below are marked invalid
+
+    Returns:
+        Filter settings as in DEFAULT_CONFIDENCE_FILTER, or None if every
+        filter is disabled
+
+    Raises:
+        ValueError: If a score is outside [0, 1] or max_persons is negative
+    """
+    confidence = {
+        "min_instance_score": float(min_instance_score),
+        "min_bbox_score": float(min_bbox_score),
+        "max_persons": int(max_persons),
+        "min_keypoint_score": float(min_keypoint_score),
+    }
+    for name, value in confidence.items():
+        if name != "max_persons" and not 0.0 <= value <= 1.0:
+            raise ValueError(f"{name} must be between 0 and 1, got {value}")
+    if confidence["max_persons"] < 0:
+        raise ValueError(f"max_persons must be non-negative, got {max_persons}")
+    return None if confidence == DEFAULT_CONFIDENCE_FILTER else confidence
+
+
+def select_instances(
+    instances: Iterable[Dict[str, Any]],
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+) -> List[np.ndarray]:
+    """
+    Extract the keypoints of the persons of one frame that pass the filters.
+
+    Keypoints are projected onto keypoint_subset first, so the instance score
+    is the mean score of the keypoints the model sees. Instances without
+    "keypoint_scores" or "bbox_score" are not filtered on them. Low-scored
+    keypoints are set to (0, 0), which marks them invalid.
+
+    Args:
+        instances: Person instances in MMPose format (dicts with "keypoints")
+        keypoint_subset: Keypoint indices to keep, or None to keep every keypoint
+        confidence: Filter settings from make_confidence_filter, or None
+
+    Returns:
+        Keypoint arrays [num_keypoints, 2] of the kept persons, in instance order
+
+    Raises:
+        ValueError: If a pose has fewer keypoints than keypoint_subset needs
+    """
+    persons: List[np.ndarray] = []
+    instance_scores: List[float] = []
+    for instance in instances:
+        keypoints = np.array(instance.get("keypoints", []), dtype=np.float64)
+        if keypoints.ndim != 2:
+            continue
+        keypoints = select_keypoints(keypoints, keypoint_subset)
+
+        if confidence is not None:
+            scores = instance.get("keypoint_scores")
+            scores = (
+                np.ones(len(keypoints))
+                if scores is None
+                else select_keypoints(np.asarray(scores, np.float64), keypoint_subset)
+            )
+            instance_score = float(scores.mean()) if len(scores) else 0.0
+            if instance_score < confidence["min_instance_score"]:
+                continue
+            if instance.get("bbox_score", 1.0) < confidence["min_bbox_score"]:
+                continue
+            low = scores < confidence["min_keypoint_score"]
+            if low.any():
+                keypoints[low] = 0.0
+            instance_scores.append(instance_score)
+        persons.append(keypoints)
+
+    max_persons = confidence["max_persons"] if confidence is not None else 0
+    if 0 < max_persons < len(persons):
+        # Stable sort keeps the instance order among equally scored persons
+        ranked = np.argsort(-np.asarray(instance_scores), kind="stable")
+        persons = [persons[i] for i in sorted(ranked[:max_persons])]
+    return persons
+
+
+def list_json_files(
+    sources: Sequence[Tuple[Path, Path]], sample_percentage: int = 100
+) -> List[Tuple[Path, float, int]]:
+    """
+    List the labelled JSON files of one or more cameras.
+
+    A camera whose violent or non-violent directory has no JSON files is
+    skipped with a warning, so the other cameras can still be used.
+
+    Args:
+        sources: (violent_path, non_violent_path) pairs; the index of each
+                 pair is used as its camera id
+        sample_percentage: Percentage of files to process per directory (1-100)
+
+    Returns:
+        List of (json_file, label, camera_id) tuples in deterministic order
+
+    Raises:
+        ValueError: If sample_percentage is out of range or no camera has files
+    """
+    if not 1 <= sample_percentage <= 100:
+        raise ValueError("sample_percentage must be between 1 and 100")
+
+    files = []
+    for camera_id, (violent_path, non_violent_path) in enumerate(sources):
+        camera_files = []
+        for directory, label in ((violent_path, 1.0), (non_violent_path, 0.0)):
+            json_files = sorted(directory.glob("*.json"))
+            if not json_files:
+                # Attributed to this line, so callers listing the same
+                # sources twice get the warning once
+                warnings.warn(
+                    f"No JSON files found in directory: {directory}; "
+                    f"skipping camera {camera_id}",
+                    stacklevel=1,
+                )
+                break
+            num_files = max(1, int(len(json_files) * sample_percentage / 100))
+            camera_files.extend((f, label, camera_id) for f in json_files[:num_files])
+        else:
+            files.extend(camera_files)
+
+    if not files:
+        raise ValueError(
+            "No JSON files found for any camera: "
+            + ", ".join(f"{v}, {n}" for v, n in sources)
+        )
+    return files
+
+
+def load_graph_arrays(
+    json_file: Path,
+    topology: str = TOPOLOGY_COMPLETE,
+    knn_k: int = DEFAULT_KNN_K,
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Convert all person instances in one MMPose JSON file to graph arrays.
+
+    The file is streamed frame by frame, so only the resulting arrays are kept.
+    Keypoints outside keypoint_subset and persons or keypoints rejected by the
+    confidence filter are dropped before the graphs are built.
+
+    Args:
+        json_file: Path to the MMPose JSON file
+        topology: Graph edge topology (see gnn.TOPOLOGY_MODES)
+        knn_k: Number of nearest neighbours for the "skeleton_knn" topology
+        keypoint_subset: Keypoint indices to keep (see gnn.KEYPOINT_SUBSETS),
+                         or None to keep every keypoint
+        confidence: Instance confidence filter (see make_confidence_filter),
+                    or None to keep every person
+
+    Returns:
+        Dictionary with the concatenated valid keypoints ("coords"), undirected
+        edge pairs ("pairs", empty for complete graphs) and their per-graph
+        offsets ("node_ptr", "pair_ptr"). Graphs are grouped by frame through
+        "frame_ids" (an object array of the frame ids exactly as stored in the
+        file, None where a frame has none) and the per-frame graph offsets
+        "frame_ptr"; frames without any valid pose are left out.
+
+    Raises:
+        ValueError: If a pose has fewer keypoints than keypoint_subset needs
+    """
+    coords: List[np.ndarray] = []
+    pairs: List[np.ndarray] = []
+    node_counts: List[int] = []
+    pair_counts: List[int] = []
+    frame_ids: List[Any] = []
+    frame_counts: List[int] = []
+
+    for meta_info, frame_data in iter_frames(json_file):
+        # Skeleton links are needed by the sparse topologies
+        skeleton_links = subset_skeleton_links(
+            skeleton_links_from_meta(meta_info), keypoint_subset
+        )
+        num_graphs = len(node_counts)
+
+        for keypoints in select_instances(
+            frame_data.get("instances", []), keypoint_subset, confidence
+        ):
+            arrays = pose_graph_arrays(
+                keypoints,
+                topology=topology,
+                skeleton_links=skeleton_links,
+                knn_k=knn_k,
+            )
+            if arrays is None:
+                continue
+
+            valid_keypoints, graph_pairs = arrays
+            coords.append(valid_keypoints)
+            node_counts.append(len(valid_keypoints))
+            if graph_pairs is not None:
+                pairs.append(graph_pairs)
+                pair_counts.append(len(graph_pairs))
+            else:
+                pair_counts.append(0)
+
+        if len(node_counts) > num_graphs:
+            frame_ids.append(frame_data.get("frame_id"))
+            frame_counts.append(len(node_counts) - num_graphs)
+
+    return {
+        "coords": (
+            np.concatenate(coords).astype(np.float64)
+            if coords
+            else np.empty((0, 2), dtype=np.float64)
+        ),
+        "node_ptr": np.concatenate([[0], np.cumsum(node_counts)]).astype(np.int64),
+        "pairs": (
+            np.concatenate(pairs).astype(np.int32)
+            if pairs
+            else np.empty((0, 2), dtype=np.int32)
+        ),
+        "pair_ptr": np.concatenate([[0], np.cumsum(pair_counts)]).astype(np.int64),
+        "frame_ids": _object_array(frame_ids),
+        "frame_ptr": np.concatenate([[0], np.cumsum(frame_counts)]).astype(np.int64),
+    }
+
+
+def _object_array(values: List[Any]) -> np.ndarray:
+    """Wrap arbitrary Python values in a 1-D object array without converting them."""
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def iter_graph_arrays(
+    json_files: Iterable[Path],
+    topology: str = TOPOLOGY_COMPLETE,
+    knn_k: int = DEFAULT_KNN_K,
+    num_workers: int = 0,
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Load graph arrays for many files, optionally on a pool of worker processes.
+
+    Results are yielded in the order of json_files. At most
+    num_workers * PREFETCH_PER_WORKER files are in flight at any time, so
+    memory stays bounded no matter how many files there are.
+
+    Args:
+        json_files: Paths to MMPose JSON files
+        topology: Graph edge topology (see gnn.TOPOLOGY_MODES)
+        knn_k: Number of nearest neighbours for the "skeleton_knn" topology
+        num_workers: Number of worker processes (0 parses in this process)
+        keypoint_subset: Keypoint indices to keep, or None to keep every keypoint
+        confidence: Instance confidence filter, or None to keep every person
+
+    Yields:
+        Graph arrays of each file, as returned by load_graph_arrays
+    """
+    load = partial(
+        load_graph_arrays,
+        topology=topology,
+        knn_k=knn_k,
+        keypoint_subset=keypoint_subset,
+        confidence=confidence,
+    )
+    if num_workers <= 0:
+        for json_file in json_files:
+            yield load(json_file)
+        return
+
+    files = iter(json_files)
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        pending: Deque[Future] = deque(
+            executor.submit(load, json_file)
+            for json_file in itertools.islice(files, num_workers * PREFETCH_PER_WORKER)
+        )
+        while pending:
+            arrays = pending.popleft().result()
+            next_file = next(files, None)
+            if next_file is not None:
+                pending.append(executor.submit(load, next_file))
+            yield arrays
+
+
+def graphs_from_arrays(
+    arrays: Dict[str, np.ndarray], topology: str = TOPOLOGY_COMPLETE
+) -> List[Data]:
+    """
+    Rebuild PyTorch Geometric graphs from the arrays of one file.
+
+    Args:
+        arrays: Graph arrays as returned by load_graph_arrays
+        topology: Graph edge topology the arrays were built with
+
+    Returns:
+        List of graph Data objects in instance order
+    """
+    coords, node_ptr = arrays["coords"], arrays["node_ptr"]
+    pairs, pair_ptr = arrays["pairs"], arrays["pair_ptr"]
+
+    graphs = []
+    for i in range(len(node_ptr) - 1):
+        graph_pairs = None
+        if topology != TOPOLOGY_COMPLETE:
+            graph_pairs = pairs[pair_ptr[i] : pair_ptr[i + 1]].astype(np.int64)
+        graphs.append(
+            pose_graph_from_arrays(coords[node_ptr[i] : node_ptr[i + 1]], graph_pairs)
+        )
+    return graphs
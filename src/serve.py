@@ -0,0 +1,765 @@
+#!/usr/bin/env python3
+"""
+Streaming violence detection service for live pose frames.
+
+Cameras deliver pose frames continuously, so this service keeps the model
+loaded and scores frames as they arrive instead of waiting for complete
+files. It provides:
+- Newline-delimited JSON input over a local TCP socket or stdin
+- Micro-batching of person graphs across all concurrent streams
+- Per-stream sliding-window statistics and alerts
+- One JSON response per frame, including the service-side latency
+
+Each input line is one frame in MMPose "instances" format, tagged with the
+stream it belongs to:
+
+    {"stream_id": "cam1", "frame_id": 7, "instances": [{"keypoints": ...}]}
+
+A stream may send MMPose "meta_info" once (in any frame message), which
+provides the skeleton links required by the sparse graph topologies.
+Responses of a stream are returned in the order its frames were received.
+
+A stream that has finished sends an end-of-stream message, which is answered
+after its last frame and drops its sliding window:
+
+    {"stream_id": "cam1", "end_of_stream": true}
+
+The window of a stream that sends nothing for stream_timeout_s seconds is
+dropped as well; if the stream resumes, it starts with an empty window and
+must send its "meta_info" again. When max_queue_size frames are waiting to be
+scored, new frames are answered with an "overloaded" error instead of being
+queued.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import queue
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+import torch
+
+from dense import DenseViolenceDetectionGNN
+from gnn import skeleton_links_from_meta, subset_skeleton_links
+from inference import (
+    DEFAULT_MODEL_PATH,
+    DEFAULT_TOPOLOGY,
+    ENGINE_DENSE,
+    ENGINE_SPARSE,
+    ENGINES,
+    build_frame_graphs,
+    interpret_score,
+    load_model_and_threshold,
+    predict_violence,
+)
+from model import QUANTIZED_DEVICE, ViolenceDetectionGNN, get_device, is_quantized
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Data
+
+# Constants for the service
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = 256  # Person graphs per forward pass
+DEFAULT_MAX_WAIT_MS = 5.0  # Longest a frame waits for others to batch with
+DEFAULT_WINDOW_SIZE = 30  # Frames per sliding window (1 s at 30 fps)
+DEFAULT_MAX_QUEUE_SIZE = 1024  # Queued frames before new ones are rejected
+DEFAULT_STREAM_TIMEOUT_S = 300.0  # Idle time before a stream's window is dropped
+OVERLOADED_ERROR = "Service overloaded; frame dropped"
+
+# (received time, stream id, frame id, graphs, stream window, answer, reply
+# callback); the answer is the response of a frame that is not scored (an
+# error or an end of stream), in which case there is no window
+_Request = Tuple[
+    float,
+    Any,
+    Any,
+    List["Data"],
+    Optional["StreamWindow"],
+    Optional[Dict[str, Any]],
+    Callable[[Dict[str, Any]], None],
+]
+
+
+class StreamWindow:
+    """
+    Sliding-window statistics of one stream.
+
+    An alert is raised on the frame where the average score of a full window
+    first reaches the threshold, and stays active until the window average
+    drops below it again.
+    """
+
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE):
+        """
+        Initialize an empty window.
+
+        Args:
+            window_size: Number of most recent scored frames to keep
+        """
+        self.scores: Deque[float] = deque(maxlen=window_size)
+        self.violent: Deque[bool] = deque(maxlen=window_size)
+        self.alert_active = False
+        self.skeleton_links: Optional[List[List[int]]] = None
+        self.last_seen = time.perf_counter()
+
+    def update(self, score: float, is_violent: bool, threshold: float) -> Dict:
+        """
+        Add a scored frame and recompute the window statistics.
+
+        Args:
+            score: Average violence score of the frame
+            is_violent: Whether the frame score reaches the threshold
+            threshold: Classification threshold
+
+        Returns:
+            Dictionary of window statistics and alert flags
+        """
+        self.scores.append(score)
+        self.violent.append(bool(is_violent))
+
+        window_score = float(np.mean(self.scores))
+        active = bool(
+            len(self.scores) == self.scores.maxlen and window_score >= threshold
+        )
+        alert = active and not self.alert_active
+        self.alert_active = active
+
+        return {
+            "window_score": window_score,
+            "window_violent_fraction": sum(self.violent) / len(self.violent),
+            "alert": alert,
+            "alert_active": active,
+        }
+
+
+def _check_frame(message: Dict[str, Any]) -> None:
+    """
+    Check the layout of a frame message before its graphs are built.
+
+    Args:
+        message: Frame message (see the module docstring)
+
+    Raises:
+        ValueError: If the stream id, instances or meta_info are malformed
+    """
+    if not isinstance(message["stream_id"], (str, int)):
+        raise ValueError("stream_id must be a string or an integer")
+    instances = message.get("instances", [])
+    if not isinstance(instances, list) or not all(
+        isinstance(instance, dict) for instance in instances
+    ):
+        raise ValueError("instances must be a list of objects")
+    meta_info = message.get("meta_info")
+    if meta_info is None:
+        return
+    if not isinstance(meta_info, dict):
+        raise ValueError("meta_info must be an object")
+    links = meta_info.get("skeleton_links")
+    if links is not None and not (
+        isinstance(links, list)
+        and all(
+            isinstance(link, list)
+            and len(link) == 2
+            and all(isinstance(i, int) for i in link)
+            for link in links
+        )
+    ):
+        raise ValueError("meta_info.skeleton_links must be a list of index pairs")
+
+
+class StreamingScorer:
+    """
+    Scores frames from many streams with micro-batched forward passes.
+
+    Frames are converted to graphs by the thread that submits them. A single
+    scoring thread collects queued frames until max_batch_size graphs are
+    available or the oldest frame has waited max_wait_ms, then scores all of
+    them in one forward pass.
+
+    At most max_queue_size frames wait to be scored; further frames are
+    answered with an "overloaded" error. Responses that are not scored also
+    go through the queue, and block their submitting thread while it is full,
+    which pushes back on the clients instead of buffering without limit.
+    """
+
+    def __init__(
+        self,
+        model: ViolenceDetectionGNN,
+        threshold: float,
+        device: torch.device,
+        topology: Dict[str, Any] = DEFAULT_TOPOLOGY,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        stream_timeout_s: float = DEFAULT_STREAM_TIMEOUT_S,
+    ):
+        """
+        Initialize the scorer.
+
+        Args:
+            model: Trained GNN model
+            threshold: Classification threshold
+            device: Device to run inference on
+            topology: Graph topology options the model was trained with
+            max_batch_size: Person graphs per forward pass
+            max_wait_ms: Longest a frame waits for others to batch with
+            window_size: Frames per sliding window of each stream
+            max_queue_size: Frames waiting to be scored before new frames
+                            are rejected as overloaded
+            stream_timeout_s: Seconds without frames after which the window
+                              of a stream is dropped
+        """
+        self.model = model.eval()
+        self.threshold = float(threshold)
+        self.device = device
+        self.topology = topology
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.window_size = window_size
+        self.stream_timeout = stream_timeout_s
+
+        self.num_frames = 0
+        self.num_graphs = 0
+        self.num_batches = 0
+        self.num_overloaded = 0
+
+        self._queue: queue.Queue[Optional[_Request]] = queue.Queue(max_queue_size)
+        self._streams: Dict[Any, StreamWindow] = {}
+        self._streams_lock = threading.Lock()
+        self._next_eviction = time.perf_counter() + stream_timeout_s / 2
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> StreamingScorer:
+        """Start the scoring thread."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Score all submitted frames, then stop the scoring thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _stream(self, stream_id: Any) -> StreamWindow:
+        """
+        Return the window of a stream, creating it on first use.
+
+        Windows of streams that have been idle for stream_timeout_s are
+        dropped on the way, at most every half timeout.
+
+        Args:
+            stream_id: Stream identifier of a frame message
+
+        Returns:
+            The stream's window, marked as seen now
+        """
+        now = time.perf_counter()
+        with self._streams_lock:
+            if now >= self._next_eviction:
+                idle_since = now - self.stream_timeout
+                for idle_id in [
+                    key
+                    for key, window in self._streams.items()
+                    if window.last_seen < idle_since
+                ]:
+                    del self._streams[idle_id]
+                self._next_eviction = now + self.stream_timeout / 2
+
+            window = self._streams.get(stream_id)
+            if window is None:
+                window = self._streams[stream_id] = StreamWindow(self.window_size)
+            window.last_seen = now
+            return window
+
+    @property
+    def num_streams(self) -> int:
+        """Number of streams whose windows are kept."""
+        with self._streams_lock:
+            return len(self._streams)
+
+    def _answer(
+        self,
+        response: Dict[str, Any],
+        reply: Callable[[Dict[str, Any]], None],
+        received: float,
+    ) -> None:
+        """Queue a response that needs no scoring, waiting while the queue is full."""
+        self._queue.put(
+            (
+                received,
+                response.get("stream_id"),
+                response.get("frame_id"),
+                [],
+                None,
+                response,
+                reply,
+            )
+        )
+
+    def reject(
+        self,
+        response: Dict[str, Any],
+        reply: Callable[[Dict[str, Any]], None],
+        received: Optional[float] = None,
+    ) -> None:
+        """
+        Queue the error response of a frame that cannot be scored.
+
+        The response goes through the same queue as scored frames, so it is
+        sent after the responses to the earlier frames of its stream.
+
+        Args:
+            response: Error response, with at least an "error" entry
+            reply: Called with the response in arrival order
+            received: Time the frame was received (default: now)
+        """
+        if received is None:
+            received = time.perf_counter()
+        self._answer(response, reply, received)
+
+    def submit(
+        self, message: Dict[str, Any], reply: Callable[[Dict[str, Any]], None]
+    ) -> None:
+        """
+        Queue one frame for scoring.
+
+        A malformed frame is answered with an error instead of raising, so it
+        never stops the service for the other streams, and so is a frame that
+        finds the queue full. An end-of-stream message drops the stream's
+        window and is answered after the stream's earlier frames.
+
+        Args:
+            message: Frame message with "stream_id", "frame_id", "instances"
+                     and optionally "meta_info", or an end-of-stream message
+            reply: Called with the response once the frame has been scored
+        """
+        received = time.perf_counter()
+        stream_id = message.get("stream_id")
+        frame_id = message.get("frame_id")
+        if stream_id is None:
+            self.reject({"frame_id": frame_id, "error": "Missing stream_id"}, reply)
+            return
+        if message.get("end_of_stream"):
+            with self._streams_lock:
+                self._streams.pop(stream_id, None)
+            self._answer(
+                {"stream_id": stream_id, "end_of_stream": True}, reply, received
+            )
+            return
+
+        try:
+            _check_frame(message)
+            stream = self._stream(stream_id)
+            if "meta_info" in message:
+                stream.skeleton_links = subset_skeleton_links(
+                    skeleton_links_from_meta(message["meta_info"]),
+                    self.topology["keypoint_subset"],
+                )
+
+            graphs = build_frame_graphs(
+                message.get("instances", []),
+                self.topology["mode"],
+                stream.skeleton_links,
+                self.topology["knn_k"],
+                self.topology["keypoint_subset"],
+                self.topology["confidence"],
+            )
+        except Exception as e:  # any bad frame is answered, not fatal
+            self.reject(
+                {"stream_id": stream_id, "frame_id": frame_id, "error": str(e)},
+                reply,
+                received,
+            )
+            return
+
+        try:
+            self._queue.put_nowait(
+                (received, stream_id, frame_id, graphs, stream, None, reply)
+            )
+        except queue.Full:
+            self.num_overloaded += 1
+            self.reject(
+                {
+                    "stream_id": stream_id,
+                    "frame_id": frame_id,
+                    "error": OVERLOADED_ERROR,
+                },
+                reply,
+                received,
+            )
+
+    def _run(self) -> None:
+        """Collect micro-batches from the queue and score them."""
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+
+            batch = [request]
+            num_graphs = len(request[3])
+            deadline = request[0] + self.max_wait
+            while num_graphs < self.max_batch_size:
+                try:
+                    request = self._queue.get(
+                        timeout=max(0.0, deadline - time.perf_counter())
+                    )
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._respond(batch)
+                    return
+                batch.append(request)
+                num_graphs += len(request[3])
+
+            self._respond(batch)
+
+    def _respond(self, batch: List[_Request]) -> None:
+        """
+        Score a micro-batch and send one response per frame.
+
+        Frames that are not scored are answered with their queued response in
+        their place in the batch. A failing batch is answered with errors instead of
+        stopping the scoring thread, so the service keeps running for the
+        other streams.
+
+        Args:
+            batch: Queued frame requests in arrival order
+        """
+        scored = [request for request in batch if request[5] is None]
+        try:
+            scored_responses = self._score(scored) if scored else []
+        except Exception as e:
+            scored_responses = [
+                {"stream_id": stream_id, "frame_id": frame_id, "error": str(e)}
+                for _, stream_id, frame_id, _, _, _, _ in scored
+            ]
+
+        remaining = iter(scored_responses)
+        for received, _, _, _, _, answer, reply in batch:
+            response = dict(answer) if answer is not None else next(remaining)
+            response["latency_ms"] = (time.perf_counter() - received) * 1000
+            reply(response)
+
+    def _score(self, batch: List[_Request]) -> List[Dict[str, Any]]:
+        """
+        Score a micro-batch with one forward pass.
+
+        Args:
+            batch: Queued frame requests in arrival order
+
+        Returns:
+            One response per frame, in batch order
+        """
+        graphs = [graph for request in batch for graph in request[3]]
+        scores = predict_violence(self.model, graphs, self.device, self.max_batch_size)
+
+        self.num_frames += len(batch)
+        self.num_graphs += len(graphs)
+        self.num_batches += 1
+
+        responses = []
+        start = 0
+        for _, stream_id, frame_id, frame_graphs, window, _, _ in batch:
+            person_scores = scores[start : start + len(frame_graphs)]
+            start += len(frame_graphs)
+
+            response: Dict[str, Any] = {"stream_id": stream_id, "frame_id": frame_id}
+            if person_scores:
+                score = float(np.mean(person_scores))
+                interpretation, is_violent = interpret_score(score, self.threshold)
+                response.update(
+                    {
+                        "violence_score": score,
+                        "is_violent": bool(is_violent),
+                        "interpretation": interpretation,
+                        "person_scores": person_scores,
+                    }
+                )
+                response.update(window.update(score, is_violent, self.threshold))
+            else:
+                # No valid pose; the stream's window is left unchanged
+                response.update({"violence_score": None, "person_scores": []})
+            responses.append(response)
+
+        return responses
+
+
+class _ReplyChannel:
+    """
+    Writes newline-delimited JSON responses to one output stream.
+
+    Responses come from the scoring thread, so writes are serialized and the
+    number of unanswered frames is tracked to drain them before closing.
+    """
+
+    def __init__(self, output: IO[bytes]):
+        """
+        Initialize the channel.
+
+        Args:
+            output: Binary stream receiving the responses
+        """
+        self._output = output
+        self._pending = 0
+        self._condition = threading.Condition()
+
+    def expect(self) -> None:
+        """Register a frame that will be answered later."""
+        with self._condition:
+            self._pending += 1
+
+    def send(self, response: Dict[str, Any]) -> None:
+        """
+        Write one response; a disconnected client is ignored.
+
+        Args:
+            response: JSON-serializable response
+        """
+        with self._condition:
+            try:
+                self._output.write(json.dumps(response).encode("utf-8") + b"\n")
+                self._output.flush()
+            except OSError:
+                pass
+            self._pending -= 1
+            self._condition.notify_all()
+
+    def wait(self) -> None:
+        """Block until every registered frame has been answered."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending == 0)
+
+
+def serve_lines(
+    scorer: StreamingScorer, lines: Iterable[bytes], output: IO[bytes]
+) -> None:
+    """
+    Score newline-delimited JSON frames and write one response per frame.
+
+    Args:
+        scorer: Running StreamingScorer
+        lines: Input lines, one frame message each
+        output: Binary stream receiving the responses
+    """
+    channel = _ReplyChannel(output)
+    for line in lines:
+        if not line.strip():
+            continue
+
+        channel.expect()
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            scorer.reject({"error": f"Invalid JSON: {e}"}, channel.send)
+            continue
+        if not isinstance(message, dict):
+            scorer.reject(
+                {"error": "Frame message must be a JSON object"}, channel.send
+            )
+            continue
+
+        scorer.submit(message, channel.send)
+
+    channel.wait()
+
+
+class _FrameHandler(socketserver.StreamRequestHandler):
+    """Serves the frames of one client connection."""
+
+    def handle(self) -> None:
+        """Score frames until the client closes its side of the connection."""
+        serve_lines(self.server.scorer, self.rfile, self.wfile)
+
+
+class PoseStreamServer(socketserver.ThreadingTCPServer):
+    """TCP server with one thread per connection and a shared scorer."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], scorer: StreamingScorer):
+        """
+        Bind the server.
+
+        Args:
+            address: (host, port) to listen on
+            scorer: Running StreamingScorer shared by all connections
+        """
+        super(PoseStreamServer, self).__init__(address, _FrameHandler)
+        self.scorer = scorer
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the streaming service.
+
+    Returns:
+        Parsed command-line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Streaming violence detection service for live pose frames"
+    )
+    parser.add_argument(
+        "--model_path",
+        type=str,
+        default=DEFAULT_MODEL_PATH,
+        help=f"Path to trained model (default: {DEFAULT_MODEL_PATH})",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Classification threshold (0-1). Uses model's threshold if None.",
+    )
+    parser.add_argument(
+        "--stdin",
+        action="store_true",
+        help="Read frames from stdin and write responses to stdout",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=DEFAULT_HOST,
+        help=f"Address to listen on (default: {DEFAULT_HOST})",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on (default: {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--max_batch_size",
+        type=int,
+        default=DEFAULT_MAX_BATCH_SIZE,
+        help=f"Person graphs per forward pass (default: {DEFAULT_MAX_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--max_wait_ms",
+        type=float,
+        default=DEFAULT_MAX_WAIT_MS,
+        help=(
+            "Longest a frame waits for others to batch with "
+            f"(default: {DEFAULT_MAX_WAIT_MS})"
+        ),
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=ENGINES,
+        default=ENGINE_SPARSE,
+        help=f"Model execution engine (default: {ENGINE_SPARSE})",
+    )
+    parser.add_argument(
+        "--window_size",
+        type=int,
+        default=DEFAULT_WINDOW_SIZE,
+        help=f"Frames per sliding window and alert (default: {DEFAULT_WINDOW_SIZE})",
+    )
+    parser.add_argument(
+        "--max_queue_size",
+        type=int,
+        default=DEFAULT_MAX_QUEUE_SIZE,
+        help=(
+            "Frames waiting to be scored before new frames are rejected "
+            f"(default: {DEFAULT_MAX_QUEUE_SIZE})"
+        ),
+    )
+    parser.add_argument(
+        "--stream_timeout",
+        type=float,
+        default=DEFAULT_STREAM_TIMEOUT_S,
+        help=(
+            "Seconds without frames before a stream's window is dropped "
+            f"(default: {DEFAULT_STREAM_TIMEOUT_S})"
+        ),
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """
+    Run the streaming service until stdin closes or it is interrupted.
+
+    Log messages go to stderr, so that stdout only carries responses in
+    stdin mode.
+    """
+    args = parse_arguments()
+    model_path = Path(args.model_path)
+
+    if not model_path.exists():
+        print(f"Error: Model file {model_path} does not exist.", file=sys.stderr)
+        return
+
+    device = get_device()
+    try:
+        model, model_threshold, _, topology = load_model_and_threshold(
+            model_path, device
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return
+    if is_quantized(model):
+        device = QUANTIZED_DEVICE
+    threshold = args.threshold if args.threshold is not None else model_threshold
+    if args.engine == ENGINE_DENSE:
+        model = DenseViolenceDetectionGNN(model, topology["mode"])
+    print(
+        f"Model loaded from {model_path} on {device} "
+        f"(topology: {topology['mode']}, threshold: {threshold}, "
+        f"engine: {args.engine})",
+        file=sys.stderr,
+    )
+
+    scorer = StreamingScorer(
+        model,
+        threshold,
+        device,
+        topology=topology,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        window_size=args.window_size,
+        max_queue_size=args.max_queue_size,
+        stream_timeout_s=args.stream_timeout,
+    ).start()
+
+    try:
+        if args.stdin:
+            serve_lines(scorer, sys.stdin.buffer, sys.stdout.buffer)
+        else:
+            with PoseStreamServer((args.host, args.port), scorer) as server:
+                print(f"Listening on {args.host}:{args.port}", file=sys.stderr)
+                server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scorer.stop()
+        print(
+            f"Scored {scorer.num_frames} frames in {scorer.num_batches} batches "
+            f"({scorer.num_overloaded} rejected as overloaded)",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
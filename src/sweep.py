@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter sweep for the violence detection model.
+
+Trials train concurrently in a pool of worker processes that all read the
+same memory-mapped graph cache, so graphs are built once (by train.py or
+`make preprocess`) and shared through the page cache. The script provides:
+- A search space over model size, learning rate and batch size, given as a
+  JSON file of value lists and run as a full or sampled grid
+- A per-trial thread limit, so concurrent trials do not oversubscribe cores
+- Median pruning: a trial whose validation AUC falls below the median of the
+  other trials at the same epoch is stopped early
+- A leaderboard of best validation AUC against wall time, model size and
+  inference throughput, plus per-epoch curves and a log file per trial
+- Distillation sweeps: with a teacher model, every trial is a student trained
+  on the teacher's scores (see distillation.py), and the teacher is reported
+  next to the students for the accuracy vs. throughput trade-off
+
+Trials use the training and validation split of train.py; the test graphs
+are left untouched for the final model. Throughput is measured after the
+trials, one model at a time, so trials do not compete for the cores.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+import torch
+from sklearn.metrics import roc_auc_score
+from torch.utils.data import Subset
+
+from checkpointing import EARLY_STOPPING_PATIENCE, EarlyStopping
+from distillation import (
+    TeacherScoredDataset,
+    compute_teacher_scores,
+    count_parameters,
+    distillation_loss,
+    measure_throughput,
+    teacher_batch,
+)
+from graph_cache import GraphCacheDataset, open_graph_cache
+from inference import DEFAULT_BATCH_SIZE
+from loaders import make_loader
+from model import ViolenceDetectionGNN
+from train import (
+    BATCH_SIZE,
+    GRAPH_CACHE_DIR,
+    GRAPH_KNN_K,
+    GRAPH_TOPOLOGY,
+    LEARNING_RATE,
+    MODEL_GNN_HEADS,
+    MODEL_HIDDEN_CHANNELS,
+    MODEL_JK_MODE,
+    MODEL_TRANSFORMER_HEADS,
+    MODEL_TRANSFORMER_LAYERS,
+    NUM_EPOCHS,
+    RANDOM_SEED,
+    load_teacher,
+    split_graph_indices,
+    train_model,
+)
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Batch
+
+# Constants for the sweep
+DEFAULT_SEARCH_SPACE: Dict[str, List[Any]] = {
+    "hidden_channels": [32, 64, 128],
+    "transformer_heads": [2, 4],
+    "transformer_layers": [1, 2],
+    "learning_rate": [1e-3, 3e-4],
+    "batch_size": [32, 64],
+}
+DEFAULT_PARAMS: Dict[str, Any] = {
+    "hidden_channels": MODEL_HIDDEN_CHANNELS,
+    "transformer_heads": MODEL_TRANSFORMER_HEADS,
+    "transformer_layers": MODEL_TRANSFORMER_LAYERS,
+    "gnn_heads": MODEL_GNN_HEADS,
+    "jk_mode": MODEL_JK_MODE,
+    "learning_rate": LEARNING_RATE,
+    "batch_size": BATCH_SIZE,
+}
+MODEL_PARAMS = (  # Hyperparameters that are constructor arguments of the model
+    "hidden_channels",
+    "transformer_heads",
+    "transformer_layers",
+    "gnn_heads",
+    "jk_mode",
+)
+DEFAULT_TRIALS = 16  # Configurations sampled from the grid (0 runs all)
+DEFAULT_THREADS_PER_TRIAL = 1
+PRUNE_WARMUP_EPOCHS = 2  # Epochs every trial runs before it can be pruned
+PRUNE_MIN_TRIALS = 3  # Other trials needed at an epoch to compare against
+SWEEP_DIR = Path("sweeps")
+LEADERBOARD_NAME = "leaderboard.csv"
+TRIALS_NAME = "trials.json"
+TEACHER_SCORES_NAME = "teacher_scores.npy"
+TEACHER_NAME = "teacher.json"
+
+# Per-process state of the sweep workers
+_graphs: Optional[GraphCacheDataset] = None
+_teacher_scores: Optional[np.ndarray] = None
+
+
+def expand_search_space(
+    space: Dict[str, List[Any]], num_trials: int, seed: int = RANDOM_SEED
+) -> List[Dict[str, Any]]:
+    """
+    Turn a search space into trial configurations.
+
+    Args:
+        space: Value lists per hyperparameter (see DEFAULT_SEARCH_SPACE);
+               hyperparameters left out keep their train.py defaults
+        num_trials: Number of configurations sampled from the grid, 0 for all
+        seed: Seed of the sampling
+
+    Returns:
+        List of complete hyperparameter dictionaries
+
+    Raises:
+        ValueError: If the space names unknown hyperparameters or is empty
+    """
+    unknown = set(space) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(
+            f"Unknown hyperparameters {sorted(unknown)}, "
+            f"expected a subset of {sorted(DEFAULT_PARAMS)}"
+        )
+
+    names = list(space)
+    grid = [
+        dict(DEFAULT_PARAMS, **dict(zip(names, values)))
+        for values in itertools.product(*(space[name] for name in names))
+    ]
+    # The transformer and the GAT layer split the hidden size evenly between
+    # their heads
+    grid = [
+        p
+        for p in grid
+        if p["hidden_channels"] % p["transformer_heads"] == 0
+        and p["hidden_channels"] % p["gnn_heads"] == 0
+    ]
+    if not grid:
+        raise ValueError("The search space contains no valid configuration")
+
+    if 0 < num_trials < len(grid):
+        grid = random.Random(seed).sample(grid, num_trials)
+    return grid
+
+
+def should_prune(
+    history: Dict[int, List[float]],
+    trial_id: int,
+    epoch: int,
+    val_auc: float,
+    warmup_epochs: int = PRUNE_WARMUP_EPOCHS,
+    min_trials: int = PRUNE_MIN_TRIALS,
+) -> bool:
+    """
+    Decide whether a trial is weak enough to stop (median pruning).
+
+    Args:
+        history: Validation AUC per epoch of every trial reported so far
+        trial_id: Trial to decide for
+        epoch: Zero-based epoch that just finished
+        val_auc: Validation AUC of the trial at that epoch
+        warmup_epochs: Epochs every trial runs before it can be pruned
+        min_trials: Other trials that must have reached the epoch
+
+    Returns:
+        True if the trial's AUC is below the median of the other trials
+    """
+    if epoch + 1 < warmup_epochs:
+        return False
+    others = [
+        aucs[epoch]
+        for other_id, aucs in history.items()
+        if other_id != trial_id and len(aucs) > epoch
+    ]
+    return len(others) >= min_trials and val_auc < statistics.median(others)
+
+
+def _init_worker(
+    store_dir: Path, num_threads: int, teacher_scores_path: Optional[Path]
+) -> None:
+    """
+    Prepare a sweep worker process.
+
+    Args:
+        store_dir: Graph cache store shared by all trials (the one the main
+                   process opened, which keeps it from being deleted even if
+                   the cache is rebuilt meanwhile)
+        num_threads: Intra-op threads of each trial
+        teacher_scores_path: Teacher scores of the graphs for distillation
+                             sweeps, None trains on the labels alone
+    """
+    global _graphs, _teacher_scores
+    torch.set_num_threads(num_threads)
+    _graphs = GraphCacheDataset(store_dir)
+    if teacher_scores_path is not None:
+        _teacher_scores = np.load(teacher_scores_path, mmap_mode="r")
+
+
+def run_trial(
+    trial_id: int,
+    params: Dict[str, Any],
+    num_epochs: int,
+    patience: int,
+    history: Dict[int, List[float]],
+    log_path: Path,
+) -> Dict[str, Any]:
+    """
+    Train one configuration in a worker process.
+
+    Args:
+        trial_id: Index of the trial
+        params: Hyperparameters (see DEFAULT_PARAMS)
+        num_epochs: Maximum number of epochs
+        patience: Early stopping patience on the validation AUC
+        history: Shared validation AUC history of all trials, for pruning
+        log_path: File receiving the trial's console output
+
+    Returns:
+        Trial record with status, best validation AUC, wall time, curves and
+        the weights of the best epoch
+    """
+    assert _graphs is not None
+    graphs = _graphs
+    device = torch.device("cpu")
+    train_idx, val_idx, _ = split_graph_indices(graphs.labels.tolist())
+    data = graphs
+    loss_fn = None
+    if _teacher_scores is not None:
+        data = TeacherScoredDataset(graphs, _teacher_scores)
+        loss_fn = distillation_loss
+    loader_options = {"num_workers": 0, "prefetch_batches": 0}
+    train_loader = make_loader(
+        Subset(data, train_idx),
+        params["batch_size"],
+        device,
+        shuffle=True,
+        **loader_options,
+    )
+    val_loader = make_loader(
+        Subset(data, val_idx), params["batch_size"], device, **loader_options
+    )
+
+    torch.manual_seed(RANDOM_SEED)
+    model = ViolenceDetectionGNN(
+        in_channels=graphs[0].x.shape[1],
+        **{name: params[name] for name in MODEL_PARAMS},
+    )
+    optimizer = torch.optim.Adam(model.parameters(), lr=params["learning_rate"])
+    early_stopping = EarlyStopping(patience=patience)
+
+    start = time.perf_counter()
+    elapsed: List[float] = []
+    pruned = False
+
+    def report(epoch: int, metrics: Dict[str, List[float]]) -> bool:
+        nonlocal pruned
+        elapsed.append(time.perf_counter() - start)
+        # Manager dict values are copies, so the list is replaced, not mutated
+        history[trial_id] = list(metrics["val_auc"])
+        pruned = should_prune(dict(history), trial_id, epoch, metrics["val_auc"][-1])
+        return pruned
+
+    with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(
+        log
+    ), contextlib.redirect_stderr(log):
+        print(f"Trial {trial_id}: {json.dumps(params)}")
+        metrics = train_model(
+            model,
+            train_loader,
+            val_loader,
+            device,
+            optimizer,
+            num_epochs=num_epochs,
+            early_stopping=early_stopping,
+            epoch_callback=report,
+            loss_fn=loss_fn,
+        )
+
+    if pruned:
+        status = "pruned"
+    elif early_stopping.should_stop:
+        status = "stopped early"
+    else:
+        status = "completed"
+    return {
+        "trial": trial_id,
+        "params": params,
+        "status": status,
+        "epochs": len(metrics["val_auc"]),
+        "best_val_auc": early_stopping.best_score,
+        "best_epoch": early_stopping.best_epoch + 1,
+        "wall_time": time.perf_counter() - start,
+        "curves": dict(metrics, elapsed=elapsed),
+        "state_dict": model.state_dict(),
+    }
+
+
+def measure_inference(
+    results: List[Dict[str, Any]], batches: List[Batch], in_channels: int
+) -> None:
+    """
+    Add the size and inference throughput of every trial's best model.
+
+    The models are timed one after the other in this process, so their
+    throughput is comparable. The weights are dropped from the records.
+
+    Args:
+        results: Trial records with the weights of their best epoch
+        batches: Pre-collated validation batches of inference size
+        in_channels: Number of input features per node
+    """
+    for result in results:
+        model = ViolenceDetectionGNN(
+            in_channels=in_channels,
+            **{name: result["params"][name] for name in MODEL_PARAMS},
+        )
+        model.load_state_dict(result.pop("state_dict"))
+        result["parameters"] = count_parameters(model)
+        result["graphs_per_s"] = measure_throughput(model, batches)
+
+
+def write_leaderboard(results: List[Dict[str, Any]], output_dir: Path) -> None:
+    """
+    Write the leaderboard CSV and the per-epoch curves of all trials.
+
+    Args:
+        results: Trial records sorted by best validation AUC
+        output_dir: Sweep output directory
+    """
+    with open(output_dir / LEADERBOARD_NAME, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["rank", "trial", "status", "best_val_auc", "best_epoch", "epochs"]
+            + ["wall_time_s", "parameters", "graphs_per_s"]
+            + list(DEFAULT_PARAMS)
+        )
+        for rank, result in enumerate(results, start=1):
+            writer.writerow(
+                [
+                    rank,
+                    result["trial"],
+                    result["status"],
+                    f"{result['best_val_auc']:.6f}",
+                    result["best_epoch"],
+                    result["epochs"],
+                    f"{result['wall_time']:.1f}",
+                    result["parameters"],
+                    f"{result['graphs_per_s']:.0f}",
+                ]
+                + [result["params"][name] for name in DEFAULT_PARAMS]
+            )
+
+    with open(output_dir / TRIALS_NAME, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the sweep.
+
+    Returns:
+        Parsed command-line arguments
+    """
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep")
+    parser.add_argument(
+        "--space",
+        type=Path,
+        default=None,
+        help=(
+            "JSON file mapping hyperparameters to lists of values "
+            f"(default: {json.dumps(DEFAULT_SEARCH_SPACE)})"
+        ),
+    )
+    parser.add_argument(
+        "--trials",
+        type=int,
+        default=DEFAULT_TRIALS,
+        help=(
+            "Configurations sampled from the grid, 0 runs the full grid "
+            f"(default: {DEFAULT_TRIALS})"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Trials run concurrently (default: cores / threads per trial)",
+    )
+    parser.add_argument(
+        "--threads_per_trial",
+        type=int,
+        default=DEFAULT_THREADS_PER_TRIAL,
+        help=f"Intra-op threads per trial (default: {DEFAULT_THREADS_PER_TRIAL})",
+    )
+    parser.add_argument(
+        "--num_epochs",
+        type=int,
+        default=NUM_EPOCHS,
+        help=f"Maximum epochs per trial (default: {NUM_EPOCHS})",
+    )
+    parser.add_argument(
+        "--patience",
+        type=int,
+        default=EARLY_STOPPING_PATIENCE,
+        help=(
+            "Epochs without val AUC improvement before a trial stops, 0 disables "
+            f"(default: {EARLY_STOPPING_PATIENCE})"
+        ),
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=Path,
+        default=GRAPH_CACHE_DIR,
+        help=f"Graph cache built by train.py (default: {GRAPH_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--teacher",
+        type=Path,
+        default=None,
+        help=(
+            "Trained model distilled into every trial's model, which is then "
+            "reported next to the teacher"
+        ),
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=Path,
+        default=None,
+        help=f"Leaderboard and trial log directory (default: {SWEEP_DIR}/<time>)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """
+    Run a hyperparameter sweep and write its leaderboard.
+
+    This function:
+    1. Expands the search space into trial configurations
+    2. Checks the shared graph cache and scores it with the teacher, if any
+    3. Runs the trials in a process pool, pruning weak ones early
+    4. Times the inference of every trial's best model
+    5. Prints and saves the leaderboard of best val AUC against wall time,
+       parameters and throughput
+    """
+    args = parse_arguments()
+
+    space = DEFAULT_SEARCH_SPACE
+    if args.space is not None:
+        with open(args.space, "r", encoding="utf-8") as f:
+            space = json.load(f)
+    device = torch.device("cpu")
+    try:
+        configs = expand_search_space(space, args.trials)
+        graphs = open_graph_cache(args.cache_dir)
+        if args.teacher is not None:
+            teacher, _, teacher_topology = load_teacher(
+                args.teacher, graphs.topology, device
+            )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    workers = args.workers or max(
+        1, (os.cpu_count() or 1) // max(1, args.threads_per_trial)
+    )
+    output_dir = args.output_dir or SWEEP_DIR / time.strftime("%Y%m%d-%H%M%S")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # The teacher is frozen, so the graphs are scored once for all trials
+    teacher_scores_path = None
+    if args.teacher is not None:
+        teacher_scores = compute_teacher_scores(
+            teacher, graphs, teacher_topology, device
+        )
+        teacher_scores_path = output_dir / TEACHER_SCORES_NAME
+        np.save(teacher_scores_path, teacher_scores)
+
+    print(
+        f"Running {len(configs)} trials on {workers} workers "
+        f"({args.threads_per_trial} threads each), logs in {output_dir}"
+    )
+
+    results = []
+    start = time.perf_counter()
+    # Workers are spawned so they do not inherit the parent's OpenMP state
+    context = mp.get_context("spawn")
+    with context.Manager() as manager, ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(graphs.store_dir, args.threads_per_trial, teacher_scores_path),
+    ) as executor:
+        history = manager.dict()
+        futures = {
+            executor.submit(
+                run_trial,
+                trial_id,
+                params,
+                args.num_epochs,
+                args.patience,
+                history,
+                output_dir / f"trial_{trial_id:03d}.log",
+            ): trial_id
+            for trial_id, params in enumerate(configs)
+        }
+        for future in as_completed(futures):
+            trial_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Trial {trial_id} failed: {e}")
+                continue
+            results.append(result)
+            print(
+                f"Trial {trial_id} {result['status']} after {result['epochs']} "
+                f"epochs: val AUC {result['best_val_auc']:.4f}, "
+                f"{result['wall_time']:.1f}s"
+            )
+
+    if not results:
+        print("No trial finished.")
+        return
+
+    sweep_time = time.perf_counter() - start
+    _, val_idx, _ = split_graph_indices(graphs.labels.tolist())
+    val_batches = [
+        graphs.__getitems__(val_idx[i : i + DEFAULT_BATCH_SIZE])
+        for i in range(0, len(val_idx), DEFAULT_BATCH_SIZE)
+    ]
+    print("Timing the inference of the trained models...")
+    measure_inference(results, val_batches, graphs[0].x.shape[1])
+    results.sort(key=lambda r: r["best_val_auc"], reverse=True)
+    write_leaderboard(results, output_dir)
+
+    print(f"\nSweep finished in {sweep_time:.1f}s")
+    print(
+        f"{'Rank':<6}{'Trial':<7}{'Status':<15}{'Val AUC':>9}{'Epochs':>8}"
+        f"{'Time s':>9}{'Params':>10}{'Graphs/s':>10}"
+    )
+    for rank, result in enumerate(results, start=1):
+        print(
+            f"{rank:<6}{result['trial']:<7}{result['status']:<15}"
+            f"{result['best_val_auc']:>9.4f}{result['epochs']:>8}"
+            f"{result['wall_time']:>9.1f}{result['parameters']:>10}"
+            f"{result['graphs_per_s']:>10.0f}"
+        )
+
+    command = "python src/train.py " + " ".join(
+        f"--{name} {value}" for name, value in results[0]["params"].items()
+    )
+    if (graphs.topology["mode"], graphs.topology["knn_k"]) != (
+        GRAPH_TOPOLOGY,
+        GRAPH_KNN_K,
+    ):
+        command += (
+            f" --topology {graphs.topology['mode']} "
+            f"--knn_k {graphs.topology['knn_k']}"
+        )
+    if graphs.topology["keypoint_subset"] is not None:
+        command += " --keypoint_subset " + ",".join(
+            str(i) for i in graphs.topology["keypoint_subset"]
+        )
+    if graphs.topology["confidence"] is not None:
+        command += "".join(
+            f" --{name} {value}"
+            for name, value in graphs.topology["confidence"].items()
+            if value
+        )
+    if args.teacher is not None:
+        teacher_batches = [
+            teacher_batch(graphs, val_idx[i : i + DEFAULT_BATCH_SIZE], teacher_topology)
+            for i in range(0, len(val_idx), DEFAULT_BATCH_SIZE)
+        ]
+        teacher_record = {
+            "path": str(args.teacher),
+            "val_auc": float(
+                roc_auc_score(graphs.labels[val_idx], teacher_scores[val_idx])
+            ),
+            "parameters": count_parameters(teacher),
+            "graphs_per_s": measure_throughput(teacher, teacher_batches),
+        }
+        with open(output_dir / TEACHER_NAME, "w", encoding="utf-8") as f:
+            json.dump(teacher_record, f, indent=2)
+        print(
+            f"{'teacher':<28}{teacher_record['val_auc']:>9.4f}{'':>17}"
+            f"{teacher_record['parameters']:>10}"
+            f"{teacher_record['graphs_per_s']:>10.0f}"
+        )
+        command += f" --teacher {args.teacher}"
+    print(f"Best configuration: {command}")
+    print(f"Leaderboard saved to {output_dir / LEADERBOARD_NAME}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,37 +6,88 @@ This module implements a GNN model to detect violent behavior from human pose da
 in MMPose JSON format. It includes functionality for:
 - Data loading and preprocessing from MMPose JSON format
 - Graph construction from pose keypoints
-- Model training with metrics tracking
-- Model evaluation and optimal threshold selection
+- Model training with metrics tracking, resumable checkpoints and early stopping
+- Head-only retraining on precomputed embeddings of a frozen, trained GNN
+- Knowledge distillation of a trained model into a smaller student model
+- Data-parallel training across processes and nodes (gloo, launched by torchrun)
+- Model evaluation, optimal threshold selection and bootstrap confidence intervals
 - Result visualization and model persistence
 """
 
 from __future__ import annotations
 
-import json
+import argparse
+import os
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import torch
 import torch.nn.functional as F
-from sklearn.metrics import (
-    confusion_matrix,
-    f1_score,
-    precision_recall_curve,
-    roc_auc_score,
-    roc_curve,
-)
+from sklearn.metrics import f1_score, roc_auc_score
 from sklearn.model_selection import train_test_split
-from torch_geometric.data import Data
-from torch_geometric.loader import DataLoader
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import Subset
+from torch.utils.data.distributed import DistributedSampler
 from tqdm import tqdm
 
-import visualization as viz
-
 # Import components from separate files
-from gnn import create_pose_graph
-from model import ViolenceDetectionGNN, get_device
+from checkpointing import (
+    CHECKPOINT_INTERVAL,
+    EARLY_STOPPING_PATIENCE,
+    TRAINING_STATE_NAME,
+    EarlyStopping,
+    load_training_state,
+    save_training_state,
+)
+from distillation import (
+    DISTILLATION_ALPHA,
+    DISTILLATION_TEMPERATURE,
+    TeacherScoredDataset,
+    check_teacher_topology,
+    compute_teacher_scores,
+    count_parameters,
+    distillation_loss,
+    measure_throughput,
+    teacher_batch,
+)
+from distributed import (
+    DISTRIBUTED_BACKEND,
+    all_reduce_sum,
+    barrier,
+    broadcast_values,
+    cleanup_distributed,
+    get_local_world_size,
+    get_world_size,
+    init_distributed,
+    is_distributed,
+    is_main_process,
+)
+from embedding_store import EMBEDDING_STORE_DIR, EmbeddingHead, build_embedding_store
+from gnn import (
+    DEFAULT_KNN_K,
+    KEYPOINT_SUBSET_ALL,
+    KEYPOINT_SUBSETS,
+    TOPOLOGY_COMPLETE,
+    TOPOLOGY_MODES,
+    resolve_keypoint_subset,
+)
+from graph_cache import (
+    PackedGraphDataset,
+    build_graph_cache,
+    dataset_fingerprint,
+    pack_graph_arrays,
+)
+from inference import DEFAULT_BATCH_SIZE, load_model_and_threshold
+from loaders import LOADER_WORKERS, PREFETCH_BATCHES, DevicePrefetcher, make_loader
+from model import ViolenceDetectionGNN, build_checkpoint, get_device, is_quantized
+from pose_io import (
+    DEFAULT_CONFIDENCE_FILTER,
+    iter_graph_arrays,
+    list_json_files,
+    make_confidence_filter,
+)
 
 # Configuration constants
 # Data paths
@@ -65,10 +116,73 @@ SAMPLE_PERCENTAGE = 1  # Percentage of data to use (1-100)
 MODEL_HIDDEN_CHANNELS = 64
 MODEL_TRANSFORMER_HEADS = 4
 MODEL_TRANSFORMER_LAYERS = 2
+MODEL_GNN_HEADS = 4
+MODEL_JK_MODE = "cat"
+JK_MODES = ("cat", "max")  # JumpingKnowledge modes the dense engine supports
 TEST_SPLIT_RATIO = 0.2
 VALIDATION_SPLIT_RATIO = 0.25
 RANDOM_SEED = 42
 
+# Graph construction settings (saved with the model for inference)
+GRAPH_TOPOLOGY = TOPOLOGY_COMPLETE  # "complete", "skeleton" or "skeleton_knn"
+GRAPH_KNN_K = DEFAULT_KNN_K
+KEYPOINT_SUBSET = KEYPOINT_SUBSET_ALL  # Keypoints kept from wholebody poses
+GRAPH_CACHE_DIR = Path("graph_cache")  # Preprocessed graph store
+CHECKPOINT_DIR = Path("checkpoints")  # Resumable training state
+HEAD_ONLY_CHECKPOINT_SUBDIR = "head_only"  # Training state of head-only runs
+DISTILLED_CHECKPOINT_SUBDIR = "distilled"  # Training state of distilled students
+INGEST_WORKERS = os.cpu_count() or 1  # Processes parsing JSON files
+
+# Threshold evaluation
+BOOTSTRAP_SAMPLES = 1000  # Resamples for confidence intervals (0 disables)
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_CHUNK_ELEMENTS = 1 << 24  # Resample counts held in memory at a time
+
+
+def _sort_by_score(
+    y_true: np.ndarray, y_score: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sort labels by decreasing score and locate the distinct thresholds.
+
+    Args:
+        y_true: Ground truth binary labels
+        y_score: Predicted scores (probabilities)
+
+    Returns:
+        Tuple of (positive mask in score order, last sorted position of each
+        distinct score, distinct scores in decreasing order)
+    """
+    y_score = np.asarray(y_score)
+    order = np.argsort(y_score, kind="mergesort")[::-1]
+    sorted_scores = y_score[order]
+    cut_idxs = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(sorted_scores) - 1]
+    positives = np.asarray(y_true)[order] == 1
+    return positives, cut_idxs, sorted_scores[cut_idxs].astype(np.float64)
+
+
+def threshold_counts(
+    y_true: np.ndarray, y_score: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Count true and false positives at every distinct score threshold.
+
+    Scores are sorted once; the counts for predicting "violent" at
+    score >= threshold follow from cumulative sums, as in sklearn's roc_curve.
+
+    Args:
+        y_true: Ground truth binary labels
+        y_score: Predicted scores (probabilities)
+
+    Returns:
+        Tuple of (thresholds in decreasing order, true positives, false
+        positives)
+    """
+    positives, cut_idxs, thresholds = _sort_by_score(y_true, y_score)
+    tps = np.cumsum(positives)[cut_idxs]
+    fps = cut_idxs + 1 - tps
+    return thresholds, tps, fps
+
 
 def find_optimal_threshold(
     y_true: np.ndarray, y_score: np.ndarray
@@ -84,6 +198,10 @@ def find_optimal_threshold(
     The primary method used is Youden's J statistic, which is widely accepted
     in the academic literature for binary classification threshold optimization.
 
+    All candidates are the ROC curve thresholds of sklearn's roc_curve, and the
+    counts at each of them come from a single sort (see threshold_counts), so
+    the search is O(N log N) instead of one pass over the data per threshold.
+
     Args:
         y_true: Ground truth binary labels
         y_score: Predicted scores (probabilities)
@@ -91,7 +209,23 @@ def find_optimal_threshold(
     Returns:
         Tuple of (optimal threshold, dictionary of metrics at that threshold)
     """
-    fpr, tpr, thresholds = roc_curve(y_true, y_score)
+    thresholds, tps, fps = threshold_counts(y_true, y_score)
+
+    # Drop points collinear with their neighbours, as roc_curve does
+    if len(fps) > 2:
+        corners = np.flatnonzero(
+            np.r_[True, np.logical_or(np.diff(fps, 2), np.diff(tps, 2)), True]
+        )
+        thresholds, tps, fps = thresholds[corners], tps[corners], fps[corners]
+
+    # Start the curve at (0, 0) with a threshold no score reaches
+    thresholds = np.r_[np.inf, thresholds]
+    tps = np.r_[0, tps]
+    fps = np.r_[0, fps]
+    num_pos, num_neg = tps[-1], fps[-1]
+    fns = num_pos - tps
+    tpr = tps / num_pos
+    fpr = fps / num_neg
 
     # Calculate Youden's J statistic (J = Sensitivity + Specificity - 1)
     j_scores = tpr - fpr
@@ -103,25 +237,23 @@ def find_optimal_threshold(
     optimal_idx_d = np.argmin(distances)
     optimal_threshold_d = thresholds[optimal_idx_d]
 
-    # Calculate F1 score at different thresholds
-    precision, recall, pr_thresholds = precision_recall_curve(y_true, y_score)
-
-    # Calculate F1 for all possible thresholds
-    f1_scores = []
-    for t in thresholds:
-        y_pred = (y_score >= t).astype(int)
-        f1 = f1_score(y_true, y_pred)
-        f1_scores.append(f1)
-
+    # Calculate F1 at every threshold (0 where nothing is predicted or present)
+    f1_denominators = 2 * tps + fps + fns
+    f1_scores = np.divide(
+        2 * tps,
+        f1_denominators,
+        out=np.zeros(len(tps), dtype=np.float64),
+        where=f1_denominators > 0,
+    )
     optimal_idx_f1 = np.argmax(f1_scores)
     optimal_threshold_f1 = thresholds[optimal_idx_f1]
 
     # Choose Youden's J as the primary method (most common in academic literature)
     optimal_threshold = optimal_threshold_j
 
-    # Calculate confusion matrix at optimal threshold
-    y_pred = (y_score >= optimal_threshold).astype(int)
-    tn, fp, fn, tp = confusion_matrix(y_true, y_pred).ravel()
+    # Confusion matrix at optimal threshold
+    tp, fp = tps[optimal_idx_j], fps[optimal_idx_j]
+    fn, tn = num_pos - tp, num_neg - fp
 
     # Calculate various metrics at the optimal threshold
     sensitivity = tp / (tp + fn) if (tp + fn) > 0 else 0
@@ -143,9 +275,164 @@ def find_optimal_threshold(
     return optimal_threshold, metrics
 
 
+def bootstrap_confidence_intervals(
+    y_true: np.ndarray,
+    y_score: np.ndarray,
+    threshold: float,
+    num_samples: int = BOOTSTRAP_SAMPLES,
+    confidence: float = BOOTSTRAP_CONFIDENCE,
+    seed: int = RANDOM_SEED,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Bootstrap confidence intervals for the metrics at a threshold.
+
+    A resample drawn with replacement is equivalent to per-sample counts, so
+    every resample reuses a single sort of the scores: its true and false
+    positives are cumulative sums of the counts. Resamples are processed
+    in vectorized chunks of about BOOTSTRAP_CHUNK_ELEMENTS counts.
+
+    Args:
+        y_true: Ground truth binary labels
+        y_score: Predicted scores (probabilities)
+        threshold: Classification threshold to evaluate
+        num_samples: Number of bootstrap resamples
+        confidence: Confidence level of the percentile intervals
+        seed: Random seed for reproducibility
+
+    Returns:
+        Dictionary of (lower, upper) bounds for sensitivity, specificity,
+        precision, f1_score, youdens_j and threshold_j (the Youden-optimal
+        threshold of each resample)
+    """
+    positives, cut_idxs, thresholds = _sort_by_score(y_true, y_score)
+    num_graphs = len(positives)
+
+    # Position of the threshold among the cuts; 0 means nothing predicted
+    thresholds = np.r_[np.inf, thresholds]
+    position = np.searchsorted(-thresholds, -threshold, side="right") - 1
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // max(num_graphs, 1))
+    samples: Dict[str, List[np.ndarray]] = {}
+    for start in range(0, num_samples, chunk):
+        size = min(chunk, num_samples - start)
+
+        # Counts of every (sorted) graph in each resample [size, num_graphs]
+        draws = rng.integers(0, num_graphs, size=(size, num_graphs))
+        draws += np.arange(size)[:, None] * num_graphs
+        counts = np.bincount(draws.ravel(), minlength=size * num_graphs)
+        counts = counts.reshape(size, num_graphs)
+
+        tps = np.cumsum(counts * positives, axis=1)[:, cut_idxs]
+        fps = np.cumsum(counts * ~positives, axis=1)[:, cut_idxs]
+        tps = np.concatenate([np.zeros((size, 1), dtype=tps.dtype), tps], axis=1)
+        fps = np.concatenate([np.zeros((size, 1), dtype=fps.dtype), fps], axis=1)
+        num_pos, num_neg = tps[:, -1], fps[:, -1]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tp, fp = tps[:, position], fps[:, position]
+            sensitivity = tp / num_pos
+            specificity = (num_neg - fp) / num_neg
+            j_scores = tps / num_pos[:, None] - fps / num_neg[:, None]
+            chunk_metrics = {
+                "sensitivity": sensitivity,
+                "specificity": specificity,
+                "precision": np.where(tp + fp > 0, tp / (tp + fp), 0.0),
+                "f1_score": np.where(
+                    tp + fp + num_pos > 0, 2 * tp / (tp + fp + num_pos), 0.0
+                ),
+                "youdens_j": sensitivity + specificity - 1,
+                "threshold_j": thresholds[np.argmax(j_scores, axis=1)],
+            }
+        for name, values in chunk_metrics.items():
+            samples.setdefault(name, []).append(values)
+
+    alpha = (1 - confidence) / 2 * 100
+    intervals = {}
+    for name, values in samples.items():
+        low, high = np.nanpercentile(np.concatenate(values), [alpha, 100 - alpha])
+        intervals[name] = (float(low), float(high))
+    return intervals
+
+
+def load_labelled_graphs(
+    sources: Sequence[Tuple[Path, Path]],
+    sample_percentage: int = 100,
+    topology: str = TOPOLOGY_COMPLETE,
+    knn_k: int = DEFAULT_KNN_K,
+    num_workers: int = 0,
+    keypoint_subset: Optional[Sequence[int]] = None,
+    confidence: Optional[Dict[str, Any]] = None,
+) -> Tuple[PackedGraphDataset, List[float]]:
+    """
+    Load MMPose JSON files of one or more cameras and convert them to graph data.
+
+    Violent and non-violent files of every camera go through the same ingestion
+    path: JSON decoding and graph construction run on a pool of worker
+    processes, while graphs are packed here in a deterministic file order.
+    Each person instance in a frame becomes one labelled graph.
+
+    Args:
+        sources: (violent_path, non_violent_path) pairs, one per camera
+        sample_percentage: Percentage of files to process per directory (1-100)
+        topology: Graph edge topology (see gnn.TOPOLOGY_MODES)
+        knn_k: Number of nearest neighbours for the "skeleton_knn" topology
+        num_workers: Number of worker processes for parsing JSON files
+                     (0 parses in this process)
+        keypoint_subset: Keypoint indices to keep (see gnn.KEYPOINT_SUBSETS),
+                         or None to keep every keypoint
+        confidence: Instance confidence filter (see
+                    pose_io.make_confidence_filter), or None to keep every person
+
+    Returns:
+        Tuple of (packed dataset of labelled graphs, list of corresponding labels)
+    """
+    files = list_json_files(sources, sample_percentage)
+    num_violent_files = sum(1 for _, label, _ in files if label == 1.0)
+    print(
+        f"Processing {num_violent_files} violent and "
+        f"{len(files) - num_violent_files} non-violent JSON files"
+    )
+
+    file_arrays = iter_graph_arrays(
+        (json_file for json_file, _, _ in files),
+        topology,
+        knn_k,
+        num_workers,
+        keypoint_subset,
+        confidence,
+    )
+    all_graphs = pack_graph_arrays(
+        (
+            (arrays, label, camera_id)
+            for (_, label, camera_id), arrays in tqdm(
+                zip(files, file_arrays),
+                total=len(files),
+                desc="Processing samples",
+                disable=not is_main_process(),
+            )
+        ),
+        {
+            "mode": topology,
+            "knn_k": knn_k,
+            "keypoint_subset": (
+                None if keypoint_subset is None else list(keypoint_subset)
+            ),
+            "confidence": confidence,
+        },
+    )
+
+    return all_graphs, all_graphs.labels.tolist()
+
+
 def load_mmpose_data(
-    violent_path: Path, non_violent_path: Path, sample_percentage: int = 100
-) -> Tuple[List[Data], List[float]]:
+    violent_path: Path,
+    non_violent_path: Path,
+    sample_percentage: int = 100,
+    topology: str = TOPOLOGY_COMPLETE,
+    knn_k: int = DEFAULT_KNN_K,
+    num_workers: int = 0,
+) -> Tuple[PackedGraphDataset, List[float]]:
     """
     Load MMPose JSON files and convert them to graph data.
 
@@ -158,99 +445,295 @@ def load_mmpose_data(
         violent_path: Path to violent pose JSON files
         non_violent_path: Path to non-violent pose JSON files
         sample_percentage: Percentage of files to process (1-100)
+        topology: Graph edge topology (see gnn.TOPOLOGY_MODES)
+        knn_k: Number of nearest neighbours for the "skeleton_knn" topology
+        num_workers: Number of worker processes for parsing JSON files
+                     (0 parses in this process)
+
+    Returns:
+        Tuple of (packed dataset of labelled graphs, list of corresponding labels)
+    """
+    return load_labelled_graphs(
+        [(violent_path, non_violent_path)],
+        sample_percentage,
+        topology=topology,
+        knn_k=knn_k,
+        num_workers=num_workers,
+    )
+
+
+def split_graph_indices(
+    labels: Sequence[float],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split graph indices into training, validation and test sets.
+
+    The split is seeded, so tools working on a trained model (e.g. quantize.py)
+    can recover the graphs that were held out from training.
+
+    Args:
+        labels: Label of every graph, used to stratify the test split
 
     Returns:
-        Tuple of (list of graph Data objects, list of corresponding labels)
-    """
-    # Validate sample percentage
-    if not 1 <= sample_percentage <= 100:
-        raise ValueError("sample_percentage must be between 1 and 100")
-
-    all_graphs = []
-    all_labels = []
-
-    # Get all JSON files from the violent directory
-    violent_files = list(violent_path.glob("*.json"))
-    if not violent_files:
-        raise ValueError(f"No JSON files found in violent directory: {violent_path}")
-
-    print(f"Found {len(violent_files)} violent JSON files")
-
-    # Calculate number of files to process based on percentage
-    num_violent_files = max(1, int(len(violent_files) * sample_percentage / 100))
-
-    # Process violent samples
-    for json_file in tqdm(
-        violent_files[:num_violent_files], desc="Processing violent samples"
-    ):
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # Process each frame in the JSON file
-        for frame_data in data.get("instance_info", []):
-            # Get frame ID (not used but kept for consistency)
-            _ = frame_data.get("frame_id")
-            instances = frame_data.get("instances", [])
-
-            for instance in instances:
-                keypoints = instance.get("keypoints", [])
-                if keypoints:
-                    # Convert to numpy array
-                    keypoints_np = np.array(keypoints)
-
-                    # Create graph from keypoints
-                    graph = create_pose_graph(keypoints_np)
-                    if graph is not None:
-                        all_graphs.append(graph)
-                        all_labels.append(1.0)  # Violent label
-
-    # Process non-violent data
-    non_violent_files = list(non_violent_path.glob("*.json"))
-    if not non_violent_files:
+        Tuple of (train_indices, validation_indices, test_indices)
+    """
+    train_idx, test_idx = train_test_split(
+        np.arange(len(labels)),
+        test_size=TEST_SPLIT_RATIO,
+        random_state=RANDOM_SEED,
+        stratify=labels,
+    )
+    train_idx, val_idx = train_test_split(
+        train_idx, test_size=VALIDATION_SPLIT_RATIO, random_state=RANDOM_SEED
+    )
+    return train_idx, val_idx, test_idx
+
+
+def load_frozen_gnn(
+    model_path: Path,
+    transformer_heads: int,
+    transformer_layers: int,
+    topology: Dict[str, Any],
+    device: torch.device,
+) -> ViolenceDetectionGNN:
+    """
+    Build a model from the frozen GNN of a trained model and a new head.
+
+    Args:
+        model_path: Trained model file (see build_checkpoint)
+        transformer_heads: Attention heads of the new transformer
+        transformer_layers: Layers of the new transformer
+        topology: Topology options of the training graphs
+        device: Device of the model
+
+    Returns:
+        Model whose GNN weights are loaded and excluded from training, and
+        whose transformer and classifier are freshly initialized
+
+    Raises:
+        ValueError: If the model is quantized or was trained on other graphs
+    """
+    trained, _, _, trained_topology = load_model_and_threshold(model_path, device)
+    if is_quantized(trained):
+        raise ValueError(f"{model_path} is quantized; use the float model")
+    if trained_topology != topology:
         raise ValueError(
-            f"No JSON files found in non-violent directory: {non_violent_path}"
+            f"{model_path} was trained on {trained_topology} graphs, not {topology}"
         )
 
-    print(f"Found {len(non_violent_files)} non-violent JSON files")
+    model = ViolenceDetectionGNN(
+        in_channels=trained.config["in_channels"],
+        hidden_channels=trained.config["hidden_channels"],
+        transformer_heads=transformer_heads,
+        transformer_layers=transformer_layers,
+        gnn_heads=trained.config["gnn_heads"],
+        jk_mode=trained.config["jk_mode"],
+    ).to(device)
+    model.gnn.load_state_dict(trained.gnn.state_dict())
+    model.gnn.requires_grad_(False)
+    return model
+
+
+def load_teacher(
+    model_path: Path, topology: Dict[str, Any], device: torch.device
+) -> Tuple[ViolenceDetectionGNN, float, Dict[str, Any]]:
+    """
+    Load a trained model as the teacher of a student.
+
+    Args:
+        model_path: Trained model file (see build_checkpoint)
+        topology: Topology options of the student's graphs
+        device: Device of the teacher
+
+    Returns:
+        Tuple of (teacher in evaluation mode, its threshold, its topology)
+
+    Raises:
+        ValueError: If the model is quantized or cannot score the student's
+                    graphs
+    """
+    teacher, threshold, _, teacher_topology = load_model_and_threshold(
+        model_path, device
+    )
+    if is_quantized(teacher):
+        raise ValueError(f"{model_path} is quantized; use the float model")
+    check_teacher_topology(teacher_topology, topology)
+    return teacher.eval(), threshold, teacher_topology
+
+
+def distillation_report(
+    teacher: ViolenceDetectionGNN,
+    student: ViolenceDetectionGNN,
+    graphs: PackedGraphDataset,
+    test_idx: np.ndarray,
+    teacher_scores: np.ndarray,
+    teacher_threshold: float,
+    teacher_topology: Dict[str, Any],
+    student_predictions: PredictionCache,
+    student_metrics: Dict[str, float],
+    device: torch.device,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compare a student with its teacher on the test graphs.
+
+    Both models are timed on the same graphs, collated in inference batches
+    of their own topology.
+
+    Args:
+        teacher: Teacher model
+        student: Trained student model
+        graphs: Packed graphs of the student
+        test_idx: Indices of the test graphs
+        teacher_scores: Teacher score of every graph
+        teacher_threshold: Classification threshold of the teacher
+        teacher_topology: Topology options the teacher was trained with
+        student_predictions: Test predictions of the student
+        student_metrics: Threshold metrics of the student
+        device: Device of both models
+
+    Returns:
+        Parameters, test AUC, F1 and graphs per second of each model
+    """
+    test_labels = graphs.labels[test_idx]
+    test_teacher_scores = teacher_scores[test_idx]
+    teacher_predictions = (test_teacher_scores >= teacher_threshold).astype(int)
+
+    chunks = [
+        test_idx[i : i + DEFAULT_BATCH_SIZE]
+        for i in range(0, len(test_idx), DEFAULT_BATCH_SIZE)
+    ]
+    teacher_batches = [
+        teacher_batch(graphs, chunk, teacher_topology).to(device) for chunk in chunks
+    ]
+    student_batches = [graphs.__getitems__(chunk).to(device) for chunk in chunks]
+
+    return {
+        "teacher": {
+            "parameters": count_parameters(teacher),
+            "auc": float(roc_auc_score(test_labels, test_teacher_scores)),
+            "f1_score": float(f1_score(test_labels, teacher_predictions)),
+            "graphs_per_s": measure_throughput(teacher, teacher_batches),
+        },
+        "student": {
+            "parameters": count_parameters(student),
+            "auc": float(student_predictions.auc()),
+            "f1_score": float(student_metrics["f1_score"]),
+            "graphs_per_s": measure_throughput(student, student_batches),
+        },
+    }
+
+
+class PredictionCache:
+    """
+    Scores and labels of one pass over a dataset.
+
+    Evaluation writes every prediction once; threshold selection, metrics,
+    bootstrap intervals and plots all read from the cache, which can also be
+    saved to an .npz file and reloaded without running the model again.
+    """
+
+    def __init__(self, scores: np.ndarray, targets: np.ndarray, loss: float):
+        """
+        Wrap the results of an evaluation pass.
+
+        Args:
+            scores: Predicted violence scores [num_graphs]
+            targets: Ground truth binary labels [num_graphs]
+            loss: Mean binary cross-entropy over the dataset
+        """
+        self.scores = scores
+        self.targets = targets
+        self.loss = loss
 
-    # Calculate number of files to process based on percentage
-    num_nonviolent_files = max(1, int(len(non_violent_files) * sample_percentage / 100))
+    def __len__(self) -> int:
+        """Number of cached predictions."""
+        return len(self.scores)
 
-    # Process non-violent samples
-    for json_file in tqdm(
-        non_violent_files[:num_nonviolent_files], desc="Processing non-violent samples"
-    ):
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    def auc(self) -> float:
+        """ROC AUC of the cached predictions."""
+        return roc_auc_score(self.targets, self.scores)
 
-        # Process each frame in the JSON file
-        for frame_data in data.get("instance_info", []):
-            # Get frame ID (not used but kept for consistency)
-            _ = frame_data.get("frame_id")
-            instances = frame_data.get("instances", [])
+    def save(self, path: Path) -> None:
+        """
+        Write the cache to an .npz file.
 
-            for instance in instances:
-                keypoints = instance.get("keypoints", [])
-                if keypoints:
-                    # Convert to numpy array
-                    keypoints_np = np.array(keypoints)
+        Args:
+            path: Output file
+        """
+        np.savez(path, scores=self.scores, targets=self.targets, loss=self.loss)
 
-                    # Create graph from keypoints
-                    graph = create_pose_graph(keypoints_np)
-                    if graph is not None:
-                        all_graphs.append(graph)
-                        all_labels.append(0.0)  # Non-violent label
+    @classmethod
+    def load(cls, path: Path) -> PredictionCache:
+        """
+        Read a cache written by save.
 
-    return all_graphs, all_labels
+        Args:
+            path: .npz file
+
+        Returns:
+            PredictionCache with the stored predictions
+        """
+        with np.load(path) as data:
+            return cls(data["scores"], data["targets"], float(data["loss"]))
+
+
+def predict_dataset(
+    model: ViolenceDetectionGNN,
+    loader: DevicePrefetcher,
+    device: torch.device,
+    desc: str = "Evaluating",
+) -> PredictionCache:
+    """
+    Score every graph of a loader in a single pass.
+
+    Scores, labels and the loss sum stay on the device in preallocated tensors
+    and are copied to the CPU once at the end, instead of per batch.
+
+    Args:
+        model: The GNN model
+        loader: Device loader in a fixed order (no shuffling)
+        device: Device for evaluation
+        desc: Progress bar description
+
+    Returns:
+        PredictionCache of the dataset
+    """
+    num_graphs = len(loader.dataset)
+    scores = torch.empty(num_graphs, device=device)
+    targets = torch.empty(num_graphs, device=device)
+    loss_sum = torch.zeros((), device=device)
+
+    model.eval()
+    offset = 0
+    with torch.no_grad():
+        for batch in tqdm(loader, desc=desc, disable=not is_main_process()):
+            # Forward pass
+            out = model(batch.x, batch.edge_index, batch.batch).view(-1)
+            target = batch.y.view(-1)
+
+            loss_sum += F.binary_cross_entropy(out, target, reduction="sum")
+            scores[offset : offset + len(out)] = out
+            targets[offset : offset + len(out)] = target
+            offset += len(out)
+
+    return PredictionCache(
+        scores.cpu().numpy(), targets.cpu().numpy(), loss_sum.item() / num_graphs
+    )
 
 
 def train_model(
     model: ViolenceDetectionGNN,
-    train_loader: DataLoader,
-    val_loader: DataLoader,
+    train_loader: DevicePrefetcher,
+    val_loader: DevicePrefetcher,
     device: torch.device,
     optimizer: torch.optim.Optimizer,
     num_epochs: int = 50,
+    early_stopping: Optional[EarlyStopping] = None,
+    checkpoint_dir: Optional[Path] = None,
+    resume: bool = True,
+    run_config: Optional[Dict[str, Any]] = None,
+    epoch_callback: Optional[Callable[[int, Dict[str, List[float]]], bool]] = None,
+    loss_fn: Optional[Callable[[torch.Tensor, Any], torch.Tensor]] = None,
 ) -> Dict[str, List[float]]:
     """
     Train the GNN model and track metrics.
@@ -259,77 +742,132 @@ def train_model(
     For each epoch, the model is trained on the training set and evaluated
     on the validation set. Metrics including loss and AUC are tracked.
 
+    Training stops early once the validation AUC has not improved for the
+    patience of the early stopping tracker, and the model is left with the
+    weights of its best epoch. With a checkpoint directory, the training state
+    is saved every CHECKPOINT_INTERVAL epochs and an existing state of the
+    same run configuration is resumed; the state is removed once training
+    finishes, so the next run starts from scratch.
+
+    In a distributed run every rank trains on its shard of the training set
+    (through the loader's DistributedSampler) and DistributedDataParallel
+    averages the gradients. Validation and checkpoint writing happen on the
+    main process, which shares the validation metrics with the other ranks so
+    that all of them take the same early stopping decisions.
+
     Args:
         model: The GNN model
-        train_loader: Training data loader
-        val_loader: Validation data loader
+        train_loader: Training device loader
+        val_loader: Validation device loader
         device: Device to train on (CPU/GPU/MPS)
         optimizer: Optimizer for training
         num_epochs: Number of training epochs
+        early_stopping: Best-model tracker (default: EarlyStopping())
+        checkpoint_dir: Directory of the training-state file, None disables
+                        checkpointing
+        resume: Whether to continue from an existing training-state file
+        run_config: Settings the run depends on (topology, optimizer, data
+                    fingerprint); a training state written with other
+                    settings is not resumed
+        epoch_callback: Called after every epoch with the epoch index and the
+                        metrics so far; returning True stops training (used
+                        to prune sweep trials)
+        loss_fn: Training loss of the model's pre-sigmoid logits and the batch
+                 (e.g. distillation.distillation_loss; the model must accept
+                 return_logits), default binary cross-entropy against the
+                 labels; validation always uses the labels
 
     Returns:
         Dictionary of training and validation metrics
+
+    Raises:
+        ValueError: If the training state belongs to another model, data set
+                    or run configuration
     """
+    if early_stopping is None:
+        early_stopping = EarlyStopping()
+    if run_config is None:
+        run_config = {}
+
     # Training metrics
     metrics: Dict[str, List[float]] = {"train_loss": [], "val_loss": [], "val_auc": []}
+    start_epoch = 0
+
+    num_train_graphs = len(train_loader.dataset)
+    state_path = checkpoint_dir / TRAINING_STATE_NAME if checkpoint_dir else None
+    if state_path is not None and resume and state_path.exists():
+        start_epoch, metrics = load_training_state(
+            state_path,
+            model,
+            optimizer,
+            early_stopping,
+            num_train_graphs,
+            device,
+            run_config,
+        )
+        print(f"Resumed training from {state_path} after epoch {start_epoch}")
+
+    # The wrapper all-reduces gradients in the backward pass; it is only used
+    # for training, while evaluation and checkpoints use the plain model
+    train_module = DistributedDataParallel(model) if is_distributed() else model
 
     # Training loop
-    for epoch in range(num_epochs):
+    for epoch in range(start_epoch, num_epochs):
+        if early_stopping.should_stop:
+            break
+
         # Training phase
         model.train()
-        total_loss = 0
+        train_loader.set_epoch(epoch)
+        total_loss = torch.zeros((), device=device)
+        num_graphs = 0
 
         # Process batches
         for batch in tqdm(
-            train_loader, desc=f"Epoch {epoch + 1}/{num_epochs} - Training"
+            train_loader,
+            desc=f"Epoch {epoch + 1}/{num_epochs} - Training",
+            disable=not is_main_process(),
         ):
-            batch = batch.to(device)
             optimizer.zero_grad()
 
-            # Forward pass
-            out = model(batch.x, batch.edge_index, batch.batch)
-            target = batch.y.view(-1, 1).to(device)
-
-            # Calculate loss
-            loss = F.binary_cross_entropy(out, target)
+            # Forward pass and loss
+            if loss_fn is None:
+                out = train_module(batch.x, batch.edge_index, batch.batch)
+                loss = F.binary_cross_entropy(out, batch.y.view(-1, 1))
+            else:
+                logits = train_module(
+                    batch.x, batch.edge_index, batch.batch, return_logits=True
+                )
+                loss = loss_fn(logits, batch)
 
             # Backward pass
             loss.backward()
             optimizer.step()
 
-            total_loss += loss.item() * batch.num_graphs
+            # Accumulate on the device to avoid a sync per batch
+            total_loss += loss.detach() * batch.num_graphs
+            num_graphs += batch.num_graphs
 
-        # Calculate average training loss
-        avg_train_loss = total_loss / len(train_loader.dataset)
+        # Calculate average training loss over the graphs of all ranks
+        totals = all_reduce_sum(
+            torch.tensor([total_loss.item(), num_graphs], dtype=torch.float64)
+        )
+        avg_train_loss = (totals[0] / totals[1]).item()
         metrics["train_loss"].append(avg_train_loss)
 
-        # Validation phase
-        model.eval()
-        val_loss = 0
-        all_preds = []
-        all_targets = []
-
-        with torch.no_grad():
-            for batch in tqdm(
-                val_loader, desc=f"Epoch {epoch + 1}/{num_epochs} - Validation"
-            ):
-                batch = batch.to(device)
-
-                # Forward pass
-                out = model(batch.x, batch.edge_index, batch.batch)
-                target = batch.y.view(-1, 1).to(device)
-
-                # Calculate loss
-                loss = F.binary_cross_entropy(out, target)
-                val_loss += loss.item() * batch.num_graphs
-
-                # Store predictions and targets for metrics
-                all_preds.extend(out.cpu().numpy().flatten())
-                all_targets.extend(target.cpu().numpy().flatten())
+        # Validation phase (main process only)
+        val_values = [0.0, 0.0]
+        if is_main_process():
+            val_predictions = predict_dataset(
+                model,
+                val_loader,
+                device,
+                desc=f"Epoch {epoch + 1}/{num_epochs} - Validation",
+            )
+            val_values = [val_predictions.loss, val_predictions.auc()]
 
         # Calculate validation metrics
-        avg_val_loss = val_loss / len(val_loader.dataset)
-        val_auc = roc_auc_score(all_targets, all_preds)
+        avg_val_loss, val_auc = broadcast_values(val_values)
 
         metrics["val_loss"].append(avg_val_loss)
         metrics["val_auc"].append(val_auc)
@@ -340,73 +878,370 @@ def train_model(
         print(f"  Val Loss: {avg_val_loss:.4f}")
         print(f"  Val AUC: {val_auc:.4f}")
 
+        if early_stopping.step(val_auc, model, epoch):
+            print("  New best model")
+
+        done = epoch + 1 == num_epochs or early_stopping.should_stop
+        checkpoint_due = (epoch + 1) % CHECKPOINT_INTERVAL == 0 or done
+        if state_path is not None and checkpoint_due and is_main_process():
+            save_training_state(
+                state_path,
+                epoch + 1,
+                model,
+                optimizer,
+                early_stopping,
+                metrics,
+                num_train_graphs,
+                run_config,
+            )
+
+        if early_stopping.should_stop:
+            print(
+                f"Early stopping: no val AUC improvement for "
+                f"{early_stopping.patience} epochs"
+            )
+        elif epoch_callback is not None and epoch_callback(epoch, metrics):
+            print(f"Training stopped by callback after epoch {epoch + 1}")
+            break
+
+    # A finished run leaves nothing to resume
+    if state_path is not None and is_main_process():
+        state_path.unlink(missing_ok=True)
+
+    # Keep the weights of the best epoch rather than the last one
+    early_stopping.restore_best(model)
+    if early_stopping.best_epoch >= 0:
+        print(
+            f"Best model: epoch {early_stopping.best_epoch + 1} "
+            f"(val AUC {early_stopping.best_score:.4f})"
+        )
+
     return metrics
 
 
 def evaluate_model(
-    model: ViolenceDetectionGNN, test_loader: DataLoader, device: torch.device
-) -> Tuple[float, float, float, Dict[str, float]]:
+    model: ViolenceDetectionGNN, test_loader: DevicePrefetcher, device: torch.device
+) -> Tuple[float, float, float, Dict[str, float], PredictionCache]:
     """
     Evaluate the model on the test set.
 
     Performs a comprehensive evaluation of the trained model on the test set,
     calculating loss, AUC, and finding the optimal classification threshold.
+    The test set is scored once; the returned prediction cache holds the
+    scores for any further analysis.
 
     Args:
         model: The trained GNN model
-        test_loader: Test data loader
+        test_loader: Test device loader
         device: Device for evaluation
 
     Returns:
-        Tuple of (test_loss, test_auc, optimal_threshold, threshold_metrics)
+        Tuple of (test_loss, test_auc, optimal_threshold, threshold_metrics,
+        test_predictions)
     """
-    model.eval()
-    test_loss = 0
-    all_preds = []
-    all_targets = []
+    predictions = predict_dataset(model, test_loader, device, desc="Testing")
 
-    with torch.no_grad():
-        for batch in tqdm(test_loader, desc="Testing"):
-            batch = batch.to(device)
+    # Find optimal classification threshold
+    optimal_threshold, threshold_metrics = find_optimal_threshold(
+        predictions.targets, predictions.scores
+    )
 
-            # Forward pass
-            out = model(batch.x, batch.edge_index, batch.batch)
-            target = batch.y.view(-1, 1).to(device)
+    return (
+        predictions.loss,
+        predictions.auc(),
+        optimal_threshold,
+        threshold_metrics,
+        predictions,
+    )
 
-            # Calculate loss
-            loss = F.binary_cross_entropy(out, target)
-            test_loss += loss.item() * batch.num_graphs
 
-            # Store predictions and targets for metrics
-            all_preds.extend(out.cpu().numpy().flatten())
-            all_targets.extend(target.cpu().numpy().flatten())
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the training script.
 
-    avg_test_loss = test_loss / len(test_loader.dataset)
-    test_auc = roc_auc_score(all_targets, all_preds)
+    The module constants are the defaults of the tunable hyperparameters (see
+    sweep.py); the other arguments control how the pose data is loaded and
+    batched, how training is checkpointed and stopped, and what is saved
+    besides the model.
 
-    # Find optimal classification threshold
-    optimal_threshold, threshold_metrics = find_optimal_threshold(
-        np.array(all_targets), np.array(all_preds)
+    Returns:
+        Parsed command-line arguments
+    """
+    parser = argparse.ArgumentParser(description="Train the violence detection GNN")
+    parser.add_argument(
+        "--cache_dir",
+        type=Path,
+        default=GRAPH_CACHE_DIR,
+        help=f"Directory of the preprocessed graph cache (default: {GRAPH_CACHE_DIR})",
     )
-
-    return avg_test_loss, test_auc, optimal_threshold, threshold_metrics
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Rebuild all graphs in memory instead of using the graph cache",
+    )
+    parser.add_argument(
+        "--ingest_workers",
+        type=int,
+        default=INGEST_WORKERS,
+        help=(
+            "Worker processes for parsing JSON files, 0 parses in the main process "
+            f"(default: {INGEST_WORKERS})"
+        ),
+    )
+    parser.add_argument(
+        "--loader_workers",
+        type=int,
+        default=None,
+        help=(
+            "Worker processes collating batches per training process, 0 collates "
+            f"in the training process (default: {LOADER_WORKERS}, divided among "
+            "the local ranks of a distributed run)"
+        ),
+    )
+    parser.add_argument(
+        "--prefetch_batches",
+        type=int,
+        default=PREFETCH_BATCHES,
+        help=(
+            "Batches collated ahead on a background thread, 0 disables prefetching "
+            f"(default: {PREFETCH_BATCHES})"
+        ),
+    )
+    parser.add_argument(
+        "--no_pin_memory",
+        action="store_true",
+        help="Do not pin host batches before copying them to a CUDA device",
+    )
+    parser.add_argument(
+        "--hidden_channels",
+        type=int,
+        default=MODEL_HIDDEN_CHANNELS,
+        help=f"Hidden size of the model (default: {MODEL_HIDDEN_CHANNELS})",
+    )
+    parser.add_argument(
+        "--transformer_heads",
+        type=int,
+        default=MODEL_TRANSFORMER_HEADS,
+        help=f"Attention heads (default: {MODEL_TRANSFORMER_HEADS})",
+    )
+    parser.add_argument(
+        "--transformer_layers",
+        type=int,
+        default=MODEL_TRANSFORMER_LAYERS,
+        help=f"Transformer layers (default: {MODEL_TRANSFORMER_LAYERS})",
+    )
+    parser.add_argument(
+        "--gnn_heads",
+        type=int,
+        default=MODEL_GNN_HEADS,
+        help=f"Attention heads of the GAT layer (default: {MODEL_GNN_HEADS})",
+    )
+    parser.add_argument(
+        "--jk_mode",
+        type=str,
+        choices=JK_MODES,
+        default=MODEL_JK_MODE,
+        help=(
+            "JumpingKnowledge aggregation of the GNN layers; max keeps the "
+            f"projection at the hidden size (default: {MODEL_JK_MODE})"
+        ),
+    )
+    parser.add_argument(
+        "--topology",
+        type=str,
+        choices=TOPOLOGY_MODES,
+        default=GRAPH_TOPOLOGY,
+        help=f"Edge topology of the pose graphs (default: {GRAPH_TOPOLOGY})",
+    )
+    parser.add_argument(
+        "--knn_k",
+        type=int,
+        default=GRAPH_KNN_K,
+        help=f"Neighbours of the skeleton_knn topology (default: {GRAPH_KNN_K})",
+    )
+    parser.add_argument(
+        "--keypoint_subset",
+        type=str,
+        default=KEYPOINT_SUBSET,
+        help=(
+            "Keypoints kept before the graphs are built: one of "
+            f"{', '.join(KEYPOINT_SUBSETS)} or indices and ranges like "
+            f"'0-16,91-132' (default: {KEYPOINT_SUBSET})"
+        ),
+    )
+    parser.add_argument(
+        "--min_instance_score",
+        type=float,
+        default=DEFAULT_CONFIDENCE_FILTER["min_instance_score"],
+        help="Drop persons whose mean keypoint score is lower (default: 0, off)",
+    )
+    parser.add_argument(
+        "--min_bbox_score",
+        type=float,
+        default=DEFAULT_CONFIDENCE_FILTER["min_bbox_score"],
+        help="Drop persons whose bounding box score is lower (default: 0, off)",
+    )
+    parser.add_argument(
+        "--max_persons",
+        type=int,
+        default=DEFAULT_CONFIDENCE_FILTER["max_persons"],
+        help=(
+            "Keep the persons with the highest mean keypoint score per frame "
+            "(default: 0, all)"
+        ),
+    )
+    parser.add_argument(
+        "--min_keypoint_score",
+        type=float,
+        default=DEFAULT_CONFIDENCE_FILTER["min_keypoint_score"],
+        help="Mark keypoints scored lower as invalid (default: 0, off)",
+    )
+    parser.add_argument(
+        "--learning_rate",
+        type=float,
+        default=LEARNING_RATE,
+        help=f"Adam learning rate (default: {LEARNING_RATE})",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Graphs per batch and process (default: {BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--checkpoint_dir",
+        type=Path,
+        default=CHECKPOINT_DIR,
+        help=f"Directory of the resumable training state (default: {CHECKPOINT_DIR})",
+    )
+    parser.add_argument(
+        "--no_resume",
+        action="store_true",
+        help="Start training from scratch even if a training state exists",
+    )
+    parser.add_argument(
+        "--patience",
+        type=int,
+        default=EARLY_STOPPING_PATIENCE,
+        help=(
+            "Epochs without val AUC improvement before stopping, 0 disables "
+            f"early stopping (default: {EARLY_STOPPING_PATIENCE})"
+        ),
+    )
+    parser.add_argument(
+        "--head_only",
+        type=Path,
+        default=None,
+        help=(
+            "Trained model file whose GNN is frozen; only a new transformer and "
+            "classifier head is trained, on GNN embeddings computed once "
+            "(--hidden_channels comes from the model)"
+        ),
+    )
+    parser.add_argument(
+        "--embedding_dir",
+        type=Path,
+        default=EMBEDDING_STORE_DIR,
+        help=(
+            "Directory of the GNN embedding stores for --head_only "
+            f"(default: {EMBEDDING_STORE_DIR})"
+        ),
+    )
+    parser.add_argument(
+        "--teacher",
+        type=Path,
+        default=None,
+        help=(
+            "Trained model file distilled into the model being trained (the "
+            "student); the teacher's graphs must be complete or match --topology"
+        ),
+    )
+    parser.add_argument(
+        "--distill_temperature",
+        type=float,
+        default=DISTILLATION_TEMPERATURE,
+        help=(
+            "Softening temperature of the teacher scores "
+            f"(default: {DISTILLATION_TEMPERATURE})"
+        ),
+    )
+    parser.add_argument(
+        "--distill_alpha",
+        type=float,
+        default=DISTILLATION_ALPHA,
+        help=(
+            "Weight of the label loss against the teacher loss "
+            f"(default: {DISTILLATION_ALPHA})"
+        ),
+    )
+    parser.add_argument(
+        "--predictions_file",
+        type=Path,
+        default=None,
+        help="Save the test set predictions to this .npz file",
+    )
+    parser.add_argument(
+        "--preprocess_only",
+        action="store_true",
+        help="Only update the graph cache, then exit without training",
+    )
+    return parser.parse_args()
 
 
-def main() -> None:
+def run_training(args: argparse.Namespace) -> None:
     """
-    Main function to train and evaluate the violence detection model.
+    Train and evaluate the violence detection model.
 
     This function orchestrates the entire training pipeline:
     1. Sets up the device and data paths
-    2. Loads and preprocesses data
+    2. Loads and preprocesses data (through the graph cache unless disabled)
     3. Splits data into training, validation, and test sets
-    4. Trains the model
+    4. Trains the model (resumable, with early stopping on the validation AUC),
+       or only its head on stored embeddings of a trained GNN, or distills a
+       trained teacher into it
     5. Evaluates the model and finds optimal classification threshold
-    6. Saves the model and generates visualizations
+    6. Saves the model (with a comparison to the teacher after distillation)
+       and generates visualizations
+
+    In a distributed run, all ranks load the data and train; steps 5 and 6
+    happen on the main process only, so the output artifacts are the same as
+    for a single process.
+
+    Args:
+        args: Parsed command-line arguments
     """
-    device = get_device()
+    if is_distributed():
+        # gloo all-reduces CPU tensors; one process per core (or group of cores)
+        device = torch.device("cpu")
+        print(
+            f"Distributed training: {get_world_size()} processes "
+            f"({DISTRIBUTED_BACKEND} backend)"
+        )
+    else:
+        device = get_device()
     print(f"Using device: {device}")
 
+    if args.head_only is not None and args.teacher is not None:
+        print("Error: --head_only and --teacher cannot be combined.")
+        return
+    try:
+        keypoint_subset = resolve_keypoint_subset(args.keypoint_subset)
+        confidence = make_confidence_filter(
+            args.min_instance_score,
+            args.min_bbox_score,
+            args.max_persons,
+            args.min_keypoint_score,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    topology = {
+        "mode": args.topology,
+        "knn_k": args.knn_k,
+        "keypoint_subset": keypoint_subset,
+        "confidence": confidence,
+    }
+
     # Check if directories exist
     if not VIOLENT_PATH_CAM1.exists():
         print(f"Error: Violent data path (cam1) does not exist: {VIOLENT_PATH_CAM1}")
@@ -419,39 +1254,60 @@ def main() -> None:
         )
         return
 
-    all_graphs = []
-    all_labels = []
-
-    # Load data from cam1
-    print("Loading and preprocessing data from cam1...")
-    try:
-        graphs_cam1, labels_cam1 = load_mmpose_data(
-            VIOLENT_PATH_CAM1, NON_VIOLENT_PATH_CAM1, SAMPLE_PERCENTAGE
-        )
-        all_graphs.extend(graphs_cam1)
-        all_labels.extend(labels_cam1)
-        print(f"Loaded {len(graphs_cam1)} graphs from cam1")
-    except ValueError as e:
-        print(f"Error loading data from cam1: {e}")
-
-    # Check if cam2 data exists and load it
+    # Check if cam2 data exists
     cam2_exists = VIOLENT_PATH_CAM2.exists() and NON_VIOLENT_PATH_CAM2.exists()
+    if not cam2_exists:
+        print("Cam2 data not found. Using only cam1 data for training.")
 
+    sources = [(VIOLENT_PATH_CAM1, NON_VIOLENT_PATH_CAM1)]
     if cam2_exists:
-        print("Loading and preprocessing data from cam2...")
+        sources.append((VIOLENT_PATH_CAM2, NON_VIOLENT_PATH_CAM2))
+
+    if args.no_cache:
+        print("Loading and preprocessing data...")
         try:
-            graphs_cam2, labels_cam2 = load_mmpose_data(
-                VIOLENT_PATH_CAM2, NON_VIOLENT_PATH_CAM2, SAMPLE_PERCENTAGE
+            all_graphs, all_labels = load_labelled_graphs(
+                sources,
+                SAMPLE_PERCENTAGE,
+                topology=args.topology,
+                knn_k=args.knn_k,
+                num_workers=args.ingest_workers,
+                keypoint_subset=keypoint_subset,
+                confidence=confidence,
             )
-            all_graphs.extend(graphs_cam2)
-            all_labels.extend(labels_cam2)
-            print(f"Loaded {len(graphs_cam2)} graphs from cam2")
         except ValueError as e:
-            print(f"Error loading data from cam2: {e}")
+            print(f"Error loading data: {e}")
+            return
     else:
-        print("Cam2 data not found. Using only cam1 data for training.")
+        print(f"Loading preprocessed graphs from {args.cache_dir}...")
+        # The main process updates the cache first; the other ranks then find
+        # it up to date and only open it
+        try:
+            if not is_main_process():
+                barrier()
+            all_graphs = build_graph_cache(
+                sources,
+                args.cache_dir,
+                SAMPLE_PERCENTAGE,
+                topology=args.topology,
+                knn_k=args.knn_k,
+                num_workers=args.ingest_workers,
+                keypoint_subset=keypoint_subset,
+                confidence=confidence,
+            )
+        except ValueError as e:
+            print(f"Error building graph cache: {e}")
+            return
+        finally:
+            if is_main_process():
+                barrier()
+        all_labels = all_graphs.labels.tolist()
+
+    if args.preprocess_only:
+        print(f"Graph cache up to date: {len(all_labels)} graphs")
+        return
 
-    if not all_graphs:
+    if not len(all_graphs):
         print("No valid graphs were created. Check your data.")
         return
 
@@ -459,54 +1315,168 @@ def main() -> None:
     print(f"Positive (violent) samples: {sum(all_labels)}")
     print(f"Negative (non-violent) samples: {len(all_labels) - sum(all_labels)}")
 
-    # Assign labels to graphs
-    for i, graph in enumerate(all_graphs):
-        graph.y = torch.tensor([all_labels[i]], dtype=torch.float)
-
-    # Split data into train, validation, and test sets
-    train_graphs, test_graphs = train_test_split(
-        all_graphs,
-        test_size=TEST_SPLIT_RATIO,
-        random_state=RANDOM_SEED,
-        stratify=all_labels,
-    )
-    train_graphs, val_graphs = train_test_split(
-        train_graphs, test_size=VALIDATION_SPLIT_RATIO, random_state=RANDOM_SEED
-    )
+    # Split graph indices into train, validation, and test sets
+    train_idx, val_idx, test_idx = split_graph_indices(all_labels)
+    train_graphs = Subset(all_graphs, train_idx)
+    val_graphs = Subset(all_graphs, val_idx)
+    test_graphs = Subset(all_graphs, test_idx)
 
     print(f"Training graphs: {len(train_graphs)}")
     print(f"Validation graphs: {len(val_graphs)}")
     print(f"Test graphs: {len(test_graphs)}")
 
-    # Create data loaders
-    train_loader = DataLoader(train_graphs, batch_size=BATCH_SIZE, shuffle=True)
-    val_loader = DataLoader(val_graphs, batch_size=BATCH_SIZE)
-    test_loader = DataLoader(test_graphs, batch_size=BATCH_SIZE)
-
     # Get input channel dimension from data
     in_channels = train_graphs[0].x.shape[1]
 
-    # Initialize model
-    model = ViolenceDetectionGNN(
-        in_channels=in_channels,
-        hidden_channels=MODEL_HIDDEN_CHANNELS,
-        transformer_heads=MODEL_TRANSFORMER_HEADS,
-        transformer_layers=MODEL_TRANSFORMER_LAYERS,
-    ).to(device)
+    # Initialize model, or take the frozen GNN of a trained one
+    if args.head_only is not None:
+        try:
+            model = load_frozen_gnn(
+                args.head_only,
+                args.transformer_heads,
+                args.transformer_layers,
+                topology,
+                device,
+            )
+        except ValueError as e:
+            print(f"Error loading the GNN for head-only training: {e}")
+            return
+        print(f"Training a new head on the frozen GNN of {args.head_only}")
+    else:
+        model = ViolenceDetectionGNN(
+            in_channels=in_channels,
+            hidden_channels=args.hidden_channels,
+            transformer_heads=args.transformer_heads,
+            transformer_layers=args.transformer_layers,
+            gnn_heads=args.gnn_heads,
+            jk_mode=args.jk_mode,
+        ).to(device)
+
+    # Create data loaders that collate ahead and hand out device batches
+    num_workers = args.loader_workers
+    if num_workers is None:
+        num_workers = LOADER_WORKERS // get_local_world_size()
+    loader_options = {
+        "num_workers": num_workers,
+        "pin_memory": not args.no_pin_memory,
+        "prefetch_batches": args.prefetch_batches,
+    }
+    trained_module = model
+    checkpoint_dir = args.checkpoint_dir
+    loss_fn = None
+    if args.head_only is not None:
+        # The main process embeds the graphs first; the other ranks then find
+        # the store and only open it
+        try:
+            if not is_main_process():
+                barrier()
+            embeddings = build_embedding_store(
+                model,
+                make_loader(all_graphs, args.batch_size, device, **loader_options),
+                args.embedding_dir,
+            )
+        finally:
+            if is_main_process():
+                barrier()
+        train_data, val_data, test_data = (
+            Subset(embeddings, idx) for idx in (train_idx, val_idx, test_idx)
+        )
+        # Slicing the memory map is cheaper than handing batches between
+        # processes or threads
+        loader_options.update(num_workers=0, prefetch_batches=0)
+        trained_module = EmbeddingHead(model)
+        checkpoint_dir = args.checkpoint_dir / HEAD_ONLY_CHECKPOINT_SUBDIR
+    elif args.teacher is not None:
+        try:
+            teacher, teacher_threshold, teacher_topology = load_teacher(
+                args.teacher, topology, device
+            )
+        except ValueError as e:
+            print(f"Error loading the teacher: {e}")
+            return
+        print(
+            f"Distilling {args.teacher} ({count_parameters(teacher)} parameters) "
+            f"into a student with {count_parameters(model)} parameters"
+        )
+        # The teacher is frozen, so every rank scores the graphs once up front
+        teacher_scores = compute_teacher_scores(
+            teacher, all_graphs, teacher_topology, device
+        )
+        scored_graphs = TeacherScoredDataset(all_graphs, teacher_scores)
+        train_data, val_data, test_data = (
+            Subset(scored_graphs, idx) for idx in (train_idx, val_idx, test_idx)
+        )
+        loss_fn = partial(
+            distillation_loss,
+            temperature=args.distill_temperature,
+            alpha=args.distill_alpha,
+        )
+        checkpoint_dir = args.checkpoint_dir / DISTILLED_CHECKPOINT_SUBDIR
+    else:
+        train_data, val_data, test_data = train_graphs, val_graphs, test_graphs
 
-    # Initialize optimizer
-    optimizer = torch.optim.Adam(model.parameters(), lr=LEARNING_RATE)
+    # Each rank draws its own shard of the training set, batch_size per rank
+    train_sampler = (
+        DistributedSampler(train_data, shuffle=True, seed=RANDOM_SEED)
+        if is_distributed()
+        else None
+    )
+    train_loader = make_loader(
+        train_data,
+        args.batch_size,
+        device,
+        shuffle=True,
+        sampler=train_sampler,
+        **loader_options,
+    )
+    val_loader = make_loader(val_data, args.batch_size, device, **loader_options)
+    test_loader = make_loader(test_data, args.batch_size, device, **loader_options)
 
-    # Train model
-    print("Training model...")
-    metrics = train_model(
-        model, train_loader, val_loader, device, optimizer, num_epochs=NUM_EPOCHS
+    # Initialize optimizer over the trainable (not frozen) parameters
+    optimizer = torch.optim.Adam(
+        [p for p in model.parameters() if p.requires_grad], lr=args.learning_rate
     )
 
+    # Train model, resuming an interrupted run of the same configuration
+    print("Training model...")
+    run_config = {
+        **topology,
+        "learning_rate": args.learning_rate,
+        "batch_size": args.batch_size,
+        "dataset": dataset_fingerprint(sources, SAMPLE_PERCENTAGE, topology),
+    }
+    early_stopping = EarlyStopping(patience=args.patience)
+    try:
+        metrics = train_model(
+            trained_module,
+            train_loader,
+            val_loader,
+            device,
+            optimizer,
+            num_epochs=NUM_EPOCHS,
+            early_stopping=early_stopping,
+            checkpoint_dir=checkpoint_dir,
+            resume=not args.no_resume,
+            run_config=run_config,
+            loss_fn=loss_fn,
+        )
+    except ValueError as e:
+        print(f"Error resuming training: {e}")
+        print("Use --no_resume to start from scratch.")
+        return
+
+    # Evaluation, saving and plotting are done once, by the main process
+    if not is_main_process():
+        return
+
     # Evaluate model
-    avg_test_loss, test_auc, optimal_threshold, threshold_metrics = evaluate_model(
-        model, test_loader, device
-    )
+    (
+        avg_test_loss,
+        test_auc,
+        optimal_threshold,
+        threshold_metrics,
+        test_predictions,
+    ) = evaluate_model(trained_module, test_loader, device)
     print(f"Test Loss: {avg_test_loss:.4f}")
     print(f"Test AUC: {test_auc:.4f}")
     print(f"Optimal classification threshold: {optimal_threshold:.4f}")
@@ -514,18 +1484,63 @@ def main() -> None:
     for metric, value in threshold_metrics.items():
         print(f"  {metric}: {value:.4f}")
 
-    # Save model
+    # Save model (with its GNN, also after head-only training)
     model_path = Path("violence_detection_model.pt")
+    training = {
+        "epochs": len(metrics["val_auc"]),
+        "best_epoch": early_stopping.best_epoch + 1,
+        "best_val_auc": early_stopping.best_score,
+    }
+    if args.head_only is not None:
+        training["frozen_gnn_from"] = str(args.head_only)
+    if args.teacher is not None:
+        report = distillation_report(
+            teacher,
+            model,
+            all_graphs,
+            test_idx,
+            teacher_scores,
+            teacher_threshold,
+            teacher_topology,
+            test_predictions,
+            threshold_metrics,
+            device,
+        )
+        print(f"\n{'Test graphs':<12}{'Params':>10}{'AUC':>8}{'F1':>8}{'Graphs/s':>10}")
+        for name, row in report.items():
+            print(
+                f"{name:<12}{row['parameters']:>10}{row['auc']:>8.4f}"
+                f"{row['f1_score']:>8.4f}{row['graphs_per_s']:>10.0f}"
+            )
+        teacher_row, student_row = report["teacher"], report["student"]
+        print(
+            f"Student: {teacher_row['parameters'] / student_row['parameters']:.1f}x "
+            "fewer parameters, "
+            f"{student_row['graphs_per_s'] / teacher_row['graphs_per_s']:.2f}x "
+            f"throughput, AUC {student_row['auc'] - teacher_row['auc']:+.4f}"
+        )
+        training["distillation"] = {
+            "teacher": str(args.teacher),
+            "teacher_topology": teacher_topology,
+            "temperature": args.distill_temperature,
+            "alpha": args.distill_alpha,
+            "report": report,
+        }
     torch.save(
-        {
-            "model_state_dict": model.state_dict(),
-            "threshold": optimal_threshold,
-            "metrics": threshold_metrics,
-        },
+        build_checkpoint(
+            model,
+            optimal_threshold,
+            threshold_metrics,
+            topology,
+            training=training,
+        ),
         model_path,
     )
     print(f"Model saved to {model_path}")
 
+    # Plotting pulls in matplotlib and seaborn, so it is only imported here
+    import visualization as viz
+
     # Create output directory for plots
     plots_dir = Path("plots")
     plots_dir.mkdir(exist_ok=True)
@@ -538,19 +1553,23 @@ def main() -> None:
         "threshold": optimal_threshold,
     }
 
-    # Extract all predictions and targets from test set for visualizations
-    all_preds = []
-    all_targets = []
-    model.eval()
-    with torch.no_grad():
-        for batch in test_loader:
-            batch = batch.to(device)
-            out = model(batch.x, batch.edge_index, batch.batch)
-            all_preds.extend(out.cpu().numpy().flatten())
-            all_targets.extend(batch.y.cpu().numpy().flatten())
+    # Reuse the test predictions of the evaluation pass
+    if args.predictions_file is not None:
+        test_predictions.save(args.predictions_file)
+        print(f"Test predictions saved to {args.predictions_file}")
+    all_preds = test_predictions.scores
+    all_targets = test_predictions.targets
 
-    all_preds = np.array(all_preds)
-    all_targets = np.array(all_targets)
+    if BOOTSTRAP_SAMPLES:
+        intervals = bootstrap_confidence_intervals(
+            all_targets, all_preds, optimal_threshold
+        )
+        print(
+            f"Bootstrap {BOOTSTRAP_CONFIDENCE:.0%} confidence intervals "
+            f"({BOOTSTRAP_SAMPLES} resamples):"
+        )
+        for metric, (low, high) in intervals.items():
+            print(f"  {metric}: [{low:.4f}, {high:.4f}]")
 
     # Generate visualizations
     viz.plot_training_metrics(
@@ -591,5 +1610,20 @@ def main() -> None:
     print(f"All visualizations saved to {plots_dir}")
 
 
+def main() -> None:
+    """
+    Main function to train and evaluate the violence detection model.
+
+    Runs in a single process, or data-parallel when launched by torchrun, e.g.
+    `torchrun --nproc_per_node 4 src/train.py`.
+    """
+    args = parse_arguments()
+    init_distributed()
+    try:
+        run_training(args)
+    finally:
+        cleanup_distributed()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,116 @@
+"""Parity tests of the dense execution engine against the sparse PyG model."""
+
+from typing import List, Optional
+
+import numpy as np
+import pytest
+import torch
+from torch_geometric.data import Batch
+
+from dense import (
+    DenseViolenceDetectionGNN,
+    dense_adjacency,
+    dense_inputs_from_keypoints,
+)
+from gnn import (
+    TOPOLOGY_COMPLETE,
+    TOPOLOGY_MODES,
+    TOPOLOGY_SKELETON,
+    create_pose_graph,
+)
+from model import ViolenceDetectionGNN
+
+NUM_KEYPOINTS = 17
+ATOL = 1e-5
+# COCO skeleton (0-based)
+SKELETON_LINKS = [
+    [15, 13], [13, 11], [16, 14], [14, 12], [11, 12], [5, 11], [6, 12],
+    [5, 6], [5, 7], [6, 8], [7, 9], [8, 10], [1, 2], [0, 1], [0, 2],
+    [1, 3], [2, 4], [3, 5], [4, 6],
+]  # fmt: skip
+
+
+def _model(jk_mode: str) -> ViolenceDetectionGNN:
+    """A small randomly initialized model in evaluation mode."""
+    torch.manual_seed(0)
+    return ViolenceDetectionGNN(
+        in_channels=2,
+        hidden_channels=16,
+        transformer_heads=2,
+        transformer_layers=1,
+        gnn_heads=2,
+        jk_mode=jk_mode,
+    ).eval()
+
+
+def _keypoints(num_persons: int = 32) -> np.ndarray:
+    """Random persons with zeroed and NaN keypoints, down to 3 valid ones."""
+    rng = np.random.default_rng(0)
+    keypoints = rng.random((num_persons, NUM_KEYPOINTS, 2)) * 100 + 1
+    keypoints[rng.random((num_persons, NUM_KEYPOINTS)) < 0.3] = 0.0
+    keypoints[rng.random((num_persons, NUM_KEYPOINTS)) < 0.05] = np.nan
+    keypoints[0, 3:] = 0.0  # fewest valid keypoints of a graph
+    keypoints[1, :2] = 0.0  # too few valid keypoints, dropped
+    keypoints[1, 2:] = np.nan
+    return keypoints
+
+
+def _graph_persons(
+    keypoints: np.ndarray, topology: str, links: Optional[List[List[int]]]
+) -> List[int]:
+    """Indices of the persons that have a sparse graph."""
+    return [
+        i
+        for i, person in enumerate(keypoints)
+        if create_pose_graph(person, topology=topology, skeleton_links=links)
+        is not None
+    ]
+
+
+@pytest.mark.parametrize("jk_mode", ["cat", "max"])
+@pytest.mark.parametrize("topology", TOPOLOGY_MODES)
+def test_dense_forward_matches_sparse_model(topology: str, jk_mode: str) -> None:
+    model = _model(jk_mode)
+    links = None if topology == TOPOLOGY_COMPLETE else SKELETON_LINKS
+    keypoints = _keypoints()
+    graphs = [
+        create_pose_graph(person, topology=topology, skeleton_links=links)
+        for person in keypoints
+    ]
+    batch = Batch.from_data_list([graph for graph in graphs if graph is not None])
+
+    with torch.no_grad():
+        expected = model(batch.x, batch.edge_index, batch.batch)
+        scores = DenseViolenceDetectionGNN(model, topology)(
+            batch.x, batch.edge_index, batch.batch
+        )
+
+    assert len(scores) == batch.num_graphs
+    assert torch.allclose(scores, expected, atol=ATOL)
+
+
+@pytest.mark.parametrize("jk_mode", ["cat", "max"])
+@pytest.mark.parametrize("topology", [TOPOLOGY_COMPLETE, TOPOLOGY_SKELETON])
+def test_dense_keypoint_path_matches_sparse_model(topology: str, jk_mode: str) -> None:
+    model = _model(jk_mode)
+    links = None if topology == TOPOLOGY_COMPLETE else SKELETON_LINKS
+    keypoints = _keypoints()
+    persons = _graph_persons(keypoints, topology, links)
+    batch = Batch.from_data_list(
+        [
+            create_pose_graph(keypoints[i], topology=topology, skeleton_links=links)
+            for i in persons
+        ]
+    )
+
+    # Persons whose valid keypoints share no skeleton link have no sparse graph
+    x, valid, keep = dense_inputs_from_keypoints(keypoints[persons])
+    adjacency = dense_adjacency(NUM_KEYPOINTS, topology, links)
+    with torch.no_grad():
+        expected = model(batch.x, batch.edge_index, batch.batch)
+        scores = DenseViolenceDetectionGNN(model, topology).forward_dense(
+            x, valid, adjacency
+        )
+
+    np.testing.assert_array_equal(keep, np.arange(len(persons)))
+    assert torch.allclose(scores, expected, atol=ATOL)
@@ -0,0 +1,150 @@
+"""Parity tests of the exported models against the eager PyTorch model."""
+
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pytest
+import torch
+
+from dense import DenseViolenceDetectionGNN, dense_adjacency
+from export import (
+    EXPORT_FORMAT_ONNX,
+    EXPORT_FORMAT_TORCHSCRIPT,
+    PARITY_TOLERANCE,
+    ExportableViolenceModel,
+    check_parity,
+    export_metadata,
+    export_onnx,
+    export_torchscript,
+    load_exported,
+    parity_keypoints,
+)
+from gnn import TOPOLOGY_COMPLETE, TOPOLOGY_SKELETON, TOPOLOGY_SKELETON_KNN
+from inference import DEFAULT_TOPOLOGY
+from model import ViolenceDetectionGNN
+
+NUM_KEYPOINTS = 17
+# COCO skeleton (0-based)
+SKELETON_LINKS = [
+    [15, 13], [13, 11], [16, 14], [14, 12], [11, 12], [5, 11], [6, 12],
+    [5, 6], [5, 7], [6, 8], [7, 9], [8, 10], [1, 2], [0, 1], [0, 2],
+    [1, 3], [2, 4], [3, 5], [4, 6],
+]  # fmt: skip
+
+
+def _model() -> ViolenceDetectionGNN:
+    """A small randomly initialized model in evaluation mode."""
+    torch.manual_seed(0)
+    return ViolenceDetectionGNN(
+        in_channels=2,
+        hidden_channels=16,
+        transformer_heads=2,
+        transformer_layers=1,
+        gnn_heads=2,
+    ).eval()
+
+
+def _export(
+    model: ViolenceDetectionGNN,
+    mode: str,
+    export_format: str,
+    output_path: Path,
+    skeleton_links: Optional[List[List[int]]],
+) -> None:
+    """Export a model the way export.py's main does."""
+    topology = dict(DEFAULT_TOPOLOGY, mode=mode)
+    if mode == TOPOLOGY_COMPLETE:
+        adjacency, num_keypoints = None, None
+    else:
+        adjacency = dense_adjacency(NUM_KEYPOINTS, mode, skeleton_links)
+        num_keypoints = NUM_KEYPOINTS
+    module = ExportableViolenceModel(
+        DenseViolenceDetectionGNN(model, mode), adjacency
+    ).eval()
+    metadata = export_metadata(0.5, None, topology, num_keypoints, skeleton_links)
+    example = torch.rand(2, NUM_KEYPOINTS, 2) * 100 + 1
+    if export_format == EXPORT_FORMAT_ONNX:
+        export_onnx(module, example, output_path, metadata)
+    else:
+        export_torchscript(module, example, output_path, metadata)
+
+
+@pytest.mark.parametrize(
+    "export_format", [EXPORT_FORMAT_ONNX, EXPORT_FORMAT_TORCHSCRIPT]
+)
+@pytest.mark.parametrize("mode", [TOPOLOGY_COMPLETE, TOPOLOGY_SKELETON])
+def test_exported_model_matches_eager_model(
+    tmp_path: Path, mode: str, export_format: str
+) -> None:
+    if export_format == EXPORT_FORMAT_ONNX:
+        pytest.importorskip("onnx")
+        pytest.importorskip("onnxruntime")
+    model = _model()
+    links = None if mode == TOPOLOGY_COMPLETE else SKELETON_LINKS
+    output_path = tmp_path / "model.export"
+
+    _export(model, mode, export_format, output_path, links)
+
+    keypoints = parity_keypoints(
+        NUM_KEYPOINTS, num_persons=64, topology=mode, skeleton_links=links
+    )
+    topology = dict(DEFAULT_TOPOLOGY, mode=mode)
+    max_diff = check_parity(
+        model,
+        load_exported(output_path, export_format),
+        keypoints,
+        topology,
+        links,
+        torch.device("cpu"),
+    )
+    assert max_diff <= PARITY_TOLERANCE
+
+
+def test_parity_drops_persons_without_skeleton_links(tmp_path: Path) -> None:
+    model = _model()
+    output_path = tmp_path / "model.ts"
+    _export(
+        model, TOPOLOGY_SKELETON, EXPORT_FORMAT_TORCHSCRIPT, output_path, SKELETON_LINKS
+    )
+
+    # Valid keypoints 0, 9 and 16 share no skeleton link
+    lonely = np.zeros((1, NUM_KEYPOINTS, 2))
+    lonely[0, [0, 9, 16]] = [[10.0, 20.0], [30.0, 40.0], [50.0, 60.0]]
+    keypoints = np.concatenate(
+        [
+            parity_keypoints(
+                NUM_KEYPOINTS,
+                num_persons=4,
+                topology=TOPOLOGY_SKELETON,
+                skeleton_links=SKELETON_LINKS,
+            ),
+            lonely,
+        ]
+    )
+    max_diff = check_parity(
+        model,
+        load_exported(output_path, EXPORT_FORMAT_TORCHSCRIPT),
+        keypoints,
+        dict(DEFAULT_TOPOLOGY, mode=TOPOLOGY_SKELETON),
+        SKELETON_LINKS,
+        torch.device("cpu"),
+    )
+    assert max_diff <= PARITY_TOLERANCE
+
+
+def test_export_rejects_skeleton_knn(tmp_path: Path) -> None:
+    pytest.importorskip("onnx")
+    model = _model()
+    module = ExportableViolenceModel(
+        DenseViolenceDetectionGNN(model, TOPOLOGY_COMPLETE), None
+    )
+    metadata = export_metadata(
+        0.5, None, dict(DEFAULT_TOPOLOGY, mode=TOPOLOGY_SKELETON_KNN), NUM_KEYPOINTS
+    )
+
+    with pytest.raises(ValueError, match=TOPOLOGY_SKELETON_KNN):
+        export_onnx(
+            module, torch.rand(2, NUM_KEYPOINTS, 2), tmp_path / "m.onnx", metadata
+        )
+    assert not (tmp_path / "m.onnx").exists()
@@ -0,0 +1,99 @@
+"""Tests of the vectorized complete-graph builder in gnn.py."""
+
+from typing import Optional
+
+import numpy as np
+import pytest
+import torch
+from torch_geometric.data import Data
+
+from gnn import create_pose_graph
+
+
+def reference_create_pose_graph(
+    keypoints: np.ndarray, edge_attr: bool = True
+) -> Optional[Data]:
+    """
+    Original nested-loop graph builder.
+
+    Args:
+        keypoints: NumPy array of shape [num_keypoints, 2] containing (x, y) coordinates
+        edge_attr: Whether to include edge attributes (distances between joints)
+
+    Returns:
+        PyTorch Geometric Data object or None if the graph cannot be created
+    """
+    valid_mask = ~np.isnan(keypoints).any(axis=1) & (keypoints != 0).any(axis=1)
+    valid_keypoints = keypoints[valid_mask]
+
+    if len(valid_keypoints) < 3:
+        return None
+
+    num_nodes = len(valid_keypoints)
+    x = torch.tensor(valid_keypoints, dtype=torch.float)
+
+    edge_list = []
+    edge_features = []
+    for i in range(num_nodes):
+        for j in range(i + 1, num_nodes):
+            edge_list.append([i, j])
+            edge_list.append([j, i])
+            if edge_attr:
+                dist = np.linalg.norm(valid_keypoints[i] - valid_keypoints[j])
+                edge_features.append([dist])
+                edge_features.append([dist])
+
+    edge_index = torch.tensor(edge_list, dtype=torch.long).t().contiguous()
+    data = Data(x=x, edge_index=edge_index)
+    if edge_attr and edge_features:
+        data.edge_attr = torch.tensor(edge_features, dtype=torch.float)
+
+    return data
+
+
+def _keypoints(num_keypoints: int, pattern: str) -> np.ndarray:
+    """Random keypoints with one pattern of invalid keypoints."""
+    rng = np.random.default_rng(num_keypoints)
+    keypoints = rng.random((num_keypoints, 2)) * 100 + 1
+    if pattern == "zeros":
+        keypoints[rng.random(num_keypoints) < 0.3] = 0.0
+    elif pattern == "nans":
+        keypoints[rng.random(num_keypoints) < 0.3, rng.integers(0, 2)] = np.nan
+    elif pattern == "one_zero_coordinate":
+        keypoints[::2, 0] = 0.0  # still valid, only (0, 0) is invalid
+    elif pattern.startswith("valid_"):
+        keypoints[int(pattern[len("valid_") :]) :] = 0.0
+    return keypoints
+
+
+@pytest.mark.parametrize("edge_attr", [True, False])
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "all_valid",
+        "zeros",
+        "nans",
+        "one_zero_coordinate",
+        "valid_0",
+        "valid_1",
+        "valid_2",
+        "valid_3",
+    ],
+)
+@pytest.mark.parametrize("num_keypoints", [3, 5, 17, 133])
+def test_create_pose_graph_matches_reference(
+    num_keypoints: int, pattern: str, edge_attr: bool
+) -> None:
+    keypoints = _keypoints(num_keypoints, pattern)
+
+    graph = create_pose_graph(keypoints, edge_attr=edge_attr)
+    expected = reference_create_pose_graph(keypoints, edge_attr=edge_attr)
+
+    if expected is None:
+        assert graph is None
+        return
+    assert graph is not None
+    assert set(graph.keys()) == set(expected.keys())
+    for key in expected.keys():
+        assert graph[key].dtype == expected[key].dtype, key
+        assert torch.equal(graph[key], expected[key]), key
@@ -0,0 +1,86 @@
+"""Tests of the store and shard lifecycle of the graph cache."""
+
+import gc
+import json
+import os
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from graph_cache import build_graph_cache
+
+
+def _write_pose_file(path: Path, seed: int) -> None:
+    """Write an MMPose result file with two frames of two persons."""
+    rng = np.random.default_rng(seed)
+    frames = [
+        {
+            "frame_id": frame_id,
+            "instances": [
+                {"keypoints": (rng.random((17, 2)) * 100 + 1).tolist()}
+                for _ in range(2)
+            ],
+        }
+        for frame_id in range(2)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta_info": {}, "instance_info": frames}, f)
+
+
+def _make_sources(root: Path) -> List[Tuple[Path, Path]]:
+    """Create a camera with two violent and two non-violent files."""
+    violent, non_violent = root / "violent", root / "non_violent"
+    for i, directory in enumerate((violent, non_violent)):
+        directory.mkdir(parents=True)
+        for j in range(2):
+            _write_pose_file(directory / f"{j}.json", seed=10 * i + j)
+    return [(violent, non_violent)]
+
+
+def _stores(cache_dir: Path) -> List[Path]:
+    return sorted(
+        p for p in cache_dir.glob("topology-*/store-*") if not p.name.endswith(".tmp")
+    )
+
+
+def _shards(cache_dir: Path) -> List[Path]:
+    return sorted(cache_dir.glob("topology-*/shards/*.npz"))
+
+
+def test_outdated_store_is_kept_while_open(tmp_path: Path) -> None:
+    sources = _make_sources(tmp_path / "data")
+    cache_dir = tmp_path / "cache"
+
+    old = build_graph_cache(sources, cache_dir)
+    old_store = old.store_dir
+
+    changed = sources[0][0] / "0.json"
+    _write_pose_file(changed, seed=99)
+    stat = changed.stat()
+    os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    new = build_graph_cache(sources, cache_dir)
+    assert new.store_dir != old_store
+    assert (old_store / "manifest.json").exists()
+    assert len(old[0].x) > 0  # still readable
+    assert len(_shards(cache_dir)) == 5
+
+    del old
+    gc.collect()
+    build_graph_cache(sources, cache_dir)
+    assert _stores(cache_dir) == [new.store_dir]
+    assert len(_shards(cache_dir)) == 4
+
+
+def test_current_stores_of_other_file_sets_are_kept(tmp_path: Path) -> None:
+    sources = _make_sources(tmp_path / "data")
+    cache_dir = tmp_path / "cache"
+
+    full = build_graph_cache(sources, cache_dir).store_dir
+    half = build_graph_cache(sources, cache_dir, sample_percentage=50).store_dir
+    gc.collect()
+    build_graph_cache(sources, cache_dir)
+
+    assert _stores(cache_dir) == sorted([full, half])
+    assert len(_shards(cache_dir)) == 4
@@ -0,0 +1,139 @@
+"""Tests of the batched scoring paths of inference.py."""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pytest
+import torch
+from torch_geometric.data import Data
+
+from gnn import create_pose_graph
+from inference import (
+    iter_frame_graphs,
+    score_files,
+    score_files_pipelined,
+    score_frames,
+    summarize_frames,
+)
+from model import ViolenceDetectionGNN
+
+DEVICE = torch.device("cpu")
+THRESHOLD = 0.5
+
+
+def _model() -> ViolenceDetectionGNN:
+    """A small randomly initialized model in evaluation mode."""
+    torch.manual_seed(0)
+    return ViolenceDetectionGNN(
+        in_channels=2,
+        hidden_channels=16,
+        transformer_heads=2,
+        transformer_layers=1,
+        gnn_heads=2,
+    ).eval()
+
+
+def _write_pose_file(path: Path, frame_ids: List[Any], seed: int = 0) -> None:
+    """Write an MMPose result file with one to three persons per frame."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i, frame_id in enumerate(frame_ids):
+        instances = []
+        for _ in range(i % 3 + 1):
+            keypoints = rng.random((17, 2)) * 100 + 1
+            keypoints[rng.random(17) < 0.2] = 0.0
+            instances.append({"keypoints": keypoints.tolist()})
+        frame: Dict[str, Any] = {"instances": instances}
+        if frame_id is not None:
+            frame["frame_id"] = frame_id
+        frames.append(frame)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta_info": {}, "instance_info": frames}, f)
+
+
+def reference_score_frames(
+    model: ViolenceDetectionGNN, frames: List[Tuple[Any, List[Data]]]
+) -> List[Tuple[Any, float, List[float]]]:
+    """
+    Original per-frame loop with one forward pass per graph.
+
+    Args:
+        model: Trained GNN model
+        frames: List of (frame_id, list_of_graph_data)
+
+    Returns:
+        List of (frame_id, average frame score, list of person scores)
+    """
+    results = []
+    with torch.no_grad():
+        for frame_id, frame_graphs in frames:
+            frame_scores = []
+            for graph in frame_graphs:
+                batch = torch.zeros(graph.x.shape[0], dtype=torch.long)
+                frame_scores.append(model(graph.x, graph.edge_index, batch).item())
+            avg_score = np.mean(frame_scores) if frame_scores else 0.0
+            results.append((frame_id, avg_score, frame_scores))
+    return results
+
+
+def _frames() -> List[Tuple[Any, List[Data]]]:
+    """Frames of zero to four persons, with frame ids out of order."""
+    rng = np.random.default_rng(0)
+    frames = []
+    for i, num_persons in enumerate([2, 0, 1, 4, 0, 0, 3, 1, 0]):
+        graphs = []
+        for _ in range(num_persons):
+            keypoints = rng.random((17, 2)) * 100 + 1
+            keypoints[rng.random(17) < 0.2] = 0.0
+            graphs.append(create_pose_graph(keypoints))
+        frames.append((10 - i, graphs))
+    return frames
+
+
+def _single_file_results(model: ViolenceDetectionGNN, json_file: Path) -> Dict:
+    """Results of the single-file mode of inference.py."""
+    scored = score_frames(model, iter_frame_graphs(json_file), DEVICE)
+    output = summarize_frames(json_file.name, scored, THRESHOLD)
+    assert output is not None
+    return output
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_batch_modes_keep_frame_ids_as_in_the_file(
+    tmp_path: Path, pipelined: bool
+) -> None:
+    frame_ids = [0, -1, None, "7", "cam1-12", 2.5, 3]
+    json_file = tmp_path / "poses.json"
+    _write_pose_file(json_file, frame_ids)
+    model = _model()
+    output_dir = tmp_path / "results"
+
+    score = score_files_pipelined if pipelined else score_files
+    score(model, [json_file], output_dir, THRESHOLD, DEVICE, num_workers=0)
+
+    with open(output_dir / "poses_results.json", "r", encoding="utf-8") as f:
+        results = json.load(f)["results"]
+    expected = _single_file_results(model, json_file)["results"]
+    assert [r["frame_id"] for r in results] == frame_ids
+    assert json.loads(json.dumps(expected)) == results
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 1024])
+def test_score_frames_matches_per_graph_loop(batch_size: int) -> None:
+    model = _model()
+    frames = _frames()
+
+    scored = list(score_frames(model, iter(frames), DEVICE, batch_size))
+    expected = reference_score_frames(model, frames)
+
+    assert [frame_id for frame_id, _, _ in scored] == [
+        frame_id for frame_id, _, _ in expected
+    ]
+    for (_, avg_score, person_scores), (_, expected_avg, expected_scores) in zip(
+        scored, expected
+    ):
+        assert len(person_scores) == len(expected_scores)
+        np.testing.assert_allclose(person_scores, expected_scores, atol=1e-6)
+        np.testing.assert_allclose(avg_score, expected_avg, atol=1e-6)
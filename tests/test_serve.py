@@ -0,0 +1,82 @@
+"""Tests of the queue and stream lifecycle of the streaming service."""
+
+import threading
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import torch
+
+from model import ViolenceDetectionGNN
+from serve import OVERLOADED_ERROR, StreamingScorer
+
+DEVICE = torch.device("cpu")
+THRESHOLD = 0.5
+
+
+def _model() -> ViolenceDetectionGNN:
+    """A small randomly initialized model in evaluation mode."""
+    torch.manual_seed(0)
+    return ViolenceDetectionGNN(
+        in_channels=2,
+        hidden_channels=16,
+        transformer_heads=2,
+        transformer_layers=1,
+        gnn_heads=2,
+    ).eval()
+
+
+def _frame(stream_id: Any, frame_id: int) -> Dict[str, Any]:
+    """A frame message with one person."""
+    keypoints = np.random.default_rng(frame_id).random((17, 2)) * 100 + 1
+    return {
+        "stream_id": stream_id,
+        "frame_id": frame_id,
+        "instances": [{"keypoints": keypoints.tolist()}],
+    }
+
+
+def test_full_queue_rejects_frames_as_overloaded() -> None:
+    scorer = StreamingScorer(_model(), THRESHOLD, DEVICE, max_queue_size=2)
+    responses: List[Dict[str, Any]] = []
+
+    # The scoring thread is not running yet, so the third frame finds the
+    # queue full; its error response waits for a free slot
+    scorer.submit(_frame("cam1", 0), responses.append)
+    scorer.submit(_frame("cam1", 1), responses.append)
+    overloaded = threading.Thread(
+        target=scorer.submit, args=(_frame("cam1", 2), responses.append)
+    )
+    overloaded.start()
+    time.sleep(0.2)
+    scorer.start()
+    overloaded.join()
+    scorer.stop()
+
+    assert [r["frame_id"] for r in responses] == [0, 1, 2]
+    assert all("violence_score" in r for r in responses[:2])
+    assert responses[2]["error"] == OVERLOADED_ERROR
+    assert scorer.num_frames == 2
+    assert scorer.num_overloaded == 1
+
+
+def test_stream_windows_are_dropped_on_end_and_when_idle() -> None:
+    scorer = StreamingScorer(_model(), THRESHOLD, DEVICE, stream_timeout_s=0.1).start()
+    responses: List[Dict[str, Any]] = []
+
+    scorer.submit(_frame("cam1", 0), responses.append)
+    scorer.submit(_frame("cam2", 0), responses.append)
+    scorer.submit({"stream_id": "cam1", "end_of_stream": True}, responses.append)
+    assert scorer.num_streams == 1
+
+    time.sleep(0.2)
+    scorer.submit(_frame("cam3", 0), responses.append)
+    scorer.stop()
+
+    assert scorer.num_streams == 1  # only cam3, cam2 was idle
+    assert [(r["stream_id"], r.get("end_of_stream")) for r in responses] == [
+        ("cam1", None),
+        ("cam2", None),
+        ("cam1", True),
+        ("cam3", None),
+    ]
@@ -0,0 +1,102 @@
+"""Tests of the single-sort threshold search in train.py."""
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pytest
+from sklearn.metrics import confusion_matrix, f1_score, roc_curve
+
+from train import find_optimal_threshold, threshold_counts
+
+
+def reference_find_optimal_threshold(
+    y_true: np.ndarray, y_score: np.ndarray
+) -> Tuple[float, Dict[str, float]]:
+    """
+    Threshold search with sklearn's roc_curve and one f1_score call per threshold.
+
+    Args:
+        y_true: Ground truth binary labels
+        y_score: Predicted scores (probabilities)
+
+    Returns:
+        Tuple of (optimal threshold, dictionary of metrics at that threshold)
+    """
+    fpr, tpr, thresholds = roc_curve(y_true, y_score)
+    # scikit-learn < 1.3 starts the curve at max(y_score) + 1 instead of inf
+    thresholds[0] = np.inf
+
+    j_scores = tpr - fpr
+    optimal_idx_j = np.argmax(j_scores)
+    distances = np.sqrt((1 - tpr) ** 2 + fpr**2)
+    optimal_idx_d = np.argmin(distances)
+    f1_scores = [
+        f1_score(y_true, (y_score >= t).astype(int), zero_division=0)
+        for t in thresholds
+    ]
+    optimal_idx_f1 = np.argmax(f1_scores)
+
+    optimal_threshold = thresholds[optimal_idx_j]
+    y_pred = (y_score >= optimal_threshold).astype(int)
+    tn, fp, fn, tp = confusion_matrix(y_true, y_pred, labels=[0, 1]).ravel()
+
+    metrics = {
+        "threshold_j": optimal_threshold,
+        "threshold_distance": thresholds[optimal_idx_d],
+        "threshold_f1": thresholds[optimal_idx_f1],
+        "sensitivity": tp / (tp + fn) if (tp + fn) > 0 else 0,
+        "specificity": tn / (tn + fp) if (tn + fp) > 0 else 0,
+        "precision": tp / (tp + fp) if (tp + fp) > 0 else 0,
+        "f1_score": f1_scores[optimal_idx_j],
+        "youdens_j": j_scores[optimal_idx_j],
+    }
+    return optimal_threshold, metrics
+
+
+def _scores(kind: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Labels and scores of one test case."""
+    rng = np.random.default_rng(0)
+    if kind == "separable":
+        y_true = np.r_[np.zeros(50), np.ones(50)]
+        return y_true, np.r_[rng.random(50) * 0.4, 0.6 + rng.random(50) * 0.4]
+    y_true = (rng.random(500) < 0.5).astype(np.float64)
+    y_score = np.clip(rng.normal(0.4 + 0.2 * y_true, 0.2), 0, 1)
+    if kind == "ties":
+        y_score = np.round(y_score, 1)
+    elif kind == "all_positive":
+        y_true = np.ones_like(y_true)
+    elif kind == "all_negative":
+        y_true = np.zeros_like(y_true)
+    elif kind == "constant":
+        y_score = np.full_like(y_score, 0.5)
+    return y_true, y_score
+
+
+@pytest.mark.filterwarnings("ignore")
+@pytest.mark.parametrize(
+    "kind",
+    ["overlapping", "separable", "ties", "all_positive", "all_negative", "constant"],
+)
+def test_find_optimal_threshold_matches_reference(kind: str) -> None:
+    y_true, y_score = _scores(kind)
+
+    expected_threshold, expected = reference_find_optimal_threshold(y_true, y_score)
+    threshold, metrics = find_optimal_threshold(y_true, y_score)
+
+    assert threshold == expected_threshold
+    assert metrics.keys() == expected.keys()
+    for name, value in metrics.items():
+        np.testing.assert_allclose(value, expected[name], rtol=1e-12, err_msg=name)
+
+
+def test_threshold_counts_match_direct_counts() -> None:
+    y_true, y_score = _scores("ties")
+
+    thresholds, tps, fps = threshold_counts(y_true, y_score)
+
+    assert np.all(np.diff(thresholds) < 0)
+    np.testing.assert_array_equal(np.unique(y_score)[::-1], thresholds)
+    for threshold, tp, fp in zip(thresholds, tps, fps):
+        predicted = y_score >= threshold
+        assert tp == np.sum(predicted & (y_true == 1))
+        assert fp == np.sum(predicted & (y_true == 0))